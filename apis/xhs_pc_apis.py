@@ -1,37 +1,507 @@
 # encoding: utf-8
+import itertools
 import json
 import re
+import threading
 import urllib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from http.cookiejar import DefaultCookiePolicy
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers
 from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.initial_state import extract_state_value, locate_initial_state
+from xhs_utils.rate_limiter import RateLimiter
 from loguru import logger
 
 """
     获小红书的api
     :param cookies_str: 你的cookies
 """
-class XHS_Apis():
-    def __init__(self):
-        self.base_url = "https://edith.xiaohongshu.com"
+# 默认 (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (5, 15)
 
-    def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None):
+SORT_TYPES = {1: "time_descending", 2: "popularity_descending", 3: "comment_descending", 4: "collect_descending"}
+FILTER_NOTE_TYPES = {1: "视频笔记", 2: "普通笔记"}
+FILTER_NOTE_TIMES = {1: "一天内", 2: "一周内", 3: "半年内"}
+FILTER_NOTE_RANGES = {1: "已看过", 2: "未看过", 3: "已关注"}
+FILTER_POS_DISTANCES = {1: "同城", 2: "附近"}
+
+
+class XHSApiError(Exception):
+    """
+        接口返回失败（success=False 或请求异常），msg 为失败原因
+        status_code 为失败请求的 HTTP 状态码，未收到响应时为 None；200 表示业务失败（如登录失效）
+    """
+
+    def __init__(self, msg: str = '', status_code: int = None):
+        super().__init__(msg)
+        self.status_code = status_code
+
+
+class XHSRequestBuilder:
+    """
+        请求构造与响应解析，同步 XHS_Apis 与异步 AsyncXHS_Apis 共用
+        build_* 只做纯计算，返回 (api, data)：api 为带查询串的路径，data 为 None 时发 GET，否则发 POST；
+        签名和收发由各自的客户端负责
+    """
+    base_url = "https://edith.xiaohongshu.com"
+
+    @staticmethod
+    def parse_url(url: str) -> tuple[str, dict]:
+        """拆出 url 路径最后一段（用户/笔记 id）和查询参数"""
+        urlParse = urllib.parse.urlparse(url)
+        # 使用 parse_qs 安全解析查询参数，避免 xsec_token 中的 '=' 被截断
+        kvDist = {k: v[0] for k, v in urllib.parse.parse_qs(urlParse.query).items()}
+        return urlParse.path.split("/")[-1], kvDist
+
+    @staticmethod
+    def sign(api: str, data, cookies_str: str) -> tuple[dict, dict, bytes | None]:
+        """签名，返回 (headers, cookies, body)；POST 的 body 统一按 utf-8 编码"""
+        method = 'GET' if data is None else 'POST'
+        headers, cookies, body = generate_request_params(cookies_str, api, data if data is not None else '', method)
+        if data is None:
+            return headers, cookies, None
+        return headers, cookies, body.encode('utf-8')
+
+    @staticmethod
+    def parse_result(res_json: dict) -> tuple[bool, str]:
+        return res_json["success"], res_json["msg"]
+
+    @staticmethod
+    def build_user_info(user_id: str):
+        return splice_str("/api/sns/web/v1/user/otherinfo", {"target_user_id": user_id}), None
+
+    @staticmethod
+    def build_user_note_info(user_id: str, cursor: str, xsec_token='', xsec_source=''):
+        params = {
+            "num": "30",
+            "cursor": cursor,
+            "user_id": user_id,
+            "image_formats": "jpg,webp,avif",
+            "xsec_token": xsec_token,
+            "xsec_source": xsec_source,
+        }
+        return splice_str("/api/sns/web/v1/user_posted", params), None
+
+    @staticmethod
+    def build_note_info(note_id: str, xsec_token='', xsec_source='pc_search'):
+        data = {
+            "source_note_id": note_id,
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ],
+            "extra": {
+                "need_body_topic": "1"
+            },
+            "xsec_source": xsec_source,
+            "xsec_token": xsec_token
+        }
+        return "/api/sns/web/v1/feed", data
+
+    @staticmethod
+    def build_search_keyword(word: str):
+        return splice_str("/api/sns/web/v1/search/recommend", {"keyword": urllib.parse.quote(word)}), None
+
+    @staticmethod
+    def build_search_note(query: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo=""):
+        if geo:
+            geo = json.dumps(geo, separators=(',', ':'))
+        filters = [
+            ("sort_type", SORT_TYPES.get(sort_type_choice, "general")),
+            ("filter_note_type", FILTER_NOTE_TYPES.get(note_type, "不限")),
+            ("filter_note_time", FILTER_NOTE_TIMES.get(note_time, "不限")),
+            ("filter_note_range", FILTER_NOTE_RANGES.get(note_range, "不限")),
+            ("filter_pos_distance", FILTER_POS_DISTANCES.get(pos_distance, "不限")),
+        ]
+        data = {
+            "keyword": query,
+            "page": page,
+            "page_size": 20,
+            "search_id": generate_x_b3_traceid(21),
+            "sort": "general",
+            "note_type": 0,
+            "ext_flags": [],
+            "filters": [{"tags": [tag], "type": filter_type} for filter_type, tag in filters],
+            "geo": geo,
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ]
+        }
+        return "/api/sns/web/v1/search/notes", data
+
+    @staticmethod
+    def build_search_user(query: str, page=1):
+        data = {
+            "search_user_request": {
+                "keyword": query,
+                "search_id": generate_x_b3_traceid(21),
+                "page": page,
+                "page_size": 15,
+                "biz_type": "web_search_user",
+                "request_id": generate_x_b3_traceid(21)
+            }
+        }
+        return "/api/sns/web/v1/search/usersearch", data
+
+    @staticmethod
+    def build_note_out_comment(note_id: str, cursor: str, xsec_token: str):
+        params = {
+            "note_id": note_id,
+            "cursor": cursor,
+            "top_comment_id": "",
+            "image_formats": "jpg,webp,avif",
+            "xsec_token": xsec_token
+        }
+        return splice_str("/api/sns/web/v2/comment/page", params), None
+
+    @staticmethod
+    def build_note_inner_comment(comment: dict, cursor: str, xsec_token: str):
+        params = {
+            "note_id": comment['note_id'],
+            "root_comment_id": comment['id'],
+            "num": "10",
+            "cursor": cursor,
+            "image_formats": "jpg,webp,avif",
+            "top_comment_id": '',
+            "xsec_token": xsec_token
+        }
+        return splice_str("/api/sns/web/v2/comment/sub/page", params), None
+
+    @staticmethod
+    def build_homefeed_all_channel():
+        return "/api/sns/web/v1/homefeed/category", None
+
+    @staticmethod
+    def build_homefeed_recommend(category, cursor_score, refresh_type, note_index):
+        data = {
+            "cursor_score": cursor_score,
+            "num": 20,
+            "refresh_type": refresh_type,
+            "note_index": note_index,
+            "unread_begin_note_id": "",
+            "unread_end_note_id": "",
+            "unread_note_count": 0,
+            "category": category,
+            "search_key": "",
+            "need_num": 10,
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ],
+            "need_filter_image": False
+        }
+        return "/api/sns/web/v1/homefeed", data
+
+    @staticmethod
+    def build_user_self_info():
+        return "/api/sns/web/v1/user/selfinfo", None
+
+    @staticmethod
+    def build_user_self_info2():
+        return "/api/sns/web/v2/user/me", None
+
+    @staticmethod
+    def _user_note_page_params(user_id: str, cursor: str, xsec_token='', xsec_source='', drop_empty=False):
+        """点赞 / 收藏列表的分页参数；drop_empty 时不带空的 xsec_token / xsec_source"""
+        params = {
+            "num": "30",
+            "cursor": cursor,
+            "user_id": user_id,
+            "image_formats": "jpg,webp,avif",
+            "xsec_token": xsec_token,
+            "xsec_source": xsec_source,
+        }
+        if drop_empty:
+            params = {k: v for k, v in params.items() if v or k not in ("xsec_token", "xsec_source")}
+        return params
+
+    @classmethod
+    def build_user_like_note_info(cls, user_id: str, cursor: str, xsec_token='', xsec_source=''):
+        params = cls._user_note_page_params(user_id, cursor, xsec_token, xsec_source)
+        return splice_str("/api/sns/web/v1/note/like/page", params), None
+
+    @classmethod
+    def build_user_collect_note_info(cls, user_id: str, cursor: str, xsec_token='', xsec_source='', drop_empty=False):
+        params = cls._user_note_page_params(user_id, cursor, xsec_token, xsec_source, drop_empty)
+        return splice_str("/api/sns/web/v2/note/collect/page", params), None
+
+    @staticmethod
+    def build_unread_message():
+        return "/api/sns/web/unread_count", None
+
+    @staticmethod
+    def build_metions(cursor: str):
+        return splice_str("/api/sns/web/v1/you/mentions", {"num": "20", "cursor": cursor}), None
+
+    @staticmethod
+    def build_likesAndcollects(cursor: str):
+        return splice_str("/api/sns/web/v1/you/likes", {"num": "20", "cursor": cursor}), None
+
+    @staticmethod
+    def build_new_connections(cursor: str):
+        return splice_str("/api/sns/web/v1/you/connections", {"num": "20", "cursor": cursor}), None
+
+    @classmethod
+    def parse_note_html(cls, html: str, url: str):
         """
-            获取主页的所有频道
-            返回主页的所有频道
+            从笔记页面 HTML 中的 __INITIAL_STATE__ 提取笔记，转换为与 API 返回一致的格式
+            返回 (success, msg, res_json)
+        """
+        note_id, _ = cls.parse_url(url)
+        span = locate_initial_state(html)
+        if span is None:
+            return False, "无法从网页中提取笔记数据", None
+        try:
+            # 只解析 note.noteDetailMap 这一棵子树
+            note_detail_map = extract_state_value(html, 'noteDetailMap', span) or {}
+        except json.JSONDecodeError as e:
+            logger.error(f"解析网页 JSON 失败: {e}")
+            return False, f"网页数据解析失败: {e}", None
+
+        note_state = note_detail_map.get(note_id) or {}
+        note = note_state.get('note') or {}
+
+        if not note:
+            return False, "网页中未找到笔记数据，笔记可能已被删除", None
+
+        # 转换为与 API 返回一致的 items 格式
+        item = cls._convert_web_note_to_api_format(note, url)
+        res_json = {
+            "code": 0,
+            "success": True,
+            "data": {"items": [item]},
+            "msg": ""
+        }
+        logger.info(f"网页解析获取笔记成功: note_id={note_id}, title={note.get('title', '')}")
+        return True, "获取成功(网页解析)", res_json
+
+    @staticmethod
+    def _convert_web_note_to_api_format(note: dict, url: str) -> dict:
+        """将网页 __INITIAL_STATE__ 中的笔记数据转换为 API items 格式"""
+        user = note.get('user', {})
+        interact = note.get('interactInfo', {})
+
+        # 处理图片列表：将 web 格式的 infoList 转换为 API 格式
+        image_list = []
+        for img in note.get('imageList', []):
+            info_list = []
+            for info in img.get('infoList', []):
+                info_list.append({
+                    'image_scene': info.get('imageScene', ''),
+                    'url': info.get('url', '')
+                })
+            image_list.append({
+                'info_list': info_list,
+                'url_default': img.get('urlDefault', ''),
+                'height': img.get('height', 0),
+                'width': img.get('width', 0),
+            })
+
+        # 处理视频数据
+        video = {}
+        if note.get('type') == 'video' and note.get('video'):
+            video_data = note['video']
+            video = {
+                'media': video_data.get('media', {}),
+                'image': video_data.get('image', {}),
+                'capa': video_data.get('capa', {}),
+                'consumer': video_data.get('consumer', {}),
+            }
+
+        note_card = {
+            'type': note.get('type', 'normal'),
+            'user': {
+                'user_id': user.get('userId', ''),
+                'nickname': user.get('nickname', ''),
+                'avatar': user.get('avatar', ''),
+            },
+            'title': note.get('title', ''),
+            'desc': note.get('desc', ''),
+            'interact_info': {
+                'liked_count': interact.get('likedCount', '0'),
+                'collected_count': interact.get('collectedCount', '0'),
+                'comment_count': interact.get('commentCount', '0'),
+                'share_count': interact.get('shareCount', '0'),
+            },
+            'image_list': image_list,
+            'tag_list': [{'name': t.get('name', '')} for t in note.get('tagList', [])],
+            'time': note.get('time', 0),
+            'ip_location': note.get('ipLocation', '未知'),
+        }
+        if video:
+            note_card['video'] = video
+
+        return {
+            'id': note.get('noteId', ''),
+            'url': url,
+            'note_card': note_card,
+        }
+
+
+class XHS_Apis(XHSRequestBuilder):
+    def __init__(self, pool_size: int = 10, timeout: tuple = DEFAULT_TIMEOUT, max_retries: int = 2, backoff_factor: float = 0.5,
+                 rate_limiter: RateLimiter = None, on_response=None):
+        """
+            :param pool_size: 每个主机保持的最大 keep-alive 连接数
+            :param timeout: (连接超时, 读取超时)，作用于每一个请求
+            :param max_retries: 连接失败（请求未发出）时的重试次数，读超时和非 200 响应不重试
+            :param backoff_factor: 重试退避系数，第 n 次重试前等待 backoff_factor * 2^(n-1) 秒
+            :param rate_limiter: 可选，按接口族限速并根据 461 / 非 200 响应自适应降速
+            :param on_response: 可选，每个响应的回调 on_response(cookies: dict, status_code)，用于按账号统计健康度
+        """
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.on_response = on_response
+        self.session = self._build_session(pool_size, max_retries, backoff_factor)
+        # 每个线程最近一次接口调用收到的 HTTP 状态码，供调用方区分 HTTP 失败和业务失败
+        self._local = threading.local()
+
+    @staticmethod
+    def _build_session(pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+        """
+            构建线程间共享的连接池会话
+            会话不保存服务端下发的 Cookie，每次请求显式传入 cookies，避免多线程/多账号之间串号
+        """
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=backoff_factor,
+            allowed_methods=None,  # 仅连接阶段失败才重试，请求未发出，POST 也安全
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        return self._send(self.session.get, url, **kwargs)
+
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        return self._send(self.session.post, url, **kwargs)
+
+    def _send(self, send, url: str, **kwargs) -> requests.Response:
+        """发请求前按接口族取令牌，收到响应后把状态码反馈给限速器和 on_response"""
+        kwargs.setdefault('timeout', self.timeout)
+        bucket = self.rate_limiter.bucket_for(url) if self.rate_limiter is not None else None
+        if bucket is not None:
+            bucket.acquire()
+        response = send(url, **kwargs)
+        if bucket is not None:
+            bucket.record(response.status_code)
+        self._local.status_code = response.status_code
+        if self.on_response is not None:
+            self.on_response(kwargs.get('cookies'), response.status_code)
+        return response
+
+    def _call(self, build, *args, cookies_str: str, proxies: dict = None):
+        """
+            构造（build(*args) -> (api, data)）、签名并发送单个接口请求
+            返回 (success, msg, res_json)，构造或请求过程中的异常都转为 success=False
         """
         res_json = None
+        self._local.status_code = None
         try:
-            api = "/api/sns/web/v1/homefeed/category"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            api, data = build(*args)
+            headers, cookies, body = self.sign(api, data, cookies_str)
+            if body is None:
+                response = self._get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            else:
+                response = self._post(self.base_url + api, headers=headers, data=body, cookies=cookies, proxies=proxies)
             res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
+            success, msg = self.parse_result(res_json)
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
+    def last_status_code(self) -> int | None:
+        """
+            当前线程最近一次接口调用（_call、get_user_latest_notes、get_note_info）收到的 HTTP 状态码，
+            请求未发出或未收到响应时为 None；翻页 / 降级时为最后一个请求的状态码
+        """
+        return getattr(self._local, 'status_code', None)
+
+    def _iter_cursor_pages(self, fetch, items_key: str, cursor: str = '', stop_on_empty: bool = True):
+        """
+            按 cursor 翻页的通用翻页器，fetch(cursor) -> (success, msg, res_json)
+            逐页 yield data，data["cursor"] 即下一页的游标，保存下来传回 cursor 参数可从断点继续；
+            没有 cursor、没有更多或（stop_on_empty 时）遇到空页即停止，请求失败抛出 XHSApiError
+        """
+        while True:
+            success, msg, res_json = fetch(cursor)
+            if not success:
+                raise XHSApiError(msg, self.last_status_code())
+            data = res_json.get("data") or {}
+            if items_key not in data or 'cursor' not in data:
+                return
+            yield data
+            cursor = str(data["cursor"])
+            if (stop_on_empty and not data[items_key]) or not data.get("has_more", False):
+                return
+
+    def _iter_numbered_pages(self, fetch, items_key: str, page: int = 1):
+        """
+            按页码翻页的通用翻页器，fetch(page) -> (success, msg, res_json)
+            逐页 yield (page, data)，从 page + 1 继续即可断点续取；没有结果或没有更多即停止
+        """
+        while True:
+            success, msg, res_json = fetch(page)
+            if not success:
+                raise XHSApiError(msg, self.last_status_code())
+            data = res_json["data"]
+            if items_key not in data:
+                return
+            yield page, data
+            if not data.get("has_more", False):
+                return
+            page += 1
+
+    @staticmethod
+    def iter_items(pages, items_key: str):
+        """把翻页器展开成逐条产出，配合 itertools.islice 可以只取前 N 条"""
+        for data in pages:
+            yield from data[items_key]
+
+    @staticmethod
+    def _collect(pages, items_key: str, limit: int = None):
+        """
+            把翻页器汇总成列表，返回 (success, msg, items)，取够 limit 条即停止翻页
+            翻页失败时返回 success=False 和已取到的部分
+        """
+        items = []
+        try:
+            for data in pages:
+                items.extend(data[items_key])
+                if limit is not None and len(items) >= limit:
+                    break
+        except Exception as e:
+            return False, str(e), items[:limit]
+        finally:
+            pages.close()
+        return True, 'success', items[:limit]
+
+    def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None):
+        """
+            获取主页的所有频道
+            返回主页的所有频道
+        """
+        return self._call(self.build_homefeed_all_channel, cookies_str=cookies_str, proxies=proxies)
+
     def get_homefeed_recommend(self, category, cursor_score, refresh_type, note_index, cookies_str: str, proxies: dict = None):
         """
             获取主页推荐的笔记
@@ -42,35 +512,26 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回主页推荐的笔记
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v1/homefeed"
-            data = {
-                "cursor_score": cursor_score,
-                "num": 20,
-                "refresh_type": refresh_type,
-                "note_index": note_index,
-                "unread_begin_note_id": "",
-                "unread_end_note_id": "",
-                "unread_note_count": 0,
-                "category": category,
-                "search_key": "",
-                "need_num": 10,
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ],
-                "need_filter_image": False
-            }
-            headers, cookies, trans_data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_homefeed_recommend, category, cursor_score, refresh_type, note_index,
+                          cookies_str=cookies_str, proxies=proxies)
+
+    def iter_homefeed_recommend(self, category, cookies_str: str, proxies: dict = None):
+        """
+            逐页获取主页推荐的笔记，yield 每页 data（items / cursor_score）
+            :param category: 你想要获取的频道
+        """
+        cursor_score, refresh_type, note_index = "", 1, 0
+        while True:
+            success, msg, res_json = self.get_homefeed_recommend(category, cursor_score, refresh_type, note_index, cookies_str, proxies)
+            if not success:
+                raise XHSApiError(msg, self.last_status_code())
+            data = res_json["data"]
+            if "items" not in data:
+                return
+            yield data
+            cursor_score = data["cursor_score"]
+            refresh_type = 3
+            note_index += 20
 
     def get_homefeed_recommend_by_num(self, category, require_num, cookies_str: str, proxies: dict = None):
         """
@@ -80,28 +541,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             根据数量返回主页推荐的笔记
         """
-        cursor_score, refresh_type, note_index = "", 1, 0
-        note_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_homefeed_recommend(category, cursor_score, refresh_type, note_index, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "items" not in res_json["data"]:
-                    break
-                notes = res_json["data"]["items"]
-                note_list.extend(notes)
-                cursor_score = res_json["data"]["cursor_score"]
-                refresh_type = 3
-                note_index += 20
-                if len(note_list) > require_num:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        if len(note_list) > require_num:
-            note_list = note_list[:require_num]
-        return success, msg, note_list
+        return self._collect(self.iter_homefeed_recommend(category, cookies_str, proxies), "items", require_num)
 
     def get_user_info(self, user_id: str, cookies_str: str, proxies: dict = None):
         """
@@ -110,21 +550,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户的信息
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v1/user/otherinfo"
-            params = {
-                "target_user_id": user_id
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_user_info, user_id, cookies_str=cookies_str, proxies=proxies)
 
     def get_user_self_info(self, cookies_str: str, proxies: dict = None):
         """
@@ -132,17 +558,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户自己的信息1
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v1/user/selfinfo"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_user_self_info, cookies_str=cookies_str, proxies=proxies)
 
 
     def get_user_self_info2(self, cookies_str: str, proxies: dict = None):
@@ -151,17 +567,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户自己的信息2
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v2/user/me"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_user_self_info2, cookies_str=cookies_str, proxies=proxies)
 
     def get_user_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
         """
@@ -171,27 +577,23 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户指定位置的笔记
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v1/user_posted"
-            params = {
-                "num": "30",
-                "cursor": cursor,
-                "user_id": user_id,
-                "image_formats": "jpg,webp,avif",
-                "xsec_token": xsec_token,
-                "xsec_source": xsec_source,
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_user_note_info, user_id, cursor, xsec_token, xsec_source,
+                          cookies_str=cookies_str, proxies=proxies)
+
 
+    def iter_user_notes(self, user_url: str, cookies_str: str, cursor: str = '', proxies: dict = None):
+        """
+            逐页获取用户笔记，yield 每页 data（notes / cursor / has_more）
+            :param user_url: 用户主页 url（包含 xsec_token）
+            :param cursor: 起始游标，传入上次保存的 data["cursor"] 可从断点继续
+        """
+        user_id, kvDist = self.parse_url(user_url)
+        xsec_token = kvDist.get('xsec_token', '')
+        xsec_source = kvDist.get('xsec_source', 'pc_search')
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies),
+            "notes", cursor,
+        )
 
     def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None):
         """
@@ -200,103 +602,65 @@ class XHS_Apis():
            :param cookies_str: 你的cookies
            返回用户的所有笔记
         """
-        cursor = ''
-        note_list = []
-        try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            # 使用 parse_qs 安全解析查询参数，避免 xsec_token 中的 '=' 被截断
-            kvDist = {k: v[0] for k, v in urllib.parse.parse_qs(urlParse.query).items()}
-            xsec_token = kvDist.get('xsec_token', '')
-            xsec_source = kvDist.get('xsec_source', 'pc_search')
-            while True:
-                success, msg, res_json = self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_list
-    
-    def get_user_latest_notes(self, user_url: str, cookies_str: str, limit: int = 5, proxies: dict = None):
+        return self._collect(self.iter_user_notes(user_url, cookies_str, proxies=proxies), "notes")
+
+    def get_user_latest_notes(self, user_url: str, cookies_str: str, limit: int = 5, proxies: dict = None, page_stats: dict = None,
+                              stop_at_note_id: str = None):
         """
         获取用户最新的前N条笔记（优化版，只获取需要的数量）
         :param user_url: 用户完整URL（包含xsec_token）
         :param cookies_str: 你的cookies
         :param limit: 需要获取的笔记数量，默认5条
         :param proxies: 代理设置（可选）
+        :param page_stats: 可选，传入 dict 时写入翻页统计 {"pages": 实际请求页数, "stopped_early": 是否在还有后续页时提前停止}
+        :param stop_at_note_id: 可选，上次见过的最新笔记ID；翻到该笔记即停止，只返回它之前（更新）的笔记。
+            置顶笔记不按时间排序，不作为停止点；传入时 page_stats 额外写入 "reached_known": 是否遇到了该笔记
         :return: (success, msg, note_list) 返回最新的前N条笔记
         """
-        cursor = ''
         note_list = []
+        pages = 0
+        stopped_early = False
+        reached_known = False
+        self._local.status_code = None
+        # 只获取需要的数量，不需要获取所有笔记
+        pager = self.iter_user_notes(user_url, cookies_str, proxies=proxies)
         try:
-            # 解析用户URL，提取user_id和xsec_token
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            
-            # 解析查询参数
-            kvs = urlParse.query.split('&') if urlParse.query else []
-            kvDist = {}
-            for kv in kvs:
-                if '=' in kv:
-                    key, value = kv.split('=', 1)
-                    kvDist[key] = value
-            
-            xsec_token = kvDist.get('xsec_token', '')
-            xsec_source = kvDist.get('xsec_source', 'pc_search')
-            
-            # 只获取需要的数量，不需要获取所有笔记
-            while len(note_list) < limit:
-                success, msg, res_json = self.get_user_note_info(
-                    user_id, cursor, cookies_str, xsec_token, xsec_source, proxies
-                )
-                
-                if not success:
-                    raise Exception(msg)
-                
-                notes = res_json.get("data", {}).get("notes", [])
-                
-                if not notes:
-                    # 没有更多笔记了
-                    break
-                
-                # 添加笔记到列表
+            for data in pager:
+                pages += 1
+                notes = data["notes"]
+
+                # 遇到上次见过的笔记，后面都是旧笔记
+                if stop_at_note_id:
+                    for index, note in enumerate(notes):
+                        sticky = (note.get("interact_info") or {}).get("sticky", False)
+                        if note.get("note_id") == stop_at_note_id and not sticky:
+                            notes = notes[:index]
+                            reached_known = True
+                            break
+
                 note_list.extend(notes)
-                
-                # 如果已经获取足够的笔记，停止
-                if len(note_list) >= limit:
-                    # 只保留前limit条
+
+                # 遇到停止点或已经获取足够的笔记，只保留前limit条
+                if reached_known or len(note_list) >= limit:
                     note_list = note_list[:limit]
+                    stopped_early = bool(data.get("has_more", False))
                     break
-                
-                # 检查是否还有更多笔记
-                if not res_json.get("data", {}).get("has_more", False):
-                    # 没有更多了
-                    break
-                
-                # 更新cursor，准备获取下一页
-                if 'cursor' in res_json.get("data", {}):
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    # 没有cursor了，停止
-                    break
-            
+
             success = True
             msg = f"成功获取 {len(note_list)} 条笔记"
-            
+
         except Exception as e:
             success = False
             msg = str(e)
             note_list = []
-        
+        finally:
+            pager.close()
+
+        if page_stats is not None:
+            page_stats["pages"] = pages
+            page_stats["stopped_early"] = stopped_early
+            if stop_at_note_id:
+                page_stats["reached_known"] = reached_known
         return success, msg, note_list
 
     def get_user_like_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
@@ -307,26 +671,18 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户指定位置喜欢的笔记
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v1/note/like/page"
-            params = {
-                "num": "30",
-                "cursor": cursor,
-                "user_id": user_id,
-                "image_formats": "jpg,webp,avif",
-                "xsec_token": xsec_token,
-                "xsec_source": xsec_source,
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_user_like_note_info, user_id, cursor, xsec_token, xsec_source,
+                          cookies_str=cookies_str, proxies=proxies)
+
+    def iter_user_like_notes(self, user_url: str, cookies_str: str, cursor: str = '', proxies: dict = None):
+        """逐页获取用户喜欢的笔记，yield 每页 data（notes / cursor / has_more）"""
+        user_id, kvDist = self.parse_url(user_url)
+        xsec_token = kvDist.get('xsec_token', '')
+        xsec_source = kvDist.get('xsec_source', 'pc_user')
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies),
+            "notes", cursor,
+        )
 
     def get_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None):
         """
@@ -335,32 +691,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户的所有喜欢笔记
         """
-        cursor = ''
-        note_list = []
-        try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            # 使用 parse_qs 安全解析查询参数，避免 xsec_token 中的 '=' 被截断
-            kvDist = {k: v[0] for k, v in urllib.parse.parse_qs(urlParse.query).items()}
-            xsec_token = kvDist.get('xsec_token', '')
-            xsec_source = kvDist.get('xsec_source', 'pc_user')
-            while True:
-                success, msg, res_json = self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token,
-                                                                      xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_list
+        return self._collect(self.iter_user_like_notes(user_url, cookies_str, proxies=proxies), "notes")
 
     def get_user_collect_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
         """
@@ -370,26 +701,18 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户指定位置收藏的笔记
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v2/note/collect/page"
-            params = {
-                "num": "30",
-                "cursor": cursor,
-                "user_id": user_id,
-                "image_formats": "jpg,webp,avif",
-                "xsec_token": xsec_token,
-                "xsec_source": xsec_source,
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_user_collect_note_info, user_id, cursor, xsec_token, xsec_source,
+                          cookies_str=cookies_str, proxies=proxies)
+
+    def iter_user_collect_notes(self, user_url: str, cookies_str: str, cursor: str = '', proxies: dict = None):
+        """逐页获取用户收藏的笔记，yield 每页 data（notes / cursor / has_more）"""
+        user_id, kvDist = self.parse_url(user_url)
+        xsec_token = kvDist.get('xsec_token', '')
+        xsec_source = kvDist.get('xsec_source', 'pc_search')
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies),
+            "notes", cursor,
+        )
 
     def get_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: dict = None):
         """
@@ -398,32 +721,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回用户的所有收藏笔记
         """
-        cursor = ''
-        note_list = []
-        try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            # 使用 parse_qs 安全解析查询参数，避免 xsec_token 中的 '=' 被截断
-            kvDist = {k: v[0] for k, v in urllib.parse.parse_qs(urlParse.query).items()}
-            xsec_token = kvDist.get('xsec_token', '')
-            xsec_source = kvDist.get('xsec_source', 'pc_search')
-            while True:
-                success, msg, res_json = self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token,
-                                                                         xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_list
+        return self._collect(self.iter_user_collect_notes(user_url, cookies_str, proxies=proxies), "notes")
 
     def get_note_info(self, url: str, cookies_str: str, proxies: dict = None):
         """
@@ -434,37 +732,21 @@ class XHS_Apis():
             返回笔记的详细
         """
         res_json = None
-        success = True
-        msg = ""
+        self._local.status_code = None
         try:
-            urlParse = urllib.parse.urlparse(url)
-            note_id = urlParse.path.split("/")[-1]
-            # 使用 parse_qs 安全解析查询参数，避免 xsec_token 中的 '=' 被截断
-            kvDist = {k: v[0] for k, v in urllib.parse.parse_qs(urlParse.query).items()}
-            api = f"/api/sns/web/v1/feed"
-            data = {
-                "source_note_id": note_id,
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ],
-                "extra": {
-                    "need_body_topic": "1"
-                },
-                "xsec_source": kvDist.get('xsec_source', 'pc_search'),
-                "xsec_token": kvDist.get('xsec_token', '')
-            }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            # 检查 HTTP 状态码，461 表示触发了反爬验证
-            if response.status_code == 461:
-                logger.warning(f"XHS API 返回 461，降级为网页解析: note_id={note_id}")
+            note_id, kvDist = self.parse_url(url)
+            # 刚收到过 461 时 API 大概率仍被拦截，惩罚期内直接走网页解析，省掉一次必然失败的请求
+            if self.rate_limiter is not None and self.rate_limiter.in_penalty("feed"):
                 return self._get_note_info_by_web(url, cookies_str, proxies)
-            elif response.status_code != 200:
+            api, data = self.build_note_info(note_id, kvDist.get('xsec_token', ''), kvDist.get('xsec_source', 'pc_search'))
+            headers, cookies, body = self.sign(api, data, cookies_str)
+            response = self._post(self.base_url + api, headers=headers, data=body, cookies=cookies, proxies=proxies)
+            # 检查 HTTP 状态码，461 表示触发了反爬验证
+            if response.status_code != 200:
                 logger.warning(f"XHS API 返回 {response.status_code}，降级为网页解析: note_id={note_id}")
                 return self._get_note_info_by_web(url, cookies_str, proxies)
+            res_json = response.json()
+            success, msg = True, ""
         except Exception as e:
             success = False
             msg = str(e)
@@ -477,111 +759,18 @@ class XHS_Apis():
             并转换为与 API 返回一致的格式
         """
         try:
-            urlParse = urllib.parse.urlparse(url)
-            note_id = urlParse.path.split("/")[-1]
-
             headers = get_common_headers()
             cookies_dict = trans_cookies(cookies_str)
-            response = requests.get(url, headers=headers, cookies=cookies_dict, proxies=proxies, timeout=15)
+            response = self._get(url, headers=headers, cookies=cookies_dict, proxies=proxies)
 
             if response.status_code != 200:
                 return False, f"网页请求失败: HTTP {response.status_code}", None
+            return self.parse_note_html(response.text, url)
 
-            # 从 HTML 中提取 __INITIAL_STATE__
-            match = re.search(r'window\.__INITIAL_STATE__\s*=\s*({.*?})\s*</script>', response.text, re.DOTALL)
-            if not match:
-                return False, "无法从网页中提取笔记数据", None
-
-            raw = match.group(1).replace('undefined', 'null')
-            state = json.loads(raw)
-
-            note_detail_map = state.get('note', {}).get('noteDetailMap', {})
-            note_state = note_detail_map.get(note_id, {})
-            note = note_state.get('note', {})
-
-            if not note:
-                return False, "网页中未找到笔记数据，笔记可能已被删除", None
-
-            # 转换为与 API 返回一致的 items 格式
-            item = self._convert_web_note_to_api_format(note, url)
-            res_json = {
-                "code": 0,
-                "success": True,
-                "data": {"items": [item]},
-                "msg": ""
-            }
-            logger.info(f"网页解析获取笔记成功: note_id={note_id}, title={note.get('title', '')}")
-            return True, "获取成功(网页解析)", res_json
-
-        except json.JSONDecodeError as e:
-            logger.error(f"解析网页 JSON 失败: {e}")
-            return False, f"网页数据解析失败: {e}", None
         except Exception as e:
             logger.error(f"网页解析获取笔记失败: {e}", exc_info=True)
             return False, f"网页解析失败: {str(e)}", None
 
-    @staticmethod
-    def _convert_web_note_to_api_format(note: dict, url: str) -> dict:
-        """将网页 __INITIAL_STATE__ 中的笔记数据转换为 API items 格式"""
-        user = note.get('user', {})
-        interact = note.get('interactInfo', {})
-
-        # 处理图片列表：将 web 格式的 infoList 转换为 API 格式
-        image_list = []
-        for img in note.get('imageList', []):
-            info_list = []
-            for info in img.get('infoList', []):
-                info_list.append({
-                    'image_scene': info.get('imageScene', ''),
-                    'url': info.get('url', '')
-                })
-            image_list.append({
-                'info_list': info_list,
-                'url_default': img.get('urlDefault', ''),
-                'height': img.get('height', 0),
-                'width': img.get('width', 0),
-            })
-
-        # 处理视频数据
-        video = {}
-        if note.get('type') == 'video' and note.get('video'):
-            video_data = note['video']
-            video = {
-                'media': video_data.get('media', {}),
-                'image': video_data.get('image', {}),
-                'capa': video_data.get('capa', {}),
-                'consumer': video_data.get('consumer', {}),
-            }
-
-        note_card = {
-            'type': note.get('type', 'normal'),
-            'user': {
-                'user_id': user.get('userId', ''),
-                'nickname': user.get('nickname', ''),
-                'avatar': user.get('avatar', ''),
-            },
-            'title': note.get('title', ''),
-            'desc': note.get('desc', ''),
-            'interact_info': {
-                'liked_count': interact.get('likedCount', '0'),
-                'collected_count': interact.get('collectedCount', '0'),
-                'comment_count': interact.get('commentCount', '0'),
-                'share_count': interact.get('shareCount', '0'),
-            },
-            'image_list': image_list,
-            'tag_list': [{'name': t.get('name', '')} for t in note.get('tagList', [])],
-            'time': note.get('time', 0),
-            'ip_location': note.get('ipLocation', '未知'),
-        }
-        if video:
-            note_card['video'] = video
-
-        return {
-            'id': note.get('noteId', ''),
-            'url': url,
-            'note_card': note_card,
-        }
-
 
     def get_search_keyword(self, word: str, cookies_str: str, proxies: dict = None):
         """
@@ -590,21 +779,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回搜索关键词
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/v1/search/recommend"
-            params = {
-                "keyword": urllib.parse.quote(word)
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_search_keyword, word, cookies_str=cookies_str, proxies=proxies)
 
     def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
         """
@@ -619,99 +794,18 @@ class XHS_Apis():
             :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
             返回搜索的结果
         """
-        res_json = None
-        sort_type = "general"
-        if sort_type_choice == 1:
-            sort_type = "time_descending"
-        elif sort_type_choice == 2:
-            sort_type = "popularity_descending"
-        elif sort_type_choice == 3:
-            sort_type = "comment_descending"
-        elif sort_type_choice == 4:
-            sort_type = "collect_descending"
-        filter_note_type = "不限"
-        if note_type == 1:
-            filter_note_type = "视频笔记"
-        elif note_type == 2:
-            filter_note_type = "普通笔记"
-        filter_note_time = "不限"
-        if note_time == 1:
-            filter_note_time = "一天内"
-        elif note_time == 2:
-            filter_note_time = "一周内"
-        elif note_time == 3:
-            filter_note_time = "半年内"
-        filter_note_range = "不限"
-        if note_range == 1:
-            filter_note_range = "已看过"
-        elif note_range == 2:
-            filter_note_range = "未看过"
-        elif note_range == 3:
-            filter_note_range = "已关注"
-        filter_pos_distance = "不限"
-        if pos_distance == 1:
-            filter_pos_distance = "同城"
-        elif pos_distance == 2:
-            filter_pos_distance = "附近"
-        if geo:
-            geo = json.dumps(geo, separators=(',', ':'))
-        try:
-            api = "/api/sns/web/v1/search/notes"
-            data = {
-                "keyword": query,
-                "page": page,
-                "page_size": 20,
-                "search_id": generate_x_b3_traceid(21),
-                "sort": "general",
-                "note_type": 0,
-                "ext_flags": [],
-                "filters": [
-                    {
-                        "tags": [
-                            sort_type
-                        ],
-                        "type": "sort_type"
-                    },
-                    {
-                        "tags": [
-                            filter_note_type
-                        ],
-                        "type": "filter_note_type"
-                    },
-                    {
-                        "tags": [
-                            filter_note_time
-                        ],
-                        "type": "filter_note_time"
-                    },
-                    {
-                        "tags": [
-                            filter_note_range
-                        ],
-                        "type": "filter_note_range"
-                    },
-                    {
-                        "tags": [
-                            filter_pos_distance
-                        ],
-                        "type": "filter_pos_distance"
-                    }
-                ],
-                "geo": geo,
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ]
-            }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_search_note, query, page, sort_type_choice, note_type, note_time, note_range,
+                          pos_distance, geo, cookies_str=cookies_str, proxies=proxies)
+
+    def iter_search_notes(self, query: str, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", page=1, proxies: dict = None):
+        """
+            逐页获取搜索笔记的结果，yield (页码, data)，参数含义同 search_note
+            :param page: 起始页码，从上次的页码 + 1 开始可断点继续
+        """
+        yield from self._iter_numbered_pages(
+            lambda page: self.search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies),
+            "items", page,
+        )
 
     def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
         """
@@ -727,26 +821,9 @@ class XHS_Apis():
             :param geo: 定位信息 经纬度
             返回搜索的结果
         """
-        page = 1
-        note_list = []
-        try:
-            while True:
-                success, msg, res_json = self.search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "items" not in res_json["data"]:
-                    break
-                notes = res_json["data"]["items"]
-                note_list.extend(notes)
-                page += 1
-                if len(note_list) >= require_num or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        if len(note_list) > require_num:
-            note_list = note_list[:require_num]
-        return success, msg, note_list
+        pages = (data for _, data in self.iter_search_notes(query, cookies_str, sort_type_choice, note_type, note_time,
+                                                            note_range, pos_distance, geo, proxies=proxies))
+        return self._collect(pages, "items", require_num)
 
     def search_user(self, query: str, cookies_str: str, page=1, proxies: dict = None):
         """
@@ -756,27 +833,13 @@ class XHS_Apis():
             :param page 搜索的页数
             返回搜索的结果
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/v1/search/usersearch"
-            data = {
-                "search_user_request": {
-                    "keyword": query,
-                    "search_id": generate_x_b3_traceid(21),
-                    "page": page,
-                    "page_size": 15,
-                    "biz_type": "web_search_user",
-                    "request_id": generate_x_b3_traceid(21)
-                }
-            }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_search_user, query, page, cookies_str=cookies_str, proxies=proxies)
+
+    def iter_search_users(self, query: str, cookies_str: str, page=1, proxies: dict = None):
+        """逐页获取搜索用户的结果，yield (页码, data)"""
+        yield from self._iter_numbered_pages(
+            lambda page: self.search_user(query, cookies_str, page, proxies), "users", page,
+        )
 
     def search_some_user(self, query: str, require_num: int, cookies_str: str, proxies: dict = None):
         """
@@ -786,26 +849,8 @@ class XHS_Apis():
             :param cookies_str 你的cookies
             返回搜索的结果
         """
-        page = 1
-        user_list = []
-        try:
-            while True:
-                success, msg, res_json = self.search_user(query, cookies_str, page, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "users" not in res_json["data"]:
-                    break
-                users = res_json["data"]["users"]
-                user_list.extend(users)
-                page += 1
-                if len(user_list) >= require_num or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        if len(user_list) > require_num:
-            user_list = user_list[:require_num]
-        return success, msg, user_list
+        pages = (data for _, data in self.iter_search_users(query, cookies_str, proxies=proxies))
+        return self._collect(pages, "users", require_num)
 
     def get_note_out_comment(self, note_id: str, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
         """
@@ -815,25 +860,15 @@ class XHS_Apis():
             :param cookies_str 你的cookies
             返回指定位置的笔记一级评论
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/v2/comment/page"
-            params = {
-                "note_id": note_id,
-                "cursor": cursor,
-                "top_comment_id": "",
-                "image_formats": "jpg,webp,avif",
-                "xsec_token": xsec_token
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_note_out_comment, note_id, cursor, xsec_token,
+                          cookies_str=cookies_str, proxies=proxies)
+
+    def iter_note_out_comments(self, note_id: str, xsec_token: str, cookies_str: str, cursor: str = '', proxies: dict = None):
+        """逐页获取笔记一级评论，yield 每页 data（comments / cursor / has_more）"""
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies),
+            "comments", cursor,
+        )
 
     def get_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None):
         """
@@ -842,25 +877,7 @@ class XHS_Apis():
             :param cookies_str 你的cookies
             返回笔记的全部一级评论
         """
-        cursor = ''
-        note_out_comment_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_out_comment_list.extend(comments)
-                if len(note_out_comment_list) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_out_comment_list
+        return self._collect(self.iter_note_out_comments(note_id, xsec_token, cookies_str, proxies=proxies), "comments")
 
     def get_note_inner_comment(self, comment: dict, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
         """
@@ -870,27 +887,22 @@ class XHS_Apis():
             :param cookies_str 你的cookies
             返回指定位置的笔记二级评论
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/v2/comment/sub/page"
-            params = {
-                "note_id": comment['note_id'],
-                "root_comment_id": comment['id'],
-                "num": "10",
-                "cursor": cursor,
-                "image_formats": "jpg,webp,avif",
-                "top_comment_id": '',
-                "xsec_token": xsec_token
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_note_inner_comment, comment, cursor, xsec_token,
+                          cookies_str=cookies_str, proxies=proxies)
+
+    def iter_note_inner_comments(self, comment: dict, xsec_token: str, cookies_str: str, cursor: str = None, proxies: dict = None):
+        """
+            逐页获取一条一级评论下剩余的二级评论，yield 每页 data（comments / cursor / has_more）
+            :param cursor: 起始游标，默认从 comment['sub_comment_cursor'] 开始；一级评论没有更多回复时不发请求
+        """
+        if cursor is None:
+            if not comment['sub_comment_has_more']:
+                return
+            cursor = comment['sub_comment_cursor']
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies),
+            "comments", cursor, stop_on_empty=False,
+        )
 
     def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None):
         """
@@ -899,54 +911,114 @@ class XHS_Apis():
             :param cookies_str 你的cookies
             返回笔记的全部二级评论
         """
-        try:
-            if not comment['sub_comment_has_more']:
-                return True, 'success', comment
-            cursor = comment['sub_comment_cursor']
-            inner_comment_list = []
-            while True:
-                success, msg, res_json = self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                inner_comment_list.extend(comments)
-                if not res_json["data"]["has_more"]:
-                    break
+        success, msg, inner_comment_list = self._collect(
+            self.iter_note_inner_comments(comment, xsec_token, cookies_str, proxies=proxies), "comments"
+        )
+        if success:
             comment['sub_comments'].extend(inner_comment_list)
-        except Exception as e:
-            success = False
-            msg = str(e)
         return success, msg, comment
 
-    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None):
+    def iter_note_comments(self, note_id: str, xsec_token: str, cookies_str: str, workers: int = 4, max_comments: int = None,
+                           max_replies: int = None, request_slot=None, expand_errors: list = None, proxies: dict = None):
+        """
+            按原顺序逐条产出笔记的一级评论，每条的二级评论已展开到 sub_comments
+            一级评论在当前线程翻页，二级评论交给最多 workers 个线程并发展开；在途的展开最多 workers * 2 条，
+            排在前面的评论展开完就先产出，不必等整篇评论翻完
+            :param workers: 并发展开二级评论的线程数，1 为串行
+            :param max_comments: 一级评论条数上限，None 为不限
+            :param max_replies: 整篇笔记额外展开的二级评论总数上限（不含一级评论自带的回复），0 为不展开，None 为不限；
+                并发展开时先完成的评论先占用额度
+            :param request_slot: 每次请求前额外占用的槽位（返回上下文管理器），用于接入外部的全局并发限制
+            :param expand_errors: 传入列表时，二级评论展开失败不中断：异常追加到该列表，该评论带着已取到的回复照常产出
+            失败时抛出 XHSApiError，已产出的评论不受影响
+        """
+        slot = request_slot or nullcontext
+        budget_lock = threading.Lock()
+        remaining = [max_replies]
+        stop = threading.Event()
+
+        def take(replies: list) -> list:
+            with budget_lock:
+                if remaining[0] is None:
+                    return replies
+                replies = replies[:remaining[0]]
+                remaining[0] -= len(replies)
+                return replies
+
+        def exhausted() -> bool:
+            with budget_lock:
+                return remaining[0] is not None and remaining[0] <= 0
+
+        def fetch_out(cursor):
+            with slot():
+                return self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
+
+        def fetch_inner(comment, cursor):
+            with slot():
+                return self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
+
+        def expand(comment: dict) -> dict:
+            if not comment.get('sub_comment_has_more') or exhausted():
+                return comment
+            pages = self._iter_cursor_pages(lambda cursor: fetch_inner(comment, cursor), "comments",
+                                            comment['sub_comment_cursor'], stop_on_empty=False)
+            try:
+                for data in pages:
+                    comment['sub_comments'].extend(take(data["comments"]))
+                    if stop.is_set() or exhausted():
+                        pages.close()
+                        break
+            except Exception as e:
+                if expand_errors is None:
+                    raise
+                expand_errors.append(e)
+            return comment
+
+        comments = self.iter_items(self._iter_cursor_pages(fetch_out, "comments"), "comments")
+        if max_comments is not None:
+            comments = itertools.islice(comments, max_comments)
+        if workers <= 1 or max_replies == 0:
+            for comment in comments:
+                yield expand(comment)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="comment-expander")
+        pending = deque()
+        try:
+            for comment in comments:
+                pending.append(pool.submit(expand, comment))
+                # 在途已满时等队首；队首已完成时顺带产出
+                while pending and (len(pending) >= workers * 2 or pending[0].done()):
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # 调用方提前停止或出错：不再翻后续的二级评论页
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None, workers: int = 4,
+                             max_comments: int = None, max_replies: int = None):
         """
-            获取一篇文章的所有评论
-            :param note_id: 你想要获取的笔记的id
+            获取一篇文章的所有评论，二级评论并发展开
+            :param url: 笔记的url（包含xsec_token）
             :param cookies_str: 你的cookies
-            返回一篇文章的所有评论
+            :param workers / max_comments / max_replies: 同 iter_note_comments
+            返回一篇文章的所有评论；二级评论展开失败时仍返回全部一级评论（带已取到的回复），success 为 False
         """
-        out_comment_list = []
+        note_id, kvDist = self.parse_url(url)
+        comment_list = []
+        expand_errors = []
         try:
-            urlParse = urllib.parse.urlparse(url)
-            note_id = urlParse.path.split("/")[-1]
-            # 使用 parse_qs 安全解析查询参数，避免 xsec_token 中的 '=' 被截断
-            kvDist = {k: v[0] for k, v in urllib.parse.parse_qs(urlParse.query).items()}
-            xsec_token = kvDist.get('xsec_token', '')
-            success, msg, out_comment_list = self.get_note_all_out_comment(note_id, xsec_token, cookies_str, proxies)
-            if not success:
-                raise Exception(msg)
-            for comment in out_comment_list:
-                success, msg, new_comment = self.get_note_all_inner_comment(comment, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
+            for comment in self.iter_note_comments(note_id, kvDist.get('xsec_token', ''), cookies_str, workers,
+                                                   max_comments, max_replies, expand_errors=expand_errors,
+                                                   proxies=proxies):
+                comment_list.append(comment)
         except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, out_comment_list
+            return False, str(e), comment_list
+        if expand_errors:
+            return False, str(expand_errors[0]), comment_list
+        return True, 'success', comment_list
 
     def get_unread_message(self, cookies_str: str, proxies: dict = None):
         """
@@ -954,17 +1026,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回未读消息
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/unread_count"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_unread_message, cookies_str=cookies_str, proxies=proxies)
 
     def get_metions(self, cursor: str, cookies_str: str, proxies: dict = None):
         """
@@ -973,22 +1035,13 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回评论和@提醒
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/v1/you/mentions"
-            params = {
-                "num": "20",
-                "cursor": cursor
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_metions, cursor, cookies_str=cookies_str, proxies=proxies)
+
+    def iter_metions(self, cookies_str: str, cursor: str = '', proxies: dict = None):
+        """逐页获取评论和@提醒，yield 每页 data（message_list / cursor / has_more）"""
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_metions(cursor, cookies_str, proxies), "message_list", cursor, stop_on_empty=False,
+        )
 
     def get_all_metions(self, cookies_str: str, proxies: dict = None):
         """
@@ -996,25 +1049,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回全部的评论和@提醒
         """
-        cursor = ''
-        metions_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_metions(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                metions = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                metions_list.extend(metions)
-                if not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, metions_list
+        return self._collect(self.iter_metions(cookies_str, proxies=proxies), "message_list")
 
     def get_user_collect_notes(self, user_id: str, cookies_str: str, cursor: str = '', xsec_token: str = '', xsec_source: str = 'pc_user', proxies: dict = None):
         """
@@ -1027,29 +1062,15 @@ class XHS_Apis():
             :param proxies: 代理设置，可选
             返回用户收藏笔记列表
         """
-        res_json = None
-        try:
-            api = f"/api/sns/web/v2/note/collect/page"
-            params = {
-                "num": "30",
-                "cursor": cursor,
-                "user_id": user_id,
-                "image_formats": "jpg,webp,avif",
-            }
-            if xsec_token:
-                params["xsec_token"] = xsec_token
-            if xsec_source:
-                params["xsec_source"] = xsec_source
-            
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_user_collect_note_info, user_id, cursor, xsec_token, xsec_source, True,
+                          cookies_str=cookies_str, proxies=proxies)
+
+    def iter_user_collect_notes_by_id(self, user_id: str, cookies_str: str, cursor: str = '', xsec_token: str = '', xsec_source: str = 'pc_user', proxies: dict = None):
+        """逐页获取用户收藏笔记（直接使用 user_id），yield 每页 data（notes / cursor / has_more）"""
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_user_collect_notes(user_id, cookies_str, cursor, xsec_token, xsec_source, proxies),
+            "notes", cursor,
+        )
 
     def get_user_all_collect_notes(self, user_id: str, cookies_str: str, xsec_token: str = '', xsec_source: str = 'pc_user', proxies: dict = None):
         """
@@ -1061,27 +1082,8 @@ class XHS_Apis():
             :param proxies: 代理设置，可选
             返回用户所有收藏笔记列表
         """
-        cursor = ''
-        note_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_user_collect_notes(user_id, cookies_str, cursor, xsec_token, xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                if 'data' not in res_json or 'notes' not in res_json['data']:
-                    break
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"].get("has_more", False):
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_list
+        return self._collect(self.iter_user_collect_notes_by_id(user_id, cookies_str, xsec_token=xsec_token,
+                                                                xsec_source=xsec_source, proxies=proxies), "notes")
 
     def get_likesAndcollects(self, cursor: str, cookies_str: str, proxies: dict = None):
         """
@@ -1090,22 +1092,14 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回赞和收藏
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/v1/you/likes"
-            params = {
-                "num": "20",
-                "cursor": cursor
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_likesAndcollects, cursor, cookies_str=cookies_str, proxies=proxies)
+
+    def iter_likesAndcollects(self, cookies_str: str, cursor: str = '', proxies: dict = None):
+        """逐页获取赞和收藏，yield 每页 data（message_list / cursor / has_more）"""
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_likesAndcollects(cursor, cookies_str, proxies), "message_list", cursor,
+            stop_on_empty=False,
+        )
 
     def get_all_likesAndcollects(self, cookies_str: str, proxies: dict = None):
         """
@@ -1113,25 +1107,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回全部的赞和收藏
         """
-        cursor = ''
-        likesAndcollects_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_likesAndcollects(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                likesAndcollects = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                likesAndcollects_list.extend(likesAndcollects)
-                if not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, likesAndcollects_list
+        return self._collect(self.iter_likesAndcollects(cookies_str, proxies=proxies), "message_list")
 
     def get_new_connections(self, cursor: str, cookies_str: str, proxies: dict = None):
         """
@@ -1140,22 +1116,14 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回新增关注
         """
-        res_json = None
-        try:
-            api = "/api/sns/web/v1/you/connections"
-            params = {
-                "num": "20",
-                "cursor": cursor
-            }
-            splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
-            success, msg = res_json["success"], res_json["msg"]
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, res_json
+        return self._call(self.build_new_connections, cursor, cookies_str=cookies_str, proxies=proxies)
+
+    def iter_new_connections(self, cookies_str: str, cursor: str = '', proxies: dict = None):
+        """逐页获取新增关注，yield 每页 data（message_list / cursor / has_more）"""
+        yield from self._iter_cursor_pages(
+            lambda cursor: self.get_new_connections(cursor, cookies_str, proxies), "message_list", cursor,
+            stop_on_empty=False,
+        )
 
     def get_all_new_connections(self, cookies_str: str, proxies: dict = None):
         """
@@ -1163,25 +1131,7 @@ class XHS_Apis():
             :param cookies_str: 你的cookies
             返回全部的新增关注
         """
-        cursor = ''
-        connections_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_new_connections(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                connections = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                connections_list.extend(connections)
-                if not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, connections_list
+        return self._collect(self.iter_new_connections(cookies_str, proxies=proxies), "message_list")
 
     @staticmethod
     def get_note_no_water_video(note_id):
@@ -1196,7 +1146,7 @@ class XHS_Apis():
         try:
             headers = get_common_headers()
             url = f"https://www.xiaohongshu.com/explore/{note_id}"
-            response = requests.get(url, headers=headers)
+            response = requests.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
             res = response.text
             video_addr = re.findall(r'<meta name="og:video" content="(.*?)">', res)[0]
         except Exception as e:
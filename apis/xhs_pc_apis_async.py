@@ -0,0 +1,554 @@
+# encoding: utf-8
+"""
+    小红书 api 的异步版本（httpx.AsyncClient）
+    请求构造、签名参数和响应解析与 XHS_Apis 共用 XHSRequestBuilder，接口返回值保持 (success, msg, data)；
+    签名可能调用 node / execjs，放到线程里执行，不阻塞事件循环
+    iter_* 为异步翻页器：每收到一页就 yield 该页 data，失败时抛出 XHSApiError
+"""
+import asyncio
+import contextvars
+from http.cookiejar import DefaultCookiePolicy
+
+import httpx
+from loguru import logger
+
+from apis.xhs_pc_apis import DEFAULT_TIMEOUT, XHSApiError, XHSRequestBuilder
+from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.rate_limiter import RateLimiter
+from xhs_utils.xhs_util import get_common_headers
+
+# 当前任务最近一次接口调用收到的 HTTP 状态码（asyncio 任务各自一份，相当于同步版的 threading.local）
+_status_code: contextvars.ContextVar = contextvars.ContextVar("xhs_async_status_code", default=None)
+
+
+class AsyncXHS_Apis(XHSRequestBuilder):
+    def __init__(self, pool_size: int = 10, timeout: tuple = DEFAULT_TIMEOUT, max_retries: int = 2,
+                 proxy: str | None = None, transport: httpx.AsyncBaseTransport | None = None,
+                 rate_limiter: RateLimiter | None = None, on_response=None):
+        """
+            :param pool_size: 最大连接数（同时也是 keep-alive 连接数），超出的请求排队等待连接
+            :param timeout: (连接超时, 读取超时)，作用于每一个请求
+            :param max_retries: 连接失败（请求未发出）时的重试次数，读超时和非 200 响应不重试
+            :param proxy: 代理地址（可选），作用于该客户端的所有请求
+            :param transport: 自定义传输层（测试时传入 httpx.MockTransport）
+            :param rate_limiter: 可选，按接口族限速（可与同步客户端共用同一个限速器）
+            :param on_response: 可选，每个响应的回调 on_response(cookies: dict, status_code)，用于按账号统计健康度
+        """
+        self.rate_limiter = rate_limiter
+        self.on_response = on_response
+        connect_timeout, read_timeout = timeout
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(
+                retries=max_retries,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                proxy=proxy,
+            )
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            follow_redirects=True,
+        )
+        # 与同步会话一致：不保存服务端下发的 Cookie，每次请求显式带上调用方的 cookies
+        self.client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    @staticmethod
+    def _with_cookies(headers: dict, cookies: dict) -> dict:
+        headers = dict(headers)
+        headers["cookie"] = "; ".join(f"{key}={value}" for key, value in cookies.items())
+        return headers
+
+    async def _request(self, method: str, url: str, cookies: dict | None = None, **kwargs) -> httpx.Response:
+        """发请求前按接口族取令牌，收到响应后把状态码反馈给限速器和 on_response"""
+        bucket = self.rate_limiter.bucket_for(url) if self.rate_limiter is not None else None
+        if bucket is not None:
+            wait = bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        response = await self.client.request(method, url, **kwargs)
+        if bucket is not None:
+            bucket.record(response.status_code)
+        _status_code.set(response.status_code)
+        if self.on_response is not None:
+            self.on_response(cookies, response.status_code)
+        return response
+
+    async def _send(self, api: str, data, cookies_str: str) -> httpx.Response:
+        headers, cookies, body = await asyncio.to_thread(self.sign, api, data, cookies_str)
+        headers = self._with_cookies(headers, cookies)
+        if body is None:
+            return await self._request("GET", self.base_url + api, cookies=cookies, headers=headers)
+        return await self._request("POST", self.base_url + api, cookies=cookies, headers=headers, content=body)
+
+    @staticmethod
+    def last_status_code() -> int | None:
+        """当前任务最近一次接口调用收到的 HTTP 状态码，含义同 XHS_Apis.last_status_code"""
+        return _status_code.get()
+
+    async def _call(self, build, *args, cookies_str: str):
+        """构造、签名并发送单个接口请求，返回 (success, msg, res_json)"""
+        res_json = None
+        _status_code.set(None)
+        try:
+            api, data = build(*args)
+            response = await self._send(api, data, cookies_str)
+            res_json = response.json()
+            success, msg = self.parse_result(res_json)
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def _page(self, build, *args, cookies_str: str) -> dict:
+        """翻页器用：请求一页，失败抛 XHSApiError，成功返回 data"""
+        success, msg, res_json = await self._call(build, *args, cookies_str=cookies_str)
+        if not success:
+            raise XHSApiError(msg, self.last_status_code())
+        return res_json["data"]
+
+    @staticmethod
+    async def _iter_cursor_pages(fetch, items_key: str, cursor: str = '', stop_on_empty: bool = True):
+        """
+            按 cursor 翻页的通用异步翻页器，fetch(cursor) 为返回一页 data 的协程（通常是 _page），
+            语义同 XHS_Apis._iter_cursor_pages；逐页 yield data，失败抛出 XHSApiError
+        """
+        while True:
+            data = await fetch(cursor) or {}
+            if items_key not in data or 'cursor' not in data:
+                return
+            yield data
+            cursor = str(data["cursor"])
+            if (stop_on_empty and not data[items_key]) or not data.get("has_more", False):
+                return
+
+    @staticmethod
+    async def _collect(pages, items_key: str, limit: int = None):
+        """把异步翻页器汇总成列表，返回 (success, msg, items)，取够 limit 条即停止；失败时返回已取到的部分"""
+        items = []
+        try:
+            async for data in pages:
+                items.extend(data[items_key])
+                if limit is not None and len(items) >= limit:
+                    break
+        except Exception as e:
+            return False, str(e), items[:limit]
+        finally:
+            await pages.aclose()
+        return True, 'success', items[:limit]
+
+    # ─── 单页接口 ────────────────────────────────────
+
+    async def get_homefeed_all_channel(self, cookies_str: str):
+        """获取主页的所有频道"""
+        return await self._call(self.build_homefeed_all_channel, cookies_str=cookies_str)
+
+    async def get_homefeed_recommend(self, category, cursor_score, refresh_type, note_index, cookies_str: str):
+        """获取主页推荐的笔记，参数含义同 XHS_Apis.get_homefeed_recommend"""
+        return await self._call(self.build_homefeed_recommend, category, cursor_score, refresh_type, note_index,
+                                cookies_str=cookies_str)
+
+    async def get_user_info(self, user_id: str, cookies_str: str):
+        """获取用户的信息"""
+        return await self._call(self.build_user_info, user_id, cookies_str=cookies_str)
+
+    async def get_user_self_info(self, cookies_str: str):
+        """获取用户自己的信息1"""
+        return await self._call(self.build_user_self_info, cookies_str=cookies_str)
+
+    async def get_user_self_info2(self, cookies_str: str):
+        """获取用户自己的信息2"""
+        return await self._call(self.build_user_self_info2, cookies_str=cookies_str)
+
+    async def get_user_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source=''):
+        """获取用户指定位置的笔记"""
+        return await self._call(self.build_user_note_info, user_id, cursor, xsec_token, xsec_source,
+                                cookies_str=cookies_str)
+
+    async def get_user_like_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source=''):
+        """获取用户指定位置喜欢的笔记"""
+        return await self._call(self.build_user_like_note_info, user_id, cursor, xsec_token, xsec_source,
+                                cookies_str=cookies_str)
+
+    async def get_user_collect_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='',
+                                         xsec_source=''):
+        """获取用户指定位置收藏的笔记"""
+        return await self._call(self.build_user_collect_note_info, user_id, cursor, xsec_token, xsec_source,
+                                cookies_str=cookies_str)
+
+    async def get_user_collect_notes(self, user_id: str, cookies_str: str, cursor: str = '', xsec_token: str = '',
+                                     xsec_source: str = 'pc_user'):
+        """获取用户收藏笔记列表（直接使用 user_id，空的 xsec 参数不带）"""
+        return await self._call(self.build_user_collect_note_info, user_id, cursor, xsec_token, xsec_source, True,
+                                cookies_str=cookies_str)
+
+    async def get_search_keyword(self, word: str, cookies_str: str):
+        """获取搜索关键词"""
+        return await self._call(self.build_search_keyword, word, cookies_str=cookies_str)
+
+    async def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0,
+                          note_range=0, pos_distance=0, geo=""):
+        """获取搜索笔记的结果，参数含义同 XHS_Apis.search_note"""
+        return await self._call(self.build_search_note, query, page, sort_type_choice, note_type, note_time,
+                                note_range, pos_distance, geo, cookies_str=cookies_str)
+
+    async def search_user(self, query: str, cookies_str: str, page=1):
+        """获取搜索用户的结果"""
+        return await self._call(self.build_search_user, query, page, cookies_str=cookies_str)
+
+    async def get_note_out_comment(self, note_id: str, cursor: str, xsec_token: str, cookies_str: str):
+        """获取指定位置的笔记一级评论"""
+        return await self._call(self.build_note_out_comment, note_id, cursor, xsec_token, cookies_str=cookies_str)
+
+    async def get_note_inner_comment(self, comment: dict, cursor: str, xsec_token: str, cookies_str: str):
+        """获取指定位置的笔记二级评论"""
+        return await self._call(self.build_note_inner_comment, comment, cursor, xsec_token, cookies_str=cookies_str)
+
+    async def get_unread_message(self, cookies_str: str):
+        """获取未读消息"""
+        return await self._call(self.build_unread_message, cookies_str=cookies_str)
+
+    async def get_metions(self, cursor: str, cookies_str: str):
+        """获取评论和@提醒"""
+        return await self._call(self.build_metions, cursor, cookies_str=cookies_str)
+
+    async def get_likesAndcollects(self, cursor: str, cookies_str: str):
+        """获取赞和收藏"""
+        return await self._call(self.build_likesAndcollects, cursor, cookies_str=cookies_str)
+
+    async def get_new_connections(self, cursor: str, cookies_str: str):
+        """获取新增关注"""
+        return await self._call(self.build_new_connections, cursor, cookies_str=cookies_str)
+
+    async def get_note_info(self, url: str, cookies_str: str):
+        """获取笔记的详细，优先使用API，非 200（如 461 反爬验证）时降级为网页解析"""
+        res_json = None
+        _status_code.set(None)
+        try:
+            note_id, kvDist = self.parse_url(url)
+            if self.rate_limiter is not None and self.rate_limiter.in_penalty("feed"):
+                return await self._get_note_info_by_web(url, cookies_str)
+            api, data = self.build_note_info(note_id, kvDist.get('xsec_token', ''), kvDist.get('xsec_source', 'pc_search'))
+            response = await self._send(api, data, cookies_str)
+            if response.status_code != 200:
+                logger.warning(f"XHS API 返回 {response.status_code}，降级为网页解析: note_id={note_id}")
+                return await self._get_note_info_by_web(url, cookies_str)
+            res_json = response.json()
+            success, msg = True, ""
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def _get_note_info_by_web(self, url: str, cookies_str: str):
+        """通过网页解析获取笔记详情（降级方案）"""
+        try:
+            cookies = trans_cookies(cookies_str)
+            headers = self._with_cookies(get_common_headers(), cookies)
+            response = await self._request("GET", url, cookies=cookies, headers=headers)
+            if response.status_code != 200:
+                return False, f"网页请求失败: HTTP {response.status_code}", None
+            return self.parse_note_html(response.text, url)
+        except Exception as e:
+            logger.error(f"网页解析获取笔记失败: {e}", exc_info=True)
+            return False, f"网页解析失败: {str(e)}", None
+
+    # ─── 异步翻页器 ──────────────────────────────────
+
+    async def iter_homefeed_recommend(self, category, cookies_str: str):
+        """逐页获取主页推荐的笔记，yield 每页 data（items / cursor_score）"""
+        cursor_score, refresh_type, note_index = "", 1, 0
+        while True:
+            data = await self._page(self.build_homefeed_recommend, category, cursor_score, refresh_type, note_index,
+                                    cookies_str=cookies_str)
+            if "items" not in data:
+                return
+            yield data
+            cursor_score = data["cursor_score"]
+            refresh_type = 3
+            note_index += 20
+
+    async def iter_user_notes(self, user_url: str, cookies_str: str, cursor: str = ''):
+        """逐页获取用户笔记，yield 每页 data（notes / cursor / has_more），传入上次的 data["cursor"] 可断点继续"""
+        user_id, kvDist = self.parse_url(user_url)
+        xsec_token = kvDist.get('xsec_token', '')
+        xsec_source = kvDist.get('xsec_source', 'pc_search')
+        while True:
+            data = await self._page(self.build_user_note_info, user_id, cursor, xsec_token, xsec_source,
+                                    cookies_str=cookies_str)
+            yield data
+            if not data.get("notes") or not data.get("has_more") or 'cursor' not in data:
+                return
+            cursor = str(data["cursor"])
+
+    async def iter_user_like_notes(self, user_url: str, cookies_str: str, cursor: str = ''):
+        """逐页获取用户喜欢的笔记，yield 每页 data（notes / cursor / has_more）"""
+        user_id, kvDist = self.parse_url(user_url)
+        xsec_token = kvDist.get('xsec_token', '')
+        xsec_source = kvDist.get('xsec_source', 'pc_user')
+        async for data in self._iter_cursor_pages(
+                lambda cursor: self._page(self.build_user_like_note_info, user_id, cursor, xsec_token, xsec_source,
+                                          cookies_str=cookies_str),
+                "notes", cursor):
+            yield data
+
+    async def iter_user_collect_notes(self, user_url: str, cookies_str: str, cursor: str = ''):
+        """逐页获取用户收藏的笔记，yield 每页 data（notes / cursor / has_more）"""
+        user_id, kvDist = self.parse_url(user_url)
+        xsec_token = kvDist.get('xsec_token', '')
+        xsec_source = kvDist.get('xsec_source', 'pc_search')
+        async for data in self._iter_cursor_pages(
+                lambda cursor: self._page(self.build_user_collect_note_info, user_id, cursor, xsec_token, xsec_source,
+                                          cookies_str=cookies_str),
+                "notes", cursor):
+            yield data
+
+    async def iter_user_collect_notes_by_id(self, user_id: str, cookies_str: str, cursor: str = '',
+                                            xsec_token: str = '', xsec_source: str = 'pc_user'):
+        """逐页获取用户收藏笔记（直接使用 user_id），yield 每页 data（notes / cursor / has_more）"""
+        async for data in self._iter_cursor_pages(
+                lambda cursor: self._page(self.build_user_collect_note_info, user_id, cursor, xsec_token, xsec_source,
+                                          True, cookies_str=cookies_str),
+                "notes", cursor):
+            yield data
+
+    async def iter_metions(self, cookies_str: str, cursor: str = ''):
+        """逐页获取评论和@提醒，yield 每页 data（message_list / cursor / has_more）"""
+        async for data in self._iter_cursor_pages(
+                lambda cursor: self._page(self.build_metions, cursor, cookies_str=cookies_str),
+                "message_list", cursor, stop_on_empty=False):
+            yield data
+
+    async def iter_likesAndcollects(self, cookies_str: str, cursor: str = ''):
+        """逐页获取赞和收藏，yield 每页 data（message_list / cursor / has_more）"""
+        async for data in self._iter_cursor_pages(
+                lambda cursor: self._page(self.build_likesAndcollects, cursor, cookies_str=cookies_str),
+                "message_list", cursor, stop_on_empty=False):
+            yield data
+
+    async def iter_new_connections(self, cookies_str: str, cursor: str = ''):
+        """逐页获取新增关注，yield 每页 data（message_list / cursor / has_more）"""
+        async for data in self._iter_cursor_pages(
+                lambda cursor: self._page(self.build_new_connections, cursor, cookies_str=cookies_str),
+                "message_list", cursor, stop_on_empty=False):
+            yield data
+
+    async def iter_search_notes(self, query: str, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0,
+                                note_range=0, pos_distance=0, geo="", page=1):
+        """逐页获取搜索笔记结果，yield (页码, data)"""
+        while True:
+            data = await self._page(self.build_search_note, query, page, sort_type_choice, note_type, note_time,
+                                    note_range, pos_distance, geo, cookies_str=cookies_str)
+            if "items" not in data:
+                return
+            yield page, data
+            if not data.get("has_more"):
+                return
+            page += 1
+
+    async def iter_search_users(self, query: str, cookies_str: str, page=1):
+        """逐页获取搜索用户结果，yield (页码, data)"""
+        while True:
+            data = await self._page(self.build_search_user, query, page, cookies_str=cookies_str)
+            if "users" not in data:
+                return
+            yield page, data
+            if not data.get("has_more"):
+                return
+            page += 1
+
+    async def iter_note_out_comments(self, note_id: str, xsec_token: str, cookies_str: str, cursor: str = ''):
+        """逐页获取笔记一级评论，yield 每页 data（comments / cursor / has_more）"""
+        while True:
+            data = await self._page(self.build_note_out_comment, note_id, cursor, xsec_token, cookies_str=cookies_str)
+            if 'cursor' not in data:
+                return
+            yield data
+            if not data.get("comments") or not data.get("has_more"):
+                return
+            cursor = str(data["cursor"])
+
+    async def iter_note_inner_comments(self, comment: dict, xsec_token: str, cookies_str: str, cursor: str = None):
+        """逐页获取一条一级评论下剩余的二级评论，yield 每页 data；默认从 sub_comment_cursor 开始，没有更多回复时不发请求"""
+        if cursor is None:
+            if not comment['sub_comment_has_more']:
+                return
+            cursor = comment['sub_comment_cursor']
+        while True:
+            data = await self._page(self.build_note_inner_comment, comment, cursor, xsec_token,
+                                    cookies_str=cookies_str)
+            if 'cursor' not in data:
+                return
+            yield data
+            if not data.get("has_more"):
+                return
+            cursor = str(data["cursor"])
+
+    # ─── 多页汇总 ────────────────────────────────────
+
+    async def get_user_all_notes(self, user_url: str, cookies_str: str):
+        """获取用户所有笔记"""
+        note_list = []
+        try:
+            async for data in self.iter_user_notes(user_url, cookies_str):
+                note_list.extend(data.get("notes", []))
+        except Exception as e:
+            return False, str(e), note_list
+        return True, 'success', note_list
+
+    async def get_user_latest_notes(self, user_url: str, cookies_str: str, limit: int = 5, page_stats: dict = None,
+                                    stop_at_note_id: str = None):
+        """
+        获取用户最新的前N条笔记，凑够 limit 条或翻到 stop_at_note_id 即停止翻页
+        参数与返回值同 XHS_Apis.get_user_latest_notes
+        """
+        note_list = []
+        pages = 0
+        stopped_early = False
+        reached_known = False
+        try:
+            pager = self.iter_user_notes(user_url, cookies_str)
+            try:
+                async for data in pager:
+                    pages += 1
+                    notes = data.get("notes", [])
+                    if stop_at_note_id:
+                        for index, note in enumerate(notes):
+                            sticky = (note.get("interact_info") or {}).get("sticky", False)
+                            if note.get("note_id") == stop_at_note_id and not sticky:
+                                notes = notes[:index]
+                                reached_known = True
+                                break
+                    note_list.extend(notes)
+                    if reached_known or len(note_list) >= limit:
+                        note_list = note_list[:limit]
+                        stopped_early = bool(data.get("has_more"))
+                        break
+            finally:
+                await pager.aclose()
+            success = True
+            msg = f"成功获取 {len(note_list)} 条笔记"
+        except Exception as e:
+            success = False
+            msg = str(e)
+            note_list = []
+
+        if page_stats is not None:
+            page_stats["pages"] = pages
+            page_stats["stopped_early"] = stopped_early
+            if stop_at_note_id:
+                page_stats["reached_known"] = reached_known
+        return success, msg, note_list
+
+    async def get_homefeed_recommend_by_num(self, category, require_num, cookies_str: str):
+        """根据数量获取主页推荐的笔记"""
+        return await self._collect(self.iter_homefeed_recommend(category, cookies_str), "items", require_num)
+
+    async def get_user_all_like_note_info(self, user_url: str, cookies_str: str):
+        """获取用户所有喜欢笔记"""
+        return await self._collect(self.iter_user_like_notes(user_url, cookies_str), "notes")
+
+    async def get_user_all_collect_note_info(self, user_url: str, cookies_str: str):
+        """获取用户所有收藏笔记"""
+        return await self._collect(self.iter_user_collect_notes(user_url, cookies_str), "notes")
+
+    async def get_user_all_collect_notes(self, user_id: str, cookies_str: str, xsec_token: str = '',
+                                         xsec_source: str = 'pc_user'):
+        """获取用户所有收藏笔记（直接使用 user_id）"""
+        return await self._collect(self.iter_user_collect_notes_by_id(user_id, cookies_str, xsec_token=xsec_token,
+                                                                      xsec_source=xsec_source), "notes")
+
+    async def get_all_metions(self, cookies_str: str):
+        """获取全部的评论和@提醒"""
+        return await self._collect(self.iter_metions(cookies_str), "message_list")
+
+    async def get_all_likesAndcollects(self, cookies_str: str):
+        """获取全部的赞和收藏"""
+        return await self._collect(self.iter_likesAndcollects(cookies_str), "message_list")
+
+    async def get_all_new_connections(self, cookies_str: str):
+        """获取全部的新增关注"""
+        return await self._collect(self.iter_new_connections(cookies_str), "message_list")
+
+    async def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0,
+                               note_time=0, note_range=0, pos_distance=0, geo=""):
+        """指定数量搜索笔记"""
+        note_list = []
+        success, msg = True, 'success'
+        pager = self.iter_search_notes(query, cookies_str, sort_type_choice, note_type, note_time, note_range,
+                                       pos_distance, geo)
+        try:
+            async for _, data in pager:
+                note_list.extend(data["items"])
+                if len(note_list) >= require_num:
+                    break
+        except Exception as e:
+            success, msg = False, str(e)
+        finally:
+            await pager.aclose()
+        return success, msg, note_list[:require_num]
+
+    async def search_some_user(self, query: str, require_num: int, cookies_str: str):
+        """指定数量搜索用户"""
+        user_list = []
+        success, msg = True, 'success'
+        pager = self.iter_search_users(query, cookies_str)
+        try:
+            async for _, data in pager:
+                user_list.extend(data["users"])
+                if len(user_list) >= require_num:
+                    break
+        except Exception as e:
+            success, msg = False, str(e)
+        finally:
+            await pager.aclose()
+        return success, msg, user_list[:require_num]
+
+    async def get_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str):
+        """获取笔记的全部一级评论"""
+        comment_list = []
+        try:
+            async for data in self.iter_note_out_comments(note_id, xsec_token, cookies_str):
+                comment_list.extend(data.get("comments", []))
+        except Exception as e:
+            return False, str(e), comment_list
+        return True, 'success', comment_list
+
+    async def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str):
+        """获取一条一级评论的全部二级评论，追加到 comment['sub_comments']"""
+        try:
+            async for data in self.iter_note_inner_comments(comment, xsec_token, cookies_str):
+                comment['sub_comments'].extend(data.get("comments", []))
+        except Exception as e:
+            return False, str(e), comment
+        return True, 'success', comment
+
+    async def get_note_all_comment(self, url: str, cookies_str: str, workers: int = 4):
+        """
+            获取一篇笔记的所有评论，二级评论最多 workers 条并发展开
+            二级评论展开失败时仍返回全部一级评论（带已取到的回复），success 为 False
+        """
+        note_id, kvDist = self.parse_url(url)
+        xsec_token = kvDist.get('xsec_token', '')
+        success, msg, out_comment_list = await self.get_note_all_out_comment(note_id, xsec_token, cookies_str)
+        if not success:
+            return success, msg, out_comment_list
+        semaphore = asyncio.Semaphore(max(1, workers))
+
+        async def expand(comment: dict):
+            async with semaphore:
+                return await self.get_note_all_inner_comment(comment, xsec_token, cookies_str)
+
+        results = await asyncio.gather(*(expand(comment) for comment in out_comment_list
+                                         if comment.get('sub_comment_has_more')))
+        for success, msg, _ in results:
+            if not success:
+                return success, msg, out_comment_list
+        return True, 'success', out_comment_list
@@ -12,13 +12,19 @@ from app.config import config_map
 from app.extensions import db, jwt
 
 
-def create_app(config_name=None):
-    """创建 Flask 应用"""
+def create_app(config_name=None, overrides: dict | None = None):
+    """
+    创建 Flask 应用
+    :param overrides: 覆盖配置项，在初始化扩展之前生效（如测试用的 SQLALCHEMY_DATABASE_URI，
+        创建后再改 app.config 时引擎已按原配置建好）
+    """
     if config_name is None:
         config_name = os.getenv("FLASK_ENV", "development")
 
     app = Flask(__name__, static_folder="../static")
     app.config.from_object(config_map[config_name])
+    if overrides:
+        app.config.update(overrides)
 
     # 初始化扩展
     db.init_app(app)
@@ -44,6 +50,8 @@ def create_app(config_name=None):
 
     # 全局错误处理
     _register_error_handlers(app)
+    _register_job_queue(app)
+    _init_scheduler(app)
 
     with app.app_context():
         _register_blueprints(app)
@@ -90,6 +98,24 @@ def _register_error_handlers(app):
         return jsonify({"success": False, "msg": "请先登录"}), 401
 
 
+def _register_job_queue(app):
+    """worker 进程收到第一个请求时启动任务调度线程，继续执行重启前遗留的排队任务
+
+    不在 create_app 中直接启动：preload_app 下 master 进程创建的线程不会带进 fork 出的 worker。
+    """
+    from app.services.job_queue import job_queue
+
+    @app.before_request
+    def start_job_queue():
+        job_queue.ensure_started(app)
+
+
+def _init_scheduler(app):
+    """按配置设置 XHS / LLM 各资源的全局并发上限"""
+    from app.services.scheduler import scheduler
+    scheduler.init_app(app)
+
+
 def _register_blueprints(app):
     """注册所有 Blueprint"""
     from app.api import register_blueprints
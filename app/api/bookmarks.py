@@ -84,6 +84,16 @@ def list_bookmarks():
         type: integer
         default: 20
         description: 每页数量
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: 游标分页，传入即启用（第一页传空字符串），之后传上一页返回的 next_cursor；不传时按 page 分页
+      - in: query
+        name: with_total
+        type: boolean
+        default: false
+        description: 游标分页时是否返回 total（需要额外一次 COUNT）
     responses:
       200:
         description: 收藏列表
@@ -105,10 +115,25 @@ def list_bookmarks():
                   type: integer
                 per_page:
                   type: integer
+                next_cursor:
+                  type: string
+                has_more:
+                  type: boolean
+      400:
+        description: 游标无效
     """
     user_id = int(get_jwt_identity())
-    page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 20, type=int)
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        success, msg, result = GoalService.list_bookmarks_page(
+            user_id, cursor, per_page,
+            with_total=request.args.get("with_total", "false").lower() in ("1", "true"),
+        )
+        if not success:
+            return jsonify({"success": False, "msg": msg}), 400
+        return jsonify({"success": True, "data": result}), 200
+    page = request.args.get("page", 1, type=int)
     result = GoalService.list_bookmarks(user_id, page, per_page)
     return jsonify({"success": True, "data": result}), 200
 
@@ -1,17 +1,27 @@
 # encoding: utf-8
 """每日摘要 API: /api/digest/*"""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app.services.digest_service import DigestService
+from app.services.pagination import MAX_PER_PAGE
 
 digest_bp = Blueprint("digest", __name__)
 
 
+def _item_window() -> tuple[int, int | None]:
+    """摘要条目分批读取参数 (after, limit)"""
+    after = request.args.get("after", -1, type=int)
+    limit = request.args.get("limit", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PER_PAGE))
+    return max(after, -1), limit
+
+
 @digest_bp.route("/generate", methods=["POST"])
 @jwt_required()
 def generate_digest():
-    """触发生成每日摘要（后台线程处理）
+    """触发生成每日摘要（后台任务队列处理）
     ---
     tags:
       - 每日摘要
@@ -84,9 +94,21 @@ def digest_status():
               properties:
                 status:
                   type: string
-                  enum: [pending, processing, completed, failed, idle]
+                  enum: [processing, done, error, idle]
                 msg:
                   type: string
+                progress:
+                  type: object
+                  description: bloggers_total / bloggers_done / notes_total / notes_done
+                job:
+                  type: object
+                  description: 任务详情（queued/running/done/error、attempts、queue_seconds、run_seconds）
+                queue_position:
+                  type: integer
+                  description: 前面还在排队的任务数
+                queue_depth:
+                  type: object
+                  description: 全局排队中 / 执行中的任务数
     """
     user_id = int(get_jwt_identity())
     task = DigestService.get_task_status(user_id)
@@ -95,6 +117,73 @@ def digest_status():
     return jsonify({"success": True, "data": {"status": "idle", "msg": "无进行中的任务"}}), 200
 
 
+@digest_bp.route("/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_digest():
+    """摘要生成进度流（Server-Sent Events）
+    每生成一条摘要立即推送，无需等待整份摘要完成。
+    浏览器 EventSource 无法设置请求头，可通过 ?jwt=<token> 传递令牌。
+    每条连接最多保持 DIGEST_STREAM_TIMEOUT 秒，EventSource 会带 Last-Event-ID 自动重连续传。
+    ---
+    tags:
+      - 每日摘要
+    security:
+      - Bearer: []
+    produces:
+      - text/event-stream
+    parameters:
+      - in: query
+        name: job_id
+        type: integer
+        required: false
+        description: 任务ID，默认为最近一次摘要生成任务
+      - in: query
+        name: jwt
+        type: string
+        required: false
+        description: JWT 令牌（EventSource 使用）
+      - in: header
+        name: Last-Event-ID
+        type: integer
+        required: false
+        description: 已收到的条目数，重连时由 EventSource 自动携带
+    responses:
+      200:
+        description: |
+          事件流：
+          progress {bloggers_total, bloggers_done, notes_total, notes_done, status}；
+          item 单条摘要 {note_id, title, summary, note_type, note_url, blogger_nickname, blogger_xhs_id}；
+          reset 任务重试，之前推送的条目作废；
+          done {digest_id, msg}；error {msg}
+      404:
+        description: 没有摘要生成任务
+      503:
+        description: 本进程打开的进度流已达上限，请稍后重试或轮询 /api/digest/status
+    """
+    user_id = int(get_jwt_identity())
+    job_id = request.args.get("job_id", type=int)
+    last_event_id = request.headers.get("Last-Event-ID", 0, type=int)
+    if not DigestService.acquire_stream_slot():
+        return jsonify({"success": False, "msg": "进度流连接过多，请稍后重试或轮询 /api/digest/status"}), 503, \
+            {"Retry-After": "5"}
+    try:
+        success, msg, events = DigestService.stream_progress(user_id, job_id, last_event_id)
+    except Exception:
+        DigestService.release_stream_slot()
+        raise
+    if not success:
+        DigestService.release_stream_slot()
+        return jsonify({"success": False, "msg": msg}), 404
+    response = Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # 无论正常结束还是客户端断开，WSGI 服务器关闭响应时归还名额
+    response.call_on_close(DigestService.release_stream_slot)
+    return response
+
+
 @digest_bp.route("/latest", methods=["GET"])
 @jwt_required()
 def get_latest_digest():
@@ -104,6 +193,17 @@ def get_latest_digest():
       - 每日摘要
     security:
       - Bearer: []
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: 分批读取条目时每批条数（最多 100），不传则返回全部条目；传入时返回 next_after
+      - in: query
+        name: after
+        type: integer
+        default: -1
+        description: 只返回序号大于 after 的条目，传上一批返回的 next_after
     responses:
       200:
         description: 最新摘要
@@ -118,7 +218,7 @@ def get_latest_digest():
         description: 暂无摘要
     """
     user_id = int(get_jwt_identity())
-    digest = DigestService.get_latest_digest(user_id)
+    digest = DigestService.get_latest_digest(user_id, *_item_window())
     if digest:
         return jsonify({"success": True, "data": digest}), 200
     return jsonify({"success": False, "msg": "暂无摘要"}), 404
@@ -144,6 +244,22 @@ def get_digest_history():
         type: integer
         default: 10
         description: 每页数量
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: 游标分页，传入即启用（第一页传空字符串），之后传上一页返回的 next_cursor；不传时按 page 分页
+      - in: query
+        name: with_total
+        type: boolean
+        default: false
+        description: 游标分页时是否返回 total（需要额外一次 COUNT）
+      - in: query
+        name: view
+        type: string
+        enum: [summary, full]
+        default: summary
+        description: 游标分页时的返回格式，summary 只含 id 和时间，full 含完整摘要内容
     responses:
       200:
         description: 摘要历史
@@ -165,10 +281,26 @@ def get_digest_history():
                   type: integer
                 per_page:
                   type: integer
+                next_cursor:
+                  type: string
+                has_more:
+                  type: boolean
+      400:
+        description: 游标无效
     """
     user_id = int(get_jwt_identity())
-    page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        success, msg, result = DigestService.get_digest_history_page(
+            user_id, cursor, per_page,
+            with_total=request.args.get("with_total", "false").lower() in ("1", "true"),
+            summary=request.args.get("view", "summary") != "full",
+        )
+        if not success:
+            return jsonify({"success": False, "msg": msg}), 400
+        return jsonify({"success": True, "data": result}), 200
+    page = request.args.get("page", 1, type=int)
     result = DigestService.get_digest_history(user_id, page, per_page)
     return jsonify({"success": True, "data": result}), 200
 
@@ -188,6 +320,16 @@ def get_digest_detail(digest_id):
         type: integer
         required: true
         description: 摘要ID
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: 分批读取条目时每批条数（最多 100），不传则返回全部条目；传入时返回 next_after
+      - in: query
+        name: after
+        type: integer
+        default: -1
+        description: 只返回序号大于 after 的条目，传上一批返回的 next_after
     responses:
       200:
         description: 摘要详情
@@ -202,7 +344,7 @@ def get_digest_detail(digest_id):
         description: 摘要不存在
     """
     user_id = int(get_jwt_identity())
-    digest = DigestService.get_digest_by_id(user_id, digest_id)
+    digest = DigestService.get_digest_by_id(user_id, digest_id, *_item_window())
     if digest:
         return jsonify({"success": True, "data": digest}), 200
     return jsonify({"success": False, "msg": "摘要不存在"}), 404
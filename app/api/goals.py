@@ -71,6 +71,13 @@ def list_goals():
       - 目标规划
     security:
       - Bearer: []
+    parameters:
+      - in: query
+        name: view
+        type: string
+        enum: [full, summary]
+        required: false
+        description: summary 为摘要格式，步骤中不含 related_notes；默认 full
     responses:
       200:
         description: 目标列表
@@ -85,7 +92,8 @@ def list_goals():
                 type: object
     """
     user_id = int(get_jwt_identity())
-    goals = GoalService.list_goals(user_id)
+    summary = request.args.get("view", "full") == "summary"
+    goals = GoalService.list_goals(user_id, summary=summary)
     return jsonify({"success": True, "data": goals}), 200
 
 
@@ -204,7 +212,7 @@ def delete_goal(goal_id):
 @goals_bp.route("/<int:goal_id>/generate-plan", methods=["POST"])
 @jwt_required()
 def generate_plan(goal_id):
-    """LLM 生成学习计划（后台线程处理）
+    """LLM 生成学习计划（后台任务队列处理）
     ---
     tags:
       - 目标规划
@@ -266,7 +274,18 @@ def plan_status(goal_id):
               properties:
                 status:
                   type: string
-                  enum: [pending, processing, completed, failed, idle]
+                  enum: [processing, done, error, idle]
+                msg:
+                  type: string
+                job:
+                  type: object
+                  description: 任务详情（queued/running/done/error、attempts、queue_seconds、run_seconds）
+                queue_position:
+                  type: integer
+                  description: 前面还在排队的任务数
+                queue_depth:
+                  type: object
+                  description: 全局排队中 / 执行中的任务数
     """
     user_id = int(get_jwt_identity())
     task = GoalService.get_plan_task_status(user_id)
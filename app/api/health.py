@@ -2,6 +2,10 @@
 """健康检查 API"""
 from flask import Blueprint, jsonify
 
+from app.services.llm_service import llm_service
+from app.services.scheduler import scheduler
+from app.services.xhs_service import xhs_service
+
 health_bp = Blueprint("health", __name__)
 
 
@@ -25,9 +29,33 @@ def health_check():
               example: "InfoPlan Backend"
             message:
               type: string
+            llm_cache:
+              type: object
+              description: LLM 响应缓存命中统计（当前进程，未初始化时为 null）
+            cache:
+              type: object
+              description: XHS 缓存后端名称及各命名空间（xhs_search_user / xhs_note / xhs_feed）的命中率（当前进程，未初始化时为 null）
+            feed_cache:
+              type: object
+              description: 博主笔记流缓存命中 / 单飞共享统计（当前进程，未初始化时为 null）
+            rate_limiter:
+              type: object
+              description: XHS 各接口族（feed / user_posted / comment / search / web）的当前速率、令牌、461 与非 200 次数及是否处于惩罚期（当前进程，未初始化时为 null）
+            cookie_pool:
+              type: object
+              description: XHS 账号池各账号的健康分、461 / 错误次数及隔离状态（当前进程，未初始化时为 null）
+            scheduler:
+              type: object
+              description: 各资源（xhs / llm_heavy / llm_light / llm_vision）的并发占用、排队数与等待时间（当前进程）
     """
     return jsonify({
         "status": "ok",
         "service": "InfoPlan Backend",
         "message": "服务运行正常",
+        "llm_cache": llm_service.cache_stats(),
+        "cache": xhs_service.cache_stats(),
+        "feed_cache": xhs_service.feed_cache_stats(),
+        "rate_limiter": xhs_service.rate_limiter_stats(),
+        "cookie_pool": xhs_service.cookie_pool_stats(),
+        "scheduler": scheduler.stats(),
     }), 200
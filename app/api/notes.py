@@ -33,6 +33,9 @@ def get_note_by_share_link():
               type: boolean
               description: 是否获取评论
               default: false
+            comments_limit:
+              type: integer
+              description: 只取前 N 条一级评论（不超过 XHS_COMMENT_MAX），取够即停止翻页，用于快速返回第一页
     responses:
       200:
         description: 获取成功
@@ -59,10 +62,13 @@ def get_note_by_share_link():
         return jsonify({"success": False, "msg": "share_link 参数不能为空"}), 400
 
     get_comments = data.get("get_comments", False)
+    comments_limit = data.get("comments_limit")
+    if comments_limit is not None and (not isinstance(comments_limit, int) or comments_limit < 1):
+        return jsonify({"success": False, "msg": "comments_limit 必须是正整数"}), 400
     logger.info(f"收到通过分享链接获取笔记请求: {share_link[:100]}...")
 
     try:
-        success, msg, note = xhs_service.get_note_by_share_link(share_link, get_comments)
+        success, msg, note = xhs_service.get_note_by_share_link(share_link, get_comments, comments_limit)
         if success:
             return jsonify({"success": True, "msg": msg, "data": note}), 200
         # 区分上游API错误和解析错误
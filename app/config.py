@@ -30,12 +30,73 @@ class Config:
 
     # XHS
     COOKIES = os.getenv("COOKIES", "")
+    # XHS 账号池：COOKIES 之外的其他账号，多个账号的 Cookie 之间用 || 分隔
+    COOKIES_POOL = os.getenv("COOKIES_POOL", "")
+    COOKIE_POOL_STRATEGY = os.getenv("COOKIE_POOL_STRATEGY", "round_robin").lower()  # round_robin | lru
+    COOKIE_POOL_THRESHOLD = float(os.getenv("COOKIE_POOL_THRESHOLD", "0.3"))  # 健康分低于该值时隔离账号
+    COOKIE_POOL_QUARANTINE = float(os.getenv("COOKIE_POOL_QUARANTINE", "300"))  # 首次隔离秒数，连续隔离时翻倍
+    COOKIE_POOL_MAX_QUARANTINE = float(os.getenv("COOKIE_POOL_MAX_QUARANTINE", "3600"))  # 隔离时间上限（秒）
+    XHS_FETCH_WORKERS = int(os.getenv("XHS_FETCH_WORKERS", "4"))  # 批量抓取笔记的线程数，1 为串行
+    XHS_PER_CLIENT_CONCURRENCY = int(os.getenv("XHS_PER_CLIENT_CONCURRENCY", "3"))  # 单次批量抓取同时在途的请求上限（不分主机）
+    XHS_HTTP_POOL_SIZE = int(os.getenv("XHS_HTTP_POOL_SIZE", "10"))  # 每个主机保持的 keep-alive 连接数
+    XHS_CONNECT_TIMEOUT = float(os.getenv("XHS_CONNECT_TIMEOUT", "5"))
+    XHS_READ_TIMEOUT = float(os.getenv("XHS_READ_TIMEOUT", "15"))
+    XHS_HTTP_RETRIES = int(os.getenv("XHS_HTTP_RETRIES", "2"))  # 仅连接失败时重试
+    # XHS 限速：每个接口族一个令牌桶（每秒请求数，每进程），收到 461 / 非 200 时乘性降速，成功时加性恢复
+    XHS_RATE_LIMIT_ENABLED = os.getenv("XHS_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    XHS_RATE_LIMITS = os.getenv("XHS_RATE_LIMITS", "feed:2,user_posted:2,comment:3,search:1,web:1")
+    XHS_RATE_MIN = float(os.getenv("XHS_RATE_MIN", "0.2"))  # 降速下限（每秒请求数）
+    XHS_RATE_INCREASE = float(os.getenv("XHS_RATE_INCREASE", "0.05"))  # 每次成功响应增加的速率
+    XHS_RATE_DECREASE = float(os.getenv("XHS_RATE_DECREASE", "0.5"))  # 收到 461 / 非 200 时速率乘以该系数
+    XHS_RATE_PENALTY = float(os.getenv("XHS_RATE_PENALTY", "30"))  # 收到 461 后笔记详情直接走网页解析的秒数
+    XHS_SEARCH_CACHE_TTL = float(os.getenv("XHS_SEARCH_CACHE_TTL", "600"))  # 用户搜索结果缓存（秒）
+    XHS_NOTE_CACHE_TTL = float(os.getenv("XHS_NOTE_CACHE_TTL", "600"))  # 笔记详情缓存（秒）
+    XHS_FEED_CACHE_TTL = float(os.getenv("XHS_FEED_CACHE_TTL", "600"))  # 博主笔记流缓存的新鲜度窗口（秒），跨用户共享
+    XHS_FEED_CACHE_WAIT = float(os.getenv("XHS_FEED_CACHE_WAIT", "120"))  # 等待其他任务抓取同一博主的最长秒数
+    XHS_COMMENT_WORKERS = int(os.getenv("XHS_COMMENT_WORKERS", "4"))  # 并发展开二级评论的线程数，1 为串行
+    XHS_COMMENT_MAX = int(os.getenv("XHS_COMMENT_MAX", "200"))  # 每篇笔记最多获取的一级评论数
+    XHS_COMMENT_MAX_REPLIES = int(os.getenv("XHS_COMMENT_MAX_REPLIES", "0"))  # 每篇笔记最多额外展开的二级评论数，默认 0 不展开（每条展开都是额外请求）
+
+    # XHS 缓存后端：memory（进程内）| sqlite（同机 worker 共享，默认）| redis（需安装 redis 包）
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+    CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "")  # 为空时使用 instance/cache.db
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))  # SQLite 后端条目数上限
+    CACHE_MEMORY_SIZE = int(os.getenv("CACHE_MEMORY_SIZE", "2048"))  # 进程内后端每个命名空间的条目数
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_REDIS_PREFIX = os.getenv("CACHE_REDIS_PREFIX", "infoplan:")
+
+    # 后台任务队列（jobs 表）
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # 每个进程同时执行的任务数
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))  # 异常失败时的最多执行次数
+    JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "10"))  # 首次重试等待秒数，之后翻倍
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))  # 轮询其他进程提交的任务
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))  # 心跳超时视为执行进程已退出
+
+    # 摘要进度 SSE 推送
+    DIGEST_STREAM_POLL_INTERVAL = float(os.getenv("DIGEST_STREAM_POLL_INTERVAL", "0.5"))  # 读取进度的间隔（秒）
+    DIGEST_STREAM_KEEPALIVE = float(os.getenv("DIGEST_STREAM_KEEPALIVE", "15"))  # 无数据时的心跳间隔（秒）
+    DIGEST_STREAM_TIMEOUT = float(os.getenv("DIGEST_STREAM_TIMEOUT", "60"))  # 单个连接最长保持（秒），到时客户端自动重连
+    # 每进程同时打开的进度流上限；每条流占用一个 gunicorn 线程，需小于 threads 以留出线程处理普通请求
+    DIGEST_STREAM_MAX_CONNECTIONS = int(os.getenv("DIGEST_STREAM_MAX_CONNECTIONS", "1"))
+
+    # 全局资源并发上限（每进程，所有用户共享，按用户轮转公平排队）
+    SCHED_XHS_CONCURRENCY = int(os.getenv("SCHED_XHS_CONCURRENCY", "6"))
+    SCHED_LLM_HEAVY_CONCURRENCY = int(os.getenv("SCHED_LLM_HEAVY_CONCURRENCY", "16"))
+    SCHED_LLM_LIGHT_CONCURRENCY = int(os.getenv("SCHED_LLM_LIGHT_CONCURRENCY", "16"))
+    SCHED_LLM_VISION_CONCURRENCY = int(os.getenv("SCHED_LLM_VISION_CONCURRENCY", "4"))
 
     # 沐曦 GPU 模型服务
     MUXI_API_BASE = os.getenv("MUXI_API_BASE", "http://localhost")
     LLM_HEAVY_PORT = int(os.getenv("LLM_HEAVY_PORT", "8000"))  # Qwen3-8B
     LLM_LIGHT_PORT = int(os.getenv("LLM_LIGHT_PORT", "8001"))  # Qwen3-4B
     LLM_VISION_PORT = int(os.getenv("LLM_VISION_PORT", "8002"))  # Qwen3-VL-8B
+    LLM_SUMMARY_CONCURRENCY = int(os.getenv("LLM_SUMMARY_CONCURRENCY", "8"))  # 批量摘要的并发请求数
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "")  # 为空时使用 instance/llm_cache.db
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))  # 秒
+    LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "1024"))  # 内存层条目数
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))  # 持久层条目数上限
 
 
 class DevelopmentConfig(Config):
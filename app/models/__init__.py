@@ -5,8 +5,9 @@ from app.models.blogger import Blogger
 from app.models.tag import Tag, blogger_tags, note_tags
 from app.models.note import Note
 from app.models.bookmark import UserBookmark
-from app.models.digest import Digest
+from app.models.digest import Digest, DigestItem
 from app.models.goal import Goal, PlanStep, step_notes
+from app.models.job import Job
 
 __all__ = [
     "User",
@@ -17,7 +18,9 @@ __all__ = [
     "Note",
     "UserBookmark",
     "Digest",
+    "DigestItem",
     "Goal",
     "PlanStep",
     "step_notes",
+    "Job",
 ]
@@ -2,7 +2,8 @@
 from datetime import datetime
 
 from app.extensions import db
-from app.models.tag import blogger_tags
+from app.models.note import MAX_BIND_PARAMS
+from app.models.tag import Tag, blogger_tags
 
 
 class Blogger(db.Model):
@@ -15,17 +16,41 @@ class Blogger(db.Model):
     avatar_url = db.Column(db.String(500))
     description = db.Column(db.Text)
     fans_count = db.Column(db.String(50))
+    # 增量摘要的高水位：上次抓取时见到的最新笔记（不含置顶）及见到它的时间
+    last_note_id = db.Column(db.String(100))
+    last_note_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     __table_args__ = (
         db.UniqueConstraint("user_id", "xhs_user_id", name="uq_user_blogger"),
+        db.Index("ix_bloggers_user_created_at", "user_id", "created_at"),
     )
 
     # 关系
     tags = db.relationship("Tag", secondary=blogger_tags, backref="bloggers", lazy="dynamic")
     notes = db.relationship("Note", backref="blogger", lazy="dynamic")
 
-    def to_dict(self):
+    @classmethod
+    def tags_by_blogger(cls, blogger_ids) -> dict:
+        """批量查询多个博主的标签，返回 {blogger_id: [Tag]}（一次关联查询，超过绑定参数上限时分批）"""
+        unique_ids = list(dict.fromkeys(blogger_ids))
+        found = {blogger_id: [] for blogger_id in unique_ids}
+        for start in range(0, len(unique_ids), MAX_BIND_PARAMS):
+            chunk = unique_ids[start:start + MAX_BIND_PARAMS]
+            rows = (
+                db.session.query(blogger_tags.c.blogger_id, Tag)
+                .join(Tag, Tag.id == blogger_tags.c.tag_id)
+                .filter(blogger_tags.c.blogger_id.in_(chunk))
+                .order_by(blogger_tags.c.blogger_id, Tag.id)
+            )
+            for blogger_id, tag in rows:
+                found[blogger_id].append(tag)
+        return found
+
+    def to_dict(self, tags: list | None = None):
+        """tags 为预先批量查好的标签；不传时按关系单独查询"""
+        if tags is None:
+            tags = self.tags.order_by(Tag.id)
         return {
             "id": self.id,
             "xhs_user_id": self.xhs_user_id,
@@ -33,6 +58,6 @@ class Blogger(db.Model):
             "avatar_url": self.avatar_url,
             "description": self.description,
             "fans_count": self.fans_count,
-            "tags": [t.to_dict() for t in self.tags],
+            "tags": [t.to_dict() for t in tags],
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
@@ -15,6 +15,7 @@ class UserBookmark(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("user_id", "note_id", name="uq_user_note_bookmark"),
+        db.Index("ix_user_bookmarks_user_created_at", "user_id", "created_at", "id"),
     )
 
     note = db.relationship("Note", backref="bookmarks")
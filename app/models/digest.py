@@ -1,7 +1,14 @@
 # encoding: utf-8
+import json
 from datetime import datetime
 
+from sqlalchemy import func
+
 from app.extensions import db
+from app.models.note import MAX_BIND_PARAMS, Note
+
+# 摘要条目的 summary 为空时用笔记正文前若干字代替
+SUMMARY_FALLBACK_CHARS = 100
 
 
 class Digest(db.Model):
@@ -10,12 +17,135 @@ class Digest(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    total_notes = db.Column(db.Integer)
+    bloggers_count = db.Column(db.Integer)
+    # 旧版摘要把全部条目存成一个 JSON；新摘要的条目存在 digest_items 表，此列为空
     digest_json = db.Column(db.Text)
 
-    def to_dict(self):
-        import json
+    __table_args__ = (
+        # 历史列表：按用户过滤 + (created_at, id) 倒序游标分页
+        db.Index("ix_digests_user_created_at", "user_id", "created_at", "id"),
+    )
+
+    items = db.relationship("DigestItem", backref="digest", lazy="dynamic", cascade="all, delete-orphan")
+
+    @classmethod
+    def batch_to_dict(cls, digests: list) -> list[dict]:
+        """批量序列化多个摘要：digest_items 中的条目一次查询读出，查询次数与摘要数无关"""
+        items = DigestItem.items_by_digest(d.id for d in digests if not d.digest_json)
+        return [d.to_dict(items=items.get(d.id)) for d in digests]
+
+    def to_dict(self, after: int = -1, limit: int | None = None, items: list | None = None):
+        """
+        :param after: 只返回序号大于 after 的条目（序号从 0 开始）
+        :param limit: 最多返回的条目数，传入时结果带 next_after（没有更多时为 None），用于分批读取
+        :param items: batch_to_dict 预先查好的全部条目，不传时单独查询
+        """
+        if self.digest_json:
+            digest = json.loads(self.digest_json)
+            if limit is not None or after >= 0:
+                items = digest.get("items", [])[after + 1:]
+                digest["items"] = items[:limit] if limit is not None else items
+                has_more = limit is not None and len(items) > limit
+        else:
+            if items is None:
+                items = DigestItem.list_items(self.id, after, None if limit is None else limit + 1)
+            else:
+                items = items[after + 1:]
+            has_more = limit is not None and len(items) > limit
+            digest = {
+                "total_notes": self.total_notes,
+                "bloggers_count": self.bloggers_count,
+                "items": items[:limit] if limit is not None else items,
+            }
+        data = {
+            "id": self.id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "digest": digest,
+        }
+        if limit is not None:
+            data["next_after"] = after + len(digest["items"]) if has_more else None
+        return data
+
+    def to_summary_dict(self):
+        """列表视图的轻量格式，不含条目（也不读取 digest_json）"""
         return {
             "id": self.id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "digest": json.loads(self.digest_json) if self.digest_json else None,
+            "total_notes": self.total_notes,
+            "bloggers_count": self.bloggers_count,
+        }
+
+
+class DigestItem(db.Model):
+    """
+    摘要条目：记录顺序、笔记引用和生成时该用户关注列表里的博主名，标题、摘要、链接等从 notes 表关联读取
+
+    notes 行由关注同一博主的用户共用，其 blogger_id 会被最近一次抓取覆盖，所以博主名存在条目上
+    """
+    __tablename__ = "digest_items"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    digest_id = db.Column(db.Integer, db.ForeignKey("digests.id"), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    note_id = db.Column(db.Integer, db.ForeignKey("notes.id"), nullable=False)
+    blogger_nickname = db.Column(db.String(200))
+    blogger_xhs_id = db.Column(db.String(100))
+
+    __table_args__ = (
+        # 同时作为按摘要分批读取条目的索引
+        db.UniqueConstraint("digest_id", "position", name="uq_digest_item_position"),
+    )
+
+    note = db.relationship("Note")
+
+    @classmethod
+    def _item_query(cls):
+        """条目 JOIN notes 的查询，每行为 (digest_id, 条目各字段...)，配合 _item_dict 使用"""
+        return (
+            db.session.query(
+                cls.digest_id, Note.note_id, Note.title, Note.summary,
+                func.substr(Note.description, 1, SUMMARY_FALLBACK_CHARS),
+                Note.note_type, Note.note_url, cls.blogger_nickname, cls.blogger_xhs_id,
+            )
+            .select_from(cls)
+            .join(Note, Note.id == cls.note_id)
+        )
+
+    @staticmethod
+    def _item_dict(row) -> dict:
+        """格式与旧版 digest_json 中的条目一致"""
+        _, note_id, title, summary, description, note_type, note_url, nickname, xhs_user_id = row
+        return {
+            "note_id": note_id,
+            "title": title or "",
+            "summary": summary or description or "",
+            "note_type": note_type or "normal",
+            "note_url": note_url or "",
+            "blogger_nickname": nickname or "",
+            "blogger_xhs_id": xhs_user_id or "",
         }
+
+    @classmethod
+    def list_items(cls, digest_id: int, after: int = -1, limit: int | None = None) -> list[dict]:
+        """按序号读取一个摘要的条目（一次 JOIN notes）"""
+        query = (
+            cls._item_query()
+            .filter(cls.digest_id == digest_id, cls.position > after)
+            .order_by(cls.position)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return [cls._item_dict(row) for row in query]
+
+    @classmethod
+    def items_by_digest(cls, digest_ids) -> dict:
+        """批量读取多个摘要的全部条目，返回 {digest_id: [条目]}（一次 JOIN 查询，超过绑定参数上限时分批）"""
+        unique_ids = list(dict.fromkeys(digest_ids))
+        found = {digest_id: [] for digest_id in unique_ids}
+        for start in range(0, len(unique_ids), MAX_BIND_PARAMS):
+            chunk = unique_ids[start:start + MAX_BIND_PARAMS]
+            query = cls._item_query().filter(cls.digest_id.in_(chunk)).order_by(cls.digest_id, cls.position)
+            for row in query:
+                found[row[0]].append(cls._item_dict(row))
+        return found
@@ -2,6 +2,7 @@
 from datetime import datetime
 
 from app.extensions import db
+from app.models.note import MAX_BIND_PARAMS, Note
 
 # 步骤-笔记 多对多关联表
 step_notes = db.Table(
@@ -23,15 +24,39 @@ class Goal(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_goals_user_created_at", "user_id", "created_at"),
+    )
+
     steps = db.relationship("PlanStep", backref="goal", lazy="dynamic", cascade="all, delete-orphan")
 
-    def to_dict(self):
+    @classmethod
+    def batch_to_dict(cls, goals: list, include_notes: bool = True) -> list[dict]:
+        """
+        批量序列化多个目标：步骤一次查询、关联笔记一次查询，查询次数与目标数无关
+        include_notes=False 为列表视图的摘要格式，步骤里不含 related_notes，也不查询笔记
+        """
+        steps = PlanStep.steps_by_goal(g.id for g in goals)
+        notes = None
+        if include_notes:
+            notes = PlanStep.notes_by_step(s.id for goal_steps in steps.values() for s in goal_steps)
+        return [g.to_dict(steps=steps[g.id], notes=notes) for g in goals]
+
+    def to_dict(self, steps: list | None = None, notes: dict | None = None):
+        """
+        steps / notes 为 batch_to_dict 预先查好的步骤和 {step_id: [Note]}；steps 不传时按关系单独查询，
+        传了 steps 但 notes 为 None 时步骤不含关联笔记
+        """
+        if steps is None:
+            steps = self.steps.order_by(PlanStep.step_number).all()
+            notes = PlanStep.notes_by_step(s.id for s in steps)
         return {
             "id": self.id,
             "title": self.title,
             "description": self.description,
             "status": self.status,
-            "steps": [s.to_dict() for s in self.steps.order_by(PlanStep.step_number)],
+            "steps": [s.to_dict(notes=notes[s.id] if notes is not None else None,
+                                include_notes=notes is not None) for s in steps],
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -51,10 +76,43 @@ class PlanStep(db.Model):
     end_date = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_plan_steps_goal_step_number", "goal_id", "step_number"),
+    )
+
     related_notes = db.relationship("Note", secondary=step_notes, backref="plan_steps")
 
-    def to_dict(self):
-        return {
+    @classmethod
+    def steps_by_goal(cls, goal_ids) -> dict:
+        """批量查询多个目标的步骤，返回 {goal_id: [PlanStep]}，按步骤序号排序"""
+        unique_ids = list(dict.fromkeys(goal_ids))
+        found = {goal_id: [] for goal_id in unique_ids}
+        for start in range(0, len(unique_ids), MAX_BIND_PARAMS):
+            chunk = unique_ids[start:start + MAX_BIND_PARAMS]
+            for step in cls.query.filter(cls.goal_id.in_(chunk)).order_by(cls.goal_id, cls.step_number):
+                found[step.goal_id].append(step)
+        return found
+
+    @staticmethod
+    def notes_by_step(step_ids) -> dict:
+        """批量查询多个步骤的关联笔记，返回 {step_id: [Note]}（一次关联查询，超过绑定参数上限时分批）"""
+        unique_ids = list(dict.fromkeys(step_ids))
+        found = {step_id: [] for step_id in unique_ids}
+        for start in range(0, len(unique_ids), MAX_BIND_PARAMS):
+            chunk = unique_ids[start:start + MAX_BIND_PARAMS]
+            rows = (
+                db.session.query(step_notes.c.step_id, Note)
+                .join(Note, Note.id == step_notes.c.note_id)
+                .filter(step_notes.c.step_id.in_(chunk))
+                .order_by(step_notes.c.step_id, Note.id)
+            )
+            for step_id, note in rows:
+                found[step_id].append(note)
+        return found
+
+    def to_dict(self, notes: list | None = None, include_notes: bool = True):
+        """notes 为预先批量查好的关联笔记，不传时按关系加载；include_notes=False 时不含 related_notes"""
+        data = {
             "id": self.id,
             "step_number": self.step_number,
             "title": self.title,
@@ -63,5 +121,8 @@ class PlanStep(db.Model):
             "status": self.status,
             "start_date": self.start_date,
             "end_date": self.end_date,
-            "related_notes": [n.to_dict() for n in self.related_notes],
         }
+        if include_notes:
+            notes = self.related_notes if notes is None else notes
+            data["related_notes"] = [n.to_dict() for n in notes]
+        return data
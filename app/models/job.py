@@ -0,0 +1,67 @@
+# encoding: utf-8
+import json
+from datetime import datetime
+
+from app.extensions import db
+
+
+class Job(db.Model):
+    """后台任务（摘要生成 / 计划生成），存库后对所有 gunicorn worker 可见，重启后可恢复"""
+    __tablename__ = "jobs"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    # queued -> running -> done | error；失败且还有重试次数时回到 queued
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    payload_json = db.Column(db.Text)
+    result_json = db.Column(db.Text)
+    # 执行中的进度计数与部分结果，由 JobProgress 通过独立连接写入
+    progress_json = db.Column(db.Text)
+    msg = db.Column(db.String(500))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=1)
+    worker = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_jobs_status_available_at", "status", "available_at"),
+        db.Index("ix_jobs_user_kind", "user_id", "kind"),
+        # 每个用户同类任务最多一个排队 / 运行中，并发提交时由数据库拒绝重复任务
+        db.Index("uq_jobs_active_user_kind", "user_id", "kind", unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    @property
+    def payload(self) -> dict:
+        return json.loads(self.payload_json) if self.payload_json else {}
+
+    @property
+    def result(self) -> dict:
+        return json.loads(self.result_json) if self.result_json else {}
+
+    @property
+    def progress(self) -> dict:
+        return json.loads(self.progress_json) if self.progress_json else {}
+
+    def to_dict(self):
+        now = datetime.utcnow()
+        wait_end = self.started_at or now
+        run_end = self.finished_at or now
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "msg": self.msg,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "queue_seconds": round((wait_end - self.created_at).total_seconds(), 3) if self.created_at else None,
+            "run_seconds": round((run_end - self.started_at).total_seconds(), 3) if self.started_at else None,
+        }
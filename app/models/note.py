@@ -1,9 +1,15 @@
 # encoding: utf-8
 from datetime import datetime
 
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
 from app.extensions import db
 from app.models.tag import note_tags
 
+# 单条语句的绑定参数上限（兼容旧版 SQLite 的 999）
+MAX_BIND_PARAMS = 999
+
 
 class Note(db.Model):
     __tablename__ = "notes"
@@ -24,6 +30,11 @@ class Note(db.Model):
     fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
     summary = db.Column(db.Text)
 
+    __table_args__ = (
+        # 按博主取最近抓取的笔记
+        db.Index("ix_notes_blogger_fetched_at", "blogger_id", "fetched_at"),
+    )
+
     # 关系
     tags = db.relationship("Tag", secondary=note_tags, backref="notes", lazy="dynamic")
 
@@ -42,3 +53,81 @@ class Note(db.Model):
             "summary": self.summary,
             "fetched_at": self.fetched_at.isoformat() if self.fetched_at else None,
         }
+
+    # 冲突更新时新值为空则保留已有值的列（不覆盖已生成的摘要和已关联的博主）
+    KEEP_EXISTING_COLUMNS = ("blogger_id", "summary")
+
+    @classmethod
+    def find_by_note_ids(cls, note_ids) -> dict:
+        """按 note_id 批量查询，返回 {note_id: Note}（IN 查询，超过绑定参数上限时分批）"""
+        unique_ids = list(dict.fromkeys(i for i in note_ids if i))
+        found = {}
+        for start in range(0, len(unique_ids), MAX_BIND_PARAMS):
+            chunk = unique_ids[start:start + MAX_BIND_PARAMS]
+            for note in cls.query.filter(cls.note_id.in_(chunk)):
+                found[note.note_id] = note
+        return found
+
+    @classmethod
+    def bulk_upsert(cls, rows: list[dict]) -> int:
+        """
+        按 note_id 批量插入或更新（INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE），不提交事务
+
+        各行的列可以不同，列相同的行合并成一条多行 INSERT；冲突时只更新行中给出的列，
+        KEEP_EXISTING_COLUMNS 中的列新值为空时保留已有值。重复的 note_id 以最后一行为准。
+        :return: 写入的行数
+        """
+        by_note_id = {row["note_id"]: row for row in rows if row.get("note_id")}
+        groups = {}
+        for row in by_note_id.values():
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect not in ("sqlite", "mysql", "postgresql"):
+            cls._upsert_by_orm(by_note_id)
+            return len(by_note_id)
+
+        for columns, group in groups.items():
+            batch_size = max(1, MAX_BIND_PARAMS // len(columns))
+            for start in range(0, len(group), batch_size):
+                db.session.execute(cls._upsert_statement(dialect, columns, group[start:start + batch_size]))
+        return len(by_note_id)
+
+    @classmethod
+    def _upsert_statement(cls, dialect: str, columns: tuple, rows: list[dict]):
+        table = cls.__table__
+        if dialect == "mysql":
+            stmt = mysql.insert(table).values(rows)
+            new = stmt.inserted
+        else:
+            stmt = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table).values(rows)
+            new = stmt.excluded
+
+        updates = {}
+        for column in columns:
+            if column == "note_id":
+                continue
+            if column in cls.KEEP_EXISTING_COLUMNS:
+                updates[column] = func.coalesce(new[column], table.c[column])
+            else:
+                updates[column] = new[column]
+
+        if dialect == "mysql":
+            return stmt.on_duplicate_key_update(updates) if updates else stmt.prefix_with("IGNORE")
+        if not updates:
+            return stmt.on_conflict_do_nothing(index_elements=["note_id"])
+        return stmt.on_conflict_do_update(index_elements=["note_id"], set_=updates)
+
+    @classmethod
+    def _upsert_by_orm(cls, by_note_id: dict):
+        """不支持 upsert 语法的数据库：一次 IN 查询后逐行更新或新增"""
+        existing = cls.find_by_note_ids(by_note_id)
+        for note_id, row in by_note_id.items():
+            note = existing.get(note_id)
+            if note is None:
+                db.session.add(cls(**row))
+                continue
+            for column, value in row.items():
+                if value is None and column in cls.KEEP_EXISTING_COLUMNS:
+                    continue
+                setattr(note, column, value)
@@ -0,0 +1,281 @@
+# encoding: utf-8
+"""
+可插拔缓存后端：按命名空间存取 JSON 值，带 TTL 与每个命名空间的命中统计
+
+- memory: 进程内 cachetools.TTLCache（每个 gunicorn worker 各一份，重启清空）
+- sqlite: 独立的 SQLite 文件（WAL），同机多个 worker 共享，重启后保留，无需外部服务
+- redis:  可选，需要安装 redis 包并配置 CACHE_REDIS_URL，多机共享
+
+命中统计为当前进程的读写计数。
+"""
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import TTLCache
+from loguru import logger
+
+
+class CacheBackend(abc.ABC):
+    """缓存后端基类：子类实现 _get / _set / _delete / _clear"""
+
+    name = "base"
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = {}  # namespace -> {"hits", "misses", "sets"}
+
+    def namespace(self, name: str, ttl: float) -> "NamespacedCache":
+        return NamespacedCache(self, name, ttl)
+
+    def get(self, namespace: str, key: str):
+        value = self._get(namespace, key)
+        self._count(namespace, "hits" if value is not None else "misses")
+        return value
+
+    def set(self, namespace: str, key: str, value, ttl: float):
+        if value is None:
+            return
+        self._set(namespace, key, value, ttl)
+        self._count(namespace, "sets")
+
+    def delete(self, namespace: str, key: str):
+        self._delete(namespace, key)
+
+    def clear(self, namespace: str):
+        self._clear(namespace)
+
+    def _count(self, namespace: str, field: str):
+        with self._stats_lock:
+            stats = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "sets": 0})
+            stats[field] += 1
+
+    def stats(self) -> dict:
+        """{"backend": 名称, "namespaces": {命名空间: {hits, misses, sets, hit_ratio}}}"""
+        with self._stats_lock:
+            namespaces = {name: dict(stats) for name, stats in self._stats.items()}
+        for stats in namespaces.values():
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return {"backend": self.name, "namespaces": namespaces}
+
+    @abc.abstractmethod
+    def _get(self, namespace: str, key: str):
+        """返回缓存值，未命中或读取失败时返回 None"""
+
+    @abc.abstractmethod
+    def _set(self, namespace: str, key: str, value, ttl: float):
+        """写入缓存，失败时记录日志而不抛出"""
+
+    @abc.abstractmethod
+    def _delete(self, namespace: str, key: str):
+        """删除单个键，失败时记录日志而不抛出"""
+
+    @abc.abstractmethod
+    def _clear(self, namespace: str):
+        """清空命名空间，失败时记录日志而不抛出"""
+
+
+class NamespacedCache:
+    """绑定命名空间和 TTL 的缓存句柄"""
+
+    def __init__(self, backend: CacheBackend, name: str, ttl: float):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+
+    def get(self, key: str):
+        return self.backend.get(self.name, key)
+
+    def set(self, key: str, value):
+        self.backend.set(self.name, key, value, self.ttl)
+
+    def delete(self, key: str):
+        self.backend.delete(self.name, key)
+
+    def clear(self):
+        self.backend.clear(self.name)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内缓存，每个命名空间一个 TTLCache（TTL 取该命名空间首次写入时的值）"""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__()
+        self.maxsize = maxsize
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def _cache(self, namespace: str, ttl: float = 600) -> TTLCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            cache = self._caches[namespace] = TTLCache(maxsize=self.maxsize, ttl=ttl)
+        return cache
+
+    def _get(self, namespace, key):
+        with self._lock:
+            return self._caches[namespace].get(key) if namespace in self._caches else None
+
+    def _set(self, namespace, key, value, ttl):
+        with self._lock:
+            self._cache(namespace, ttl)[key] = value
+
+    def _delete(self, namespace, key):
+        with self._lock:
+            if namespace in self._caches:
+                self._caches[namespace].pop(key, None)
+
+    def _clear(self, namespace):
+        with self._lock:
+            self._caches.pop(namespace, None)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """SQLite 文件缓存：值以 JSON 存储，过期条目读取时丢弃，写入时顺带清理并把条目数压回 max_entries 以内"""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str, max_entries: int = 100000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv_cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_kv_cache_expires_at ON kv_cache (expires_at)")
+
+    def _get(self, namespace, key):
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM kv_cache WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取缓存失败 [{namespace}]: {e}")
+            return None
+        if row is None:
+            return None
+        if row[1] < time.time():
+            # 过期条目读取时顺带删除，不必等下一轮写入清理
+            self._delete(namespace, key)
+            return None
+        return json.loads(row[0])
+
+    def _set(self, namespace, key, value, ttl):
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO kv_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, payload, now + ttl),
+                )
+                self._writes += 1
+                # 每 100 次写入清理一次，避免每次写入都扫表
+                if self._writes % 100 == 0:
+                    self._evict(now)
+        except sqlite3.Error as e:
+            logger.warning(f"写入缓存失败 [{namespace}]: {e}")
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM kv_cache WHERE expires_at < ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM kv_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM kv_cache WHERE rowid IN "
+                "(SELECT rowid FROM kv_cache ORDER BY expires_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def _delete(self, namespace, key):
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM kv_cache WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error as e:
+            logger.warning(f"删除缓存失败 [{namespace}]: {e}")
+
+    def _clear(self, namespace):
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM kv_cache WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            logger.warning(f"清空缓存失败 [{namespace}]: {e}")
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis 缓存（可选依赖 redis），键为 {prefix}{namespace}:{key}"""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "infoplan:"):
+        super().__init__()
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._client.ping()
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}{namespace}:{key}"
+
+    def _get(self, namespace, key):
+        try:
+            raw = self._client.get(self._key(namespace, key))
+        except Exception as e:
+            logger.warning(f"读取 Redis 缓存失败 [{namespace}]: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def _set(self, namespace, key, value, ttl):
+        try:
+            self._client.set(self._key(namespace, key), json.dumps(value, ensure_ascii=False),
+                             ex=max(1, int(ttl)))
+        except Exception as e:
+            logger.warning(f"写入 Redis 缓存失败 [{namespace}]: {e}")
+
+    def _delete(self, namespace, key):
+        try:
+            self._client.delete(self._key(namespace, key))
+        except Exception as e:
+            logger.warning(f"删除 Redis 缓存失败 [{namespace}]: {e}")
+
+    def _clear(self, namespace):
+        try:
+            for key in self._client.scan_iter(match=f"{self.prefix}{namespace}:*"):
+                self._client.delete(key)
+        except Exception as e:
+            logger.warning(f"清空 Redis 缓存失败 [{namespace}]: {e}")
+
+
+def create_cache_backend(config: dict, instance_path: str) -> CacheBackend:
+    """按 CACHE_BACKEND 配置创建后端；redis / sqlite 不可用时依次降级到 sqlite / memory"""
+    backend = config["CACHE_BACKEND"]
+    if backend == "redis":
+        try:
+            return RedisCacheBackend(config["CACHE_REDIS_URL"], prefix=config["CACHE_REDIS_PREFIX"])
+        except Exception as e:
+            logger.warning(f"Redis 缓存不可用，改用 SQLite 缓存: {e}")
+            backend = "sqlite"
+    if backend == "sqlite":
+        db_path = config["CACHE_DB_PATH"] or os.path.join(instance_path, "cache.db")
+        try:
+            return SQLiteCacheBackend(db_path, max_entries=config["CACHE_MAX_ENTRIES"])
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite 缓存不可用，改用进程内缓存: {e}")
+    return MemoryCacheBackend(maxsize=config["CACHE_MEMORY_SIZE"])
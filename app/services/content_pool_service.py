@@ -56,7 +56,9 @@ class ContentPoolService:
         if tag_name:
             query = query.filter(Blogger.tags.any(Tag.name == tag_name))
         bloggers = query.order_by(Blogger.created_at.desc()).all()
-        return [b.to_dict() for b in bloggers]
+        # 标签一次批量查出，避免每个博主 to_dict 时再查一次
+        tags = Blogger.tags_by_blogger(b.id for b in bloggers)
+        return [b.to_dict(tags=tags[b.id]) for b in bloggers]
 
     @staticmethod
     def delete_blogger(user_id: int, blogger_id: int) -> tuple[bool, str]:
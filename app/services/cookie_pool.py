@@ -0,0 +1,149 @@
+# encoding: utf-8
+"""
+XHS 账号（Cookie）池：多个账号轮流签名请求，按健康分自动隔离
+
+- 选择策略：round_robin（轮询）| lru（最久未使用优先），只在未隔离的账号中选择
+- 健康分 0~1：每个 200 响应向 1 靠拢，461 减半，其他非 200 / 业务失败乘 0.8
+- 健康分低于阈值时隔离 quarantine 秒，连续被隔离时隔离时间翻倍（不超过 max_quarantine）；
+  隔离结束后以 0.5 分试用，表现恢复到 0.9 以上时清零翻倍次数
+- 所有账号都在隔离中时，退而使用最早解除隔离的账号，不让服务整体不可用
+
+状态在进程内，多 worker 部署时各自统计。
+"""
+import itertools
+import threading
+import time
+
+from loguru import logger
+
+from xhs_utils.cookie_util import trans_cookies
+
+ANTI_BOT_STATUS = 461
+PROBATION_SCORE = 0.5
+RECOVERED_SCORE = 0.9
+
+
+class CookieAccount:
+    """单个账号的 Cookie 与健康状态"""
+
+    def __init__(self, cookies: str, index: int):
+        self.cookies = cookies
+        self.a1 = trans_cookies(cookies).get("a1", "") if cookies else ""
+        # 统计里只显示 a1 末尾几位
+        self.name = f"#{index}:{self.a1[-6:]}" if self.a1 else f"#{index}"
+        self.score = 1.0
+        self.last_used = 0.0
+        self.quarantined_until = 0.0
+        self.quarantine_count = 0
+        self.leases = 0
+        self.anti_bot = 0
+        self.errors = 0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.quarantined_until
+
+
+class CookiePool:
+    """多账号 Cookie 池，线程安全"""
+
+    def __init__(self, cookie_strings: list[str], strategy: str = "round_robin", threshold: float = 0.3,
+                 quarantine: float = 300, max_quarantine: float = 3600):
+        seen = set()
+        self.accounts = []
+        for cookies in cookie_strings:
+            cookies = cookies.strip()
+            if cookies and cookies not in seen:
+                seen.add(cookies)
+                self.accounts.append(CookieAccount(cookies, len(self.accounts)))
+        if not self.accounts:
+            # 未配置 Cookie：保留一个空账号，请求照常发出并由接口返回失败，行为与单 Cookie 时一致
+            self.accounts.append(CookieAccount("", 0))
+        self._by_a1 = {account.a1: account for account in self.accounts if account.a1}
+        self.strategy = strategy
+        self.threshold = threshold
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self._cycle = itertools.cycle(range(len(self.accounts)))
+        self._lock = threading.Lock()
+
+    def acquire(self) -> CookieAccount:
+        """为一次请求（或一组连续请求）选择账号"""
+        with self._lock:
+            now = time.monotonic()
+            available = [account for account in self.accounts if account.is_available(now)]
+            if not available:
+                account = min(self.accounts, key=lambda a: a.quarantined_until)
+            elif self.strategy == "lru":
+                account = min(available, key=lambda a: a.last_used)
+            else:
+                account = next(a for a in (self.accounts[next(self._cycle)] for _ in self.accounts)
+                               if a.is_available(now))
+            account.last_used = now
+            account.leases += 1
+            return account
+
+    def cookies(self) -> str:
+        """选一个账号并返回其 Cookie 字符串（给只接受 cookies_str 的调用方）"""
+        return self.acquire().cookies
+
+    def observe(self, cookies: dict | None, status_code: int):
+        """HTTP 响应回调（XHS_Apis.on_response）：按请求携带的 a1 找到账号并更新健康分"""
+        account = self._by_a1.get((cookies or {}).get("a1", ""))
+        if account is None:
+            return
+        if status_code == 200:
+            self._update(account, ok=True)
+        else:
+            self._update(account, ok=False, anti_bot=status_code == ANTI_BOT_STATUS)
+
+    def report(self, account: CookieAccount, success: bool):
+        """业务层结果：HTTP 200 但接口返回失败（如登录失效）时扣分；成功和 HTTP 错误已由 observe 计入"""
+        if not success:
+            self._update(account, ok=False)
+
+    def _update(self, account: CookieAccount, ok: bool, anti_bot: bool = False):
+        with self._lock:
+            if ok:
+                account.score += (1 - account.score) * 0.1
+                if account.score >= RECOVERED_SCORE:
+                    account.quarantine_count = 0
+                return
+            if anti_bot:
+                account.anti_bot += 1
+                account.score *= 0.5
+            else:
+                account.errors += 1
+                account.score *= 0.8
+            now = time.monotonic()
+            if account.score < self.threshold and account.is_available(now):
+                duration = min(self.max_quarantine, self.quarantine * (2 ** account.quarantine_count))
+                account.quarantined_until = now + duration
+                account.quarantine_count += 1
+                account.score = PROBATION_SCORE
+                logger.warning(f"XHS 账号 {account.name} 健康分过低，隔离 {duration:g} 秒"
+                               f"（第 {account.quarantine_count} 次）")
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            accounts = [{
+                "name": account.name,
+                "score": round(account.score, 3),
+                "leases": account.leases,
+                "anti_bot": account.anti_bot,
+                "errors": account.errors,
+                "quarantined": not account.is_available(now),
+                "quarantine_remaining": round(max(0.0, account.quarantined_until - now), 1),
+            } for account in self.accounts]
+        return {
+            "strategy": self.strategy,
+            "available": sum(1 for account in accounts if not account["quarantined"]),
+            "accounts": accounts,
+        }
+
+
+def load_cookie_strings(config) -> list[str]:
+    """COOKIES 为主账号，COOKIES_POOL 中以 || 分隔的为其他账号"""
+    cookie_strings = [config["COOKIES"]]
+    cookie_strings.extend(config["COOKIES_POOL"].split("||"))
+    return [cookies for cookies in cookie_strings if cookies and cookies.strip()]
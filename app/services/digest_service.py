@@ -1,23 +1,35 @@
 # encoding: utf-8
-"""每日摘要服务层：笔记抓取 + LLM 摘要生成 + 后台线程处理"""
+"""每日摘要服务层：笔记抓取 + LLM 摘要生成 + 后台任务队列处理"""
 import json
 import threading
+import time
 from datetime import datetime
 
 from flask import current_app
 from loguru import logger
+from sqlalchemy.orm import defer
 
 from app.extensions import db
 from app.models.blogger import Blogger
 from app.models.note import Note
-from app.models.digest import Digest
+from app.models.digest import Digest, DigestItem
+from app.models.job import Job
+from app.services.job_queue import ActiveJobExists, job_queue
+from app.services.pagination import keyset_page
 from app.services.xhs_service import xhs_service
 from app.services.llm_service import llm_service
 
+JOB_KIND = "digest"
+STREAM_RETRY_MS = 3000  # 连接到时关闭后 EventSource 的重连间隔
 
-# 存储后台任务状态: {user_id: {"status": "processing"|"done"|"error", "digest_id": int|None, "msg": str}}
-_digest_tasks = {}
-_tasks_lock = threading.Lock()
+# 每进程同时打开的进度流数量（每条流独占一个 gunicorn 线程）
+_stream_lock = threading.Lock()
+_open_streams = 0
+
+
+def _summary_result(future) -> str | None:
+    """摘要任务的结果，任务本身抛出异常时视为没有摘要（由调用方退回正文开头）"""
+    return None if future.exception() is not None else future.result()
 
 
 class DigestService:
@@ -25,162 +37,331 @@ class DigestService:
 
     @staticmethod
     def get_task_status(user_id: int) -> dict | None:
-        """获取用户当前摘要生成任务状态"""
-        with _tasks_lock:
-            return _digest_tasks.get(user_id)
+        """获取用户最近一次摘要生成任务状态（含排队位置、耗时和重试次数）"""
+        job = job_queue.latest_job(user_id, JOB_KIND)
+        if not job:
+            return None
+        return {
+            # 对外保持 processing / done / error 三种状态
+            "status": "processing" if job.status in ("queued", "running") else job.status,
+            "digest_id": job.result.get("digest_id"),
+            "msg": job.msg,
+            "progress": {k: v for k, v in job.progress.items() if k != "items"},
+            "job": job.to_dict(),
+            "queue_position": job_queue.queue_position(job),
+            "queue_depth": job_queue.queue_depth(),
+        }
 
     @staticmethod
     def generate_digest(user_id: int, max_bloggers: int = 5,
                         notes_per_blogger: int = 3) -> tuple[bool, str, dict | None]:
         """
-        触发摘要生成（后台线程处理）
+        触发摘要生成（提交到后台任务队列）
 
         流程：选 max_bloggers 个博主 x notes_per_blogger 条笔记 -> 存 notes 表 -> Qwen3-8B 摘要
+        增量：每个博主记录上次见到的最新笔记，只抓取比它新的笔记，不足的条数用已有笔记（已有摘要）补足
         """
         # 检查是否有正在进行的任务
-        with _tasks_lock:
-            task = _digest_tasks.get(user_id)
-            if task and task["status"] == "processing":
-                return False, "正在生成摘要，请稍候", {"status": "processing"}
+        if job_queue.active_job(user_id, JOB_KIND):
+            return False, "正在生成摘要，请稍候", {"status": "processing"}
 
         # 检查用户是否有博主
+        if not Blogger.query.filter_by(user_id=user_id).first():
+            return False, "内容池为空，请先添加博主", None
+
+        try:
+            job = job_queue.enqueue(JOB_KIND, user_id, {
+                "max_bloggers": max_bloggers,
+                "notes_per_blogger": notes_per_blogger,
+            })
+        except ActiveJobExists:
+            # 检查之后另一个请求抢先提交了任务
+            return False, "正在生成摘要，请稍候", {"status": "processing"}
+        return True, "摘要生成已启动", {"status": "processing", "job_id": job.id}
+
+    @staticmethod
+    def _run_digest_job(job) -> tuple[bool, str, dict | None]:
+        """任务队列中执行摘要生成（已在 app context 中）"""
+        user_id = job.user_id
+        max_bloggers = job.payload.get("max_bloggers", 5)
+        notes_per_blogger = job.payload.get("notes_per_blogger", 3)
         bloggers = Blogger.query.filter_by(user_id=user_id).all()
         if not bloggers:
             return False, "内容池为空，请先添加博主", None
 
-        # 标记任务开始
-        with _tasks_lock:
-            _digest_tasks[user_id] = {"status": "processing", "digest_id": None, "msg": "正在生成..."}
+        # 1. 选取博主（最多 max_bloggers 个）
+        selected_bloggers = bloggers[:max_bloggers]
+        xhs_user_ids = [b.xhs_user_id for b in selected_bloggers]
+        blogger_map = {b.xhs_user_id: b for b in selected_bloggers}
+        # 博主高水位：翻到上次见过的最新笔记即停止
+        stop_at = {b.xhs_user_id: b.last_note_id for b in selected_bloggers if b.last_note_id}
 
-        # 获取 app 引用，用于后台线程的 app context
-        app = current_app._get_current_object()
+        logger.info(f"用户 {user_id}: 开始为 {len(xhs_user_ids)} 个博主获取笔记（{len(stop_at)} 个增量抓取）")
 
-        thread = threading.Thread(
-            target=DigestService._generate_in_background,
-            args=(app, user_id, bloggers, max_bloggers, notes_per_blogger),
-            daemon=True,
+        progress = job_queue.progress(
+            job, bloggers_total=len(xhs_user_ids), bloggers_done=0, notes_total=0, notes_done=0
         )
-        thread.start()
-        return True, "摘要生成已启动", {"status": "processing"}
+        existing = {}      # note_id -> 库中已有的 Note（按博主批量查询）
+        summaries = {}     # note_id -> 摘要 Future
+        published = set()  # 已推送到进度中的 note_id
+        topped_up = set()  # 从库中补足的已有笔记 note_id
+        blogger_notes = {}  # xhs_user_id -> 该博主本次入选的笔记（新笔记 + 补足的已有笔记）
 
-    @staticmethod
-    def _generate_in_background(app, user_id: int, bloggers: list,
-                                max_bloggers: int, notes_per_blogger: int):
-        """后台线程中执行摘要生成"""
-        with app.app_context():
-            try:
-                # 1. 选取博主（最多 max_bloggers 个）
-                selected_bloggers = bloggers[:max_bloggers]
-                xhs_user_ids = [b.xhs_user_id for b in selected_bloggers]
-                blogger_map = {b.xhs_user_id: b for b in selected_bloggers}
-
-                logger.info(f"用户 {user_id}: 开始为 {len(xhs_user_ids)} 个博主获取笔记")
-
-                # 2. 批量获取笔记
-                raw_notes = xhs_service.get_users_latest_notes(
-                    xhs_user_ids, max_users=max_bloggers, notes_per_user=notes_per_blogger
-                )
-
-                if not raw_notes:
-                    with _tasks_lock:
-                        _digest_tasks[user_id] = {
-                            "status": "error", "digest_id": None,
-                            "msg": "未能获取到任何笔记"
-                        }
-                    return
+        def known_notes(xhs_uid: str, exclude: list[str], limit: int) -> list[dict]:
+            """库中该博主最近的已有笔记，转换为抓取结果的格式"""
+            if limit <= 0:
+                return []
+            notes = Note.query.join(Blogger, Note.blogger_id == Blogger.id).filter(
+                Blogger.xhs_user_id == xhs_uid, Note.note_id.notin_(exclude)
+            ).order_by(Note.upload_time.desc(), Note.id.desc()).limit(limit).all()
+            raws = []
+            for note in notes:
+                existing[note.note_id] = note
+                topped_up.add(note.note_id)
+                raws.append({
+                    "note_id": note.note_id,
+                    "title": note.title or "",
+                    "desc": note.description or "",
+                    "note_type": note.note_type or "normal",
+                    "url": note.note_url or "",
+                    "upload_time": note.upload_time or "",
+                    "tags": json.loads(note.tags_json) if note.tags_json else [],
+                    "user_id": xhs_uid,
+                })
+            return raws
 
-                logger.info(f"用户 {user_id}: 获取到 {len(raw_notes)} 条笔记，开始生成摘要")
-
-                # 3. 存储笔记到 notes 表 + 生成摘要
-                digest_items = []
-                for raw in raw_notes:
-                    note_id = raw.get("note_id", "")
-                    if not note_id:
-                        continue
-
-                    title = raw.get("title", raw.get("display_title", ""))
-                    desc = raw.get("desc", raw.get("description", ""))
-                    note_type = raw.get("note_type", raw.get("type", "normal"))
-                    xhs_uid = raw.get("user_id", "")
-
-                    # 查找或创建 Note 记录
-                    note = Note.query.filter_by(note_id=note_id).first()
-                    if not note:
-                        blogger_obj = blogger_map.get(xhs_uid)
-                        note = Note(
-                            note_id=note_id,
-                            blogger_id=blogger_obj.id if blogger_obj else None,
-                            title=title,
-                            description=desc,
-                            note_type=note_type,
-                            liked_count=raw.get("liked_count", 0),
-                            collected_count=raw.get("collected_count", 0),
-                            comment_count=raw.get("comment_count", 0),
-                            note_url=raw.get("url", raw.get("note_url", "")),
-                            upload_time=raw.get("upload_time", raw.get("time", "")),
-                            tags_json=json.dumps(raw.get("tags", []), ensure_ascii=False)
-                            if raw.get("tags") else None,
-                            image_urls_json=json.dumps(raw.get("image_urls", []), ensure_ascii=False)
-                            if raw.get("image_urls") else None,
-                        )
-                        db.session.add(note)
-                        db.session.flush()
+        def note_row(raw: dict, summary: str | None, fetched_at: datetime) -> dict:
+            """抓取结果 -> notes 表的一行"""
+            blogger_obj = blogger_map.get(raw.get("user_id", ""))
+            return {
+                "note_id": raw["note_id"],
+                "blogger_id": blogger_obj.id if blogger_obj else None,
+                "title": raw.get("title", raw.get("display_title", "")),
+                "description": raw.get("desc", raw.get("description", "")),
+                "note_type": raw.get("note_type", raw.get("type", "normal")),
+                "liked_count": raw.get("liked_count", 0),
+                "collected_count": raw.get("collected_count", 0),
+                "comment_count": raw.get("comment_count", 0),
+                "note_url": raw.get("url", raw.get("note_url", "")),
+                "upload_time": raw.get("upload_time", raw.get("time", "")),
+                "tags_json": json.dumps(raw.get("tags", []), ensure_ascii=False) if raw.get("tags") else None,
+                "image_urls_json": json.dumps(raw.get("image_urls", []), ensure_ascii=False)
+                if raw.get("image_urls") else None,
+                "fetched_at": fetched_at,
+                "summary": summary,
+            }
 
-                    # 生成摘要（如果还没有）
-                    if not note.summary:
-                        tags = raw.get("tags", [])
-                        summary = llm_service.summarize_note(title, desc, tags)
-                        if summary:
-                            note.summary = summary
+        def build_item(raw: dict) -> dict:
+            """摘要条目（summary 稍后填入），只含普通值，可交给 LLM 线程使用"""
+            xhs_uid = raw.get("user_id", "")
+            blogger_obj = blogger_map.get(xhs_uid)
+            note = existing.get(raw["note_id"])
+            return {
+                "note_id": raw["note_id"],
+                "title": raw.get("title", raw.get("display_title", "")),
+                "summary": note.summary if note else None,
+                "note_type": raw.get("note_type", raw.get("type", "normal")),
+                "note_url": (note.note_url if note else None) or raw.get("url", raw.get("note_url", "")) or "",
+                "blogger_nickname": blogger_obj.nickname if blogger_obj else "",
+                "blogger_xhs_id": xhs_uid,
+            }
 
-                    db.session.commit()
+        def publish(item: dict, summary: str | None, desc: str):
+            item["summary"] = summary or desc[:100]
+            progress.add_item(item, notes_done=1)
 
-                    # 构建摘要条目
+        # 2. 边抓取边摘要：每个博主的笔记取完后立即提交给 Qwen3-8B，已有摘要的笔记直接推送。
+        #    这一阶段只读库（no_autoflush），不在等待 LLM 期间占住 SQLite 写锁
+        with llm_service.summary_pool() as submit:
+            def on_blogger_done(xhs_uid: str, user_notes: list[dict]):
+                with db.session.no_autoflush:
+                    # 高水位前移到本次见到的最新一条非置顶笔记，随摘要一起提交
+                    newest = next((n["note_id"] for n in user_notes
+                                   if n.get("note_id") and not n.get("sticky")), None)
                     blogger_obj = blogger_map.get(xhs_uid)
-                    digest_items.append({
-                        "note_id": note_id,
-                        "title": title,
-                        "summary": note.summary or desc[:100],
-                        "note_type": note_type,
-                        "note_url": note.note_url or "",
-                        "blogger_nickname": blogger_obj.nickname if blogger_obj else "",
-                        "blogger_xhs_id": xhs_uid,
-                    })
-
-                # 4. 保存摘要
-                digest = Digest(
-                    user_id=user_id,
-                    digest_json=json.dumps({
-                        "total_notes": len(digest_items),
-                        "bloggers_count": len(set(i["blogger_xhs_id"] for i in digest_items)),
-                        "items": digest_items,
-                    }, ensure_ascii=False),
-                )
-                db.session.add(digest)
-                db.session.commit()
-
-                logger.info(f"用户 {user_id}: 摘要生成完成，共 {len(digest_items)} 条")
-
-                with _tasks_lock:
-                    _digest_tasks[user_id] = {
-                        "status": "done", "digest_id": digest.id,
-                        "msg": f"摘要生成完成，包含 {len(digest_items)} 篇笔记"
-                    }
-
-            except Exception as e:
-                logger.error(f"用户 {user_id}: 摘要生成失败: {e}", exc_info=True)
-                with _tasks_lock:
-                    _digest_tasks[user_id] = {
-                        "status": "error", "digest_id": None,
-                        "msg": f"生成失败: {str(e)}"
-                    }
+                    if blogger_obj and newest:
+                        blogger_obj.last_note_id = newest
+                        blogger_obj.last_note_at = datetime.utcnow()
+                    if xhs_uid in stop_at:
+                        user_notes = user_notes + known_notes(
+                            xhs_uid, [n.get("note_id") for n in user_notes], notes_per_blogger - len(user_notes)
+                        )
+                    blogger_notes[xhs_uid] = user_notes
+                    progress.incr(bloggers_done=1, notes_total=len(user_notes))
+
+                    # 该博主的笔记一次 IN 查询，取已有摘要
+                    existing.update(Note.find_by_note_ids(
+                        n["note_id"] for n in user_notes if n.get("note_id") and n["note_id"] not in existing
+                    ))
+                    for raw in user_notes:
+                        if not raw.get("note_id") or raw["note_id"] in published:
+                            continue
+                        published.add(raw["note_id"])
+                        item = build_item(raw)
+                        desc = raw.get("desc", raw.get("description", ""))
+                        if item["summary"]:
+                            publish(item, item["summary"], desc)
+                            continue
+                        future = submit({"title": item["title"], "desc": desc, "tags": raw.get("tags", [])})
+                        future.add_done_callback(
+                            lambda f, item=item, desc=desc: publish(item, _summary_result(f), desc))
+                        summaries[raw["note_id"]] = future
+
+            new_notes = xhs_service.get_users_latest_notes(
+                xhs_user_ids, max_users=max_bloggers, notes_per_user=notes_per_blogger,
+                on_user_done=on_blogger_done, stop_at=stop_at,
+            )
+
+        raw_notes = [raw for xhs_uid in xhs_user_ids for raw in blogger_notes.get(xhs_uid, [])]
+        if not raw_notes:
+            return False, "未能获取到任何笔记", None
+
+        logger.info(f"用户 {user_id}: 获取到 {len(new_notes)} 条新笔记，共 {len(raw_notes)} 条，"
+                    f"新生成摘要 {len(summaries)} 条，成功 {sum(1 for f in summaries.values() if _summary_result(f))} 条")
+
+        # 3. 按抓取顺序组装摘要，同时收集要写回 notes 表的行
+        digest_items = []
+        rows = []
+        fetched_at = datetime.utcnow()
+        for raw in raw_notes:
+            note_id = raw.get("note_id", "")
+            if not note_id:
+                continue
+            note = existing.get(note_id)
+            new_summary = _summary_result(summaries[note_id]) if note_id in summaries else None
+            summary = new_summary or (note.summary if note else None)
+            item = build_item(raw)
+            item["summary"] = summary or raw.get("desc", raw.get("description", ""))[:100]
+            digest_items.append(item)
+            if note_id in topped_up:
+                # 库中补足的笔记没有新抓取的数据，只回写新生成的摘要
+                if new_summary:
+                    rows.append({"note_id": note_id, "summary": new_summary})
+            else:
+                rows.append(note_row(raw, new_summary, fetched_at))
+
+        # 4. 笔记批量 upsert、博主高水位、Digest 及其条目在同一个事务中提交；
+        #    条目只存笔记引用、顺序和本用户的博主名，标题、摘要等读取时从 notes 表关联
+        Note.bulk_upsert(rows)
+        digest = Digest(
+            user_id=user_id,
+            total_notes=len(digest_items),
+            bloggers_count=len(set(i["blogger_xhs_id"] for i in digest_items)),
+        )
+        db.session.add(digest)
+        db.session.flush()
+        note_pks = {note_id: note.id for note_id, note in
+                    Note.find_by_note_ids(i["note_id"] for i in digest_items).items()}
+        item_rows = [{
+            "digest_id": digest.id,
+            "position": position,
+            "note_id": note_pks[item["note_id"]],
+            "blogger_nickname": item["blogger_nickname"],
+            "blogger_xhs_id": item["blogger_xhs_id"],
+        } for position, item in enumerate(digest_items)]
+        if item_rows:
+            db.session.execute(DigestItem.__table__.insert(), item_rows)
+        db.session.commit()
+
+        logger.info(f"用户 {user_id}: 摘要生成完成，共 {len(digest_items)} 条")
+
+        return True, f"摘要生成完成，包含 {len(digest_items)} 篇笔记", {"digest_id": digest.id}
+
+    @staticmethod
+    def acquire_stream_slot() -> bool:
+        """占用一个进度流名额，本进程已满 DIGEST_STREAM_MAX_CONNECTIONS 时返回 False"""
+        global _open_streams
+        with _stream_lock:
+            if _open_streams >= current_app.config["DIGEST_STREAM_MAX_CONNECTIONS"]:
+                return False
+            _open_streams += 1
+            return True
 
     @staticmethod
-    def get_latest_digest(user_id: int) -> dict | None:
-        """获取用户最新一条摘要"""
+    def release_stream_slot():
+        global _open_streams
+        with _stream_lock:
+            _open_streams = max(0, _open_streams - 1)
+
+    @staticmethod
+    def stream_progress(user_id: int, job_id: int | None = None,
+                        last_event_id: int = 0) -> tuple[bool, str, object | None]:
+        """
+        Server-Sent Events 事件流：逐条推送已生成的摘要条目和进度计数
+
+        事件：progress（计数与任务状态）、item（单条摘要，id 为已推送条数）、reset（任务重试，已推送的条目作废）、
+        done / error（结束）。进度从 jobs 表读取，任务在哪个 worker 进程执行都能收到。
+        单个连接最多保持 DIGEST_STREAM_TIMEOUT 秒，到时直接结束，EventSource 按 retry 间隔带
+        Last-Event-ID 重连，从 last_event_id 之后继续推送。
+        """
+        if job_id:
+            job = Job.query.filter_by(id=job_id, user_id=user_id, kind=JOB_KIND).first()
+        else:
+            job = job_queue.latest_job(user_id, JOB_KIND)
+        if not job:
+            return False, "没有摘要生成任务", None
+
+        job_id = job.id
+        poll_interval = current_app.config["DIGEST_STREAM_POLL_INTERVAL"]
+        keepalive = current_app.config["DIGEST_STREAM_KEEPALIVE"]
+        timeout = current_app.config["DIGEST_STREAM_TIMEOUT"]
+
+        def sse(event: str, data: dict, event_id: int | None = None) -> str:
+            head = f"id: {event_id}\n" if event_id is not None else ""
+            return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        def events():
+            sent_items = max(last_event_id, 0)
+            last_progress = None
+            started = last_sent = time.monotonic()
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while True:
+                db.session.expire_all()
+                job = db.session.get(Job, job_id)
+                progress = job.progress
+                items = progress.pop("items", [])
+                # 任务异常后重新执行，进度从头开始
+                if len(items) < sent_items:
+                    sent_items = 0
+                    last_progress = None
+                    yield sse("reset", {"attempts": job.attempts}, 0)
+                for position, item in enumerate(items[sent_items:], start=sent_items + 1):
+                    yield sse("item", item, position)
+                    last_sent = time.monotonic()
+                sent_items = len(items)
+
+                progress["status"] = job.status
+                if progress != last_progress:
+                    yield sse("progress", progress)
+                    last_progress = progress
+                    last_sent = time.monotonic()
+
+                if job.status == "done":
+                    yield sse("done", {"digest_id": job.result.get("digest_id"), "msg": job.msg})
+                    return
+                if job.status == "error":
+                    yield sse("error", {"msg": job.msg})
+                    return
+                # 结束本轮读事务，WAL 下下一轮才能看到新的进度
+                db.session.rollback()
+
+                now = time.monotonic()
+                # 到时结束连接释放线程，客户端自动重连续传
+                if now - started > timeout:
+                    return
+                if now - last_sent >= keepalive:
+                    yield ": keep-alive\n\n"
+                    last_sent = now
+                time.sleep(poll_interval)
+
+        return True, "ok", events()
+
+    @staticmethod
+    def get_latest_digest(user_id: int, after: int = -1, limit: int | None = None) -> dict | None:
+        """获取用户最新一条摘要；传 limit 时只返回序号在 after 之后的 limit 条条目"""
         digest = Digest.query.filter_by(user_id=user_id)\
             .order_by(Digest.created_at.desc()).first()
-        return digest.to_dict() if digest else None
+        return digest.to_dict(after, limit) if digest else None
 
     @staticmethod
     def get_digest_history(user_id: int, page: int = 1,
@@ -190,14 +371,37 @@ class DigestService:
             .order_by(Digest.created_at.desc())\
             .paginate(page=page, per_page=per_page, error_out=False)
         return {
-            "items": [d.to_dict() for d in pagination.items],
+            "items": Digest.batch_to_dict(pagination.items),
             "total": pagination.total,
             "page": pagination.page,
             "pages": pagination.pages,
         }
 
     @staticmethod
-    def get_digest_by_id(user_id: int, digest_id: int) -> dict | None:
-        """获取特定摘要详情"""
+    def get_digest_history_page(user_id: int, cursor: str | None = None, per_page: int = 10,
+                                with_total: bool = False,
+                                summary: bool = True) -> tuple[bool, str, dict | None]:
+        """
+        游标分页获取摘要历史，按 (created_at, id) 倒序，深翻页与第一页代价相同
+        summary=True 时只返回 id 和时间，不读取 digest_json
+        """
+        query = Digest.query.filter_by(user_id=user_id)
+        if summary:
+            query = query.options(defer(Digest.digest_json))
+        try:
+            page = keyset_page(query, Digest, cursor, per_page, with_total)
+        except ValueError as e:
+            return False, str(e), None
+        page["items"] = ([d.to_summary_dict() for d in page["items"]] if summary
+                         else Digest.batch_to_dict(page["items"]))
+        return True, "ok", page
+
+    @staticmethod
+    def get_digest_by_id(user_id: int, digest_id: int, after: int = -1,
+                         limit: int | None = None) -> dict | None:
+        """获取特定摘要详情；传 limit 时只返回序号在 after 之后的 limit 条条目"""
         digest = Digest.query.filter_by(id=digest_id, user_id=user_id).first()
-        return digest.to_dict() if digest else None
+        return digest.to_dict(after, limit) if digest else None
+
+
+job_queue.register(JOB_KIND, DigestService._run_digest_job)
@@ -0,0 +1,101 @@
+# encoding: utf-8
+"""
+博主笔记流缓存：按 xhs_user_id 跨用户共享，带新鲜度窗口和单飞
+
+- 同一博主在 TTL 内只抓取一次，关注同一个博主的多个用户共用这次抓取结果
+- 单飞：某博主正在被抓取时，其他任务等待这次抓取完成，而不是各自再发一遍请求
+- 抓取可能带增量停止点（翻到上次见过的笔记即停止），条目记录抓取时的 limit 与停止点，
+  只有能确定覆盖本次请求（条数、停止点）的条目才算命中
+- 条目存放在缓存后端的命名空间里（SQLite / Redis 后端时多个 worker 共享），
+  单飞登记在进程内，多 worker 部署时同一博主最多每个进程同时抓取一次
+"""
+import threading
+
+from app.services.cache_backend import MemoryCacheBackend, NamespacedCache
+
+NAMESPACE = "xhs_feed"
+
+
+class BloggerFeedCache:
+    """博主最新笔记缓存 + 单飞"""
+
+    def __init__(self, store: NamespacedCache | None = None, ttl: float = 600, maxsize: int = 2048):
+        """store 为空时使用进程内缓存（ttl / maxsize 只对进程内缓存生效）"""
+        self._entries = store or MemoryCacheBackend(maxsize=maxsize).namespace(NAMESPACE, ttl)
+        self._inflight = {}  # xhs_user_id -> threading.Event，抓取完成（成功或失败）时 set
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "shared": 0, "misses": 0, "wait_timeouts": 0, "stores": 0}
+
+    def acquire(self, xhs_user_id: str, limit: int, stop_at: str | None = None) -> tuple[str, object]:
+        """
+        查缓存并登记抓取
+        :return: ("hit", 笔记列表) / ("leader", token)：由调用方抓取，完成后 store 并 release(token) /
+                 ("wait", token)：其他任务正在抓取，调用 wait(token, ...) 等待
+        """
+        with self._lock:
+            entry = self._entries.get(xhs_user_id)
+            notes = self._serve(entry, limit, stop_at) if entry else None
+            if notes is not None:
+                self._stats["hits"] += 1
+                return "hit", notes
+            event = self._inflight.get(xhs_user_id)
+            if event is not None:
+                return "wait", event
+            event = self._inflight[xhs_user_id] = threading.Event()
+            self._stats["misses"] += 1
+            return "leader", event
+
+    def wait(self, xhs_user_id: str, token, limit: int, stop_at: str | None = None,
+             timeout: float | None = None) -> list | None:
+        """等待其他任务的抓取完成后再查缓存；超时、对方抓取失败或结果不覆盖本次请求时返回 None"""
+        finished = token.wait(timeout)
+        with self._lock:
+            if not finished:
+                self._stats["wait_timeouts"] += 1
+                return None
+            entry = self._entries.get(xhs_user_id)
+            notes = self._serve(entry, limit, stop_at) if entry else None
+            if notes is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["shared"] += 1
+            return notes
+
+    def store(self, xhs_user_id: str, notes: list, limit: int, stop_at: str | None = None):
+        """写入一次抓取结果（notes 按博主主页顺序，最新在前）"""
+        with self._lock:
+            self._stats["stores"] += 1
+        self._entries.set(xhs_user_id, {"notes": list(notes), "limit": limit, "stop_at": stop_at})
+
+    def release(self, xhs_user_id: str, token):
+        """结束登记并唤醒等待者（已被其他任务重新登记时不影响对方）"""
+        with self._lock:
+            if self._inflight.get(xhs_user_id) is token:
+                del self._inflight[xhs_user_id]
+        token.set()
+
+    @staticmethod
+    def _serve(entry: dict, limit: int, stop_at: str | None) -> list | None:
+        """条目能覆盖 (limit, stop_at) 请求时返回结果，否则 None"""
+        notes = entry["notes"]
+        if stop_at:
+            for index, note in enumerate(notes):
+                if note.get("note_id") == stop_at and not note.get("sticky"):
+                    return notes[:index][:limit]
+        if len(notes) >= limit:
+            return notes[:limit]
+        # 不足 limit 条：抓取时已翻到底或翻到了停止点，只有停止点相同（或抓取时没有停止点）时结果才完整
+        if len(notes) < entry["limit"] and entry["stop_at"] in (None, stop_at):
+            return list(notes)
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["inflight"] = len(self._inflight)
+        lookups = stats["hits"] + stats["shared"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["shared"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        self._entries.clear()
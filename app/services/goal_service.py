@@ -6,24 +6,22 @@
 """
 import json
 import re
-import threading
 from datetime import datetime
 
-from flask import current_app
 from loguru import logger
+from sqlalchemy.orm import joinedload
 
 from app.extensions import db
 from app.models.goal import Goal, PlanStep, step_notes
 from app.models.note import Note
 from app.models.bookmark import UserBookmark
 from app.models.blogger import Blogger
+from app.services.job_queue import ActiveJobExists, job_queue
 from app.services.llm_service import llm_service
+from app.services.pagination import keyset_page
 from app.services.xhs_service import xhs_service
 
-
-# 后台任务状态: {user_id: {"status": ..., "goal_id": ..., "msg": ...}}
-_plan_tasks = {}
-_tasks_lock = threading.Lock()
+PLAN_JOB_KIND = "plan"
 
 # 配置常量
 MAX_NOTES_FOR_MATCHING = 50
@@ -45,9 +43,10 @@ class GoalService:
         return True, "目标创建成功", goal.to_dict()
 
     @staticmethod
-    def list_goals(user_id: int) -> list[dict]:
+    def list_goals(user_id: int, summary: bool = False) -> list[dict]:
+        """summary=True 时返回摘要格式（步骤不含关联笔记）"""
         goals = Goal.query.filter_by(user_id=user_id).order_by(Goal.created_at.desc()).all()
-        return [g.to_dict() for g in goals]
+        return Goal.batch_to_dict(goals, include_notes=not summary)
 
     @staticmethod
     def get_goal(user_id: int, goal_id: int) -> dict | None:
@@ -97,107 +96,97 @@ class GoalService:
         db.session.commit()
         return True, "步骤已更新", step.to_dict()
 
-    # ─── 计划生成（后台线程） ─────────────────────────
+    # ─── 计划生成（后台任务队列） ─────────────────────
 
     @staticmethod
     def get_plan_task_status(user_id: int) -> dict | None:
-        with _tasks_lock:
-            return _plan_tasks.get(user_id)
+        """获取用户最近一次计划生成任务状态（含排队位置、耗时和重试次数）"""
+        job = job_queue.latest_job(user_id, PLAN_JOB_KIND)
+        if not job:
+            return None
+        return {
+            "status": "processing" if job.status in ("queued", "running") else job.status,
+            "goal_id": job.payload.get("goal_id"),
+            "msg": job.msg,
+            "job": job.to_dict(),
+            "queue_position": job_queue.queue_position(job),
+            "queue_depth": job_queue.queue_depth(),
+        }
 
     @staticmethod
     def generate_plan(user_id: int, goal_id: int) -> tuple[bool, str, dict | None]:
-        """触发 LLM 生成计划（后台线程）"""
+        """触发 LLM 生成计划（提交到后台任务队列）"""
         goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
         if not goal:
             return False, "目标不存在", None
 
-        with _tasks_lock:
-            task = _plan_tasks.get(user_id)
-            if task and task["status"] == "processing":
-                return False, "正在生成计划，请稍候", {"status": "processing"}
-
-        with _tasks_lock:
-            _plan_tasks[user_id] = {"status": "processing", "goal_id": goal_id, "msg": "正在生成..."}
+        if job_queue.active_job(user_id, PLAN_JOB_KIND):
+            return False, "正在生成计划，请稍候", {"status": "processing"}
 
-        app = current_app._get_current_object()
-        thread = threading.Thread(
-            target=GoalService._generate_plan_in_background,
-            args=(app, user_id, goal_id),
-            daemon=True,
-        )
-        thread.start()
-        return True, "计划生成已启动", {"status": "processing"}
+        try:
+            job = job_queue.enqueue(PLAN_JOB_KIND, user_id, {"goal_id": goal_id})
+        except ActiveJobExists:
+            return False, "正在生成计划，请稍候", {"status": "processing"}
+        return True, "计划生成已启动", {"status": "processing", "job_id": job.id}
 
     @staticmethod
-    def _generate_plan_in_background(app, user_id: int, goal_id: int):
-        """后台线程：LLM 目标拆解 + 笔记匹配"""
-        with app.app_context():
-            try:
-                goal = Goal.query.get(goal_id)
-                if not goal:
-                    raise ValueError("目标不存在")
-
-                # 1. 收集用户相关笔记（收藏 + 内容池博主笔记）
-                notes = GoalService._collect_user_notes(user_id)
-                notes_context = GoalService._build_notes_context(notes)
-
-                logger.info(f"用户 {user_id}: 收集到 {len(notes)} 条笔记用于计划生成")
-
-                # 2. 调用 LLM 拆解目标
-                plan_result = llm_service.decompose_goal(goal.title, notes_context)
-
-                if not plan_result or "steps" not in plan_result:
-                    raise ValueError("LLM 目标拆解失败，未返回有效步骤")
-
-                raw_steps = plan_result["steps"]
-
-                # 3. 删除旧步骤（如果有），创建新步骤
-                PlanStep.query.filter_by(goal_id=goal_id).delete()
-                db.session.flush()
-
-                new_steps = []
-                for i, s in enumerate(raw_steps, 1):
-                    if isinstance(s, str):
-                        step = PlanStep(
-                            goal_id=goal_id, step_number=i,
-                            title=s, description="", time_estimate=""
-                        )
-                    else:
-                        step = PlanStep(
-                            goal_id=goal_id, step_number=i,
-                            title=s.get("title", f"步骤{i}"),
-                            description=s.get("description", ""),
-                            time_estimate=s.get("time_estimate", ""),
-                            start_date=s.get("start_date"),
-                            end_date=s.get("end_date"),
-                        )
-                    db.session.add(step)
-                    new_steps.append(step)
-
-                db.session.flush()
-
-                # 4. 笔记匹配（LLM + 关键词 fallback）
-                if notes:
-                    GoalService._match_and_link_notes(new_steps, notes)
-
-                goal.updated_at = datetime.utcnow()
-                db.session.commit()
-
-                logger.info(f"用户 {user_id}: 目标 {goal_id} 计划生成完成，共 {len(new_steps)} 个步骤")
-
-                with _tasks_lock:
-                    _plan_tasks[user_id] = {
-                        "status": "done", "goal_id": goal_id,
-                        "msg": f"计划生成完成，共 {len(new_steps)} 个步骤"
-                    }
-
-            except Exception as e:
-                logger.error(f"用户 {user_id}: 计划生成失败: {e}", exc_info=True)
-                with _tasks_lock:
-                    _plan_tasks[user_id] = {
-                        "status": "error", "goal_id": goal_id,
-                        "msg": f"生成失败: {str(e)}"
-                    }
+    def _run_plan_job(job) -> tuple[bool, str, dict | None]:
+        """任务队列中执行 LLM 目标拆解 + 笔记匹配（已在 app context 中）"""
+        user_id = job.user_id
+        goal_id = job.payload.get("goal_id")
+        goal = db.session.get(Goal, goal_id)
+        if not goal:
+            return False, "目标不存在", {"goal_id": goal_id}
+
+        # 1. 收集用户相关笔记（收藏 + 内容池博主笔记）
+        notes = GoalService._collect_user_notes(user_id)
+        notes_context = GoalService._build_notes_context(notes)
+
+        logger.info(f"用户 {user_id}: 收集到 {len(notes)} 条笔记用于计划生成")
+
+        # 2. 调用 LLM 拆解目标
+        plan_result = llm_service.decompose_goal(goal.title, notes_context)
+
+        if not plan_result or "steps" not in plan_result:
+            raise ValueError("LLM 目标拆解失败，未返回有效步骤")
+
+        raw_steps = plan_result["steps"]
+
+        # 3. 删除旧步骤（如果有），创建新步骤
+        PlanStep.query.filter_by(goal_id=goal_id).delete()
+        db.session.flush()
+
+        new_steps = []
+        for i, s in enumerate(raw_steps, 1):
+            if isinstance(s, str):
+                step = PlanStep(
+                    goal_id=goal_id, step_number=i,
+                    title=s, description="", time_estimate=""
+                )
+            else:
+                step = PlanStep(
+                    goal_id=goal_id, step_number=i,
+                    title=s.get("title", f"步骤{i}"),
+                    description=s.get("description", ""),
+                    time_estimate=s.get("time_estimate", ""),
+                    start_date=s.get("start_date"),
+                    end_date=s.get("end_date"),
+                )
+            db.session.add(step)
+            new_steps.append(step)
+
+        db.session.flush()
+
+        # 4. 笔记匹配（LLM + 关键词 fallback）
+        if notes:
+            GoalService._match_and_link_notes(new_steps, notes)
+
+        goal.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        logger.info(f"用户 {user_id}: 目标 {goal_id} 计划生成完成，共 {len(new_steps)} 个步骤")
+
+        return True, f"计划生成完成，共 {len(new_steps)} 个步骤", {"goal_id": goal_id}
 
     @staticmethod
     def _collect_user_notes(user_id: int) -> list[Note]:
@@ -363,6 +352,7 @@ class GoalService:
     def list_bookmarks(user_id: int, page: int = 1, per_page: int = 20) -> dict:
         """列出用户收藏的笔记"""
         pagination = UserBookmark.query.filter_by(user_id=user_id) \
+            .options(joinedload(UserBookmark.note)) \
             .order_by(UserBookmark.created_at.desc()) \
             .paginate(page=page, per_page=per_page, error_out=False)
         return {
@@ -372,6 +362,18 @@ class GoalService:
             "pages": pagination.pages,
         }
 
+    @staticmethod
+    def list_bookmarks_page(user_id: int, cursor: str | None = None, per_page: int = 20,
+                            with_total: bool = False) -> tuple[bool, str, dict | None]:
+        """游标分页列出收藏，按 (created_at, id) 倒序，笔记随收藏一起 JOIN 查出"""
+        query = UserBookmark.query.filter_by(user_id=user_id).options(joinedload(UserBookmark.note))
+        try:
+            page = keyset_page(query, UserBookmark, cursor, per_page, with_total)
+        except ValueError as e:
+            return False, str(e), None
+        page["items"] = [bm.to_dict() for bm in page["items"]]
+        return True, "ok", page
+
     @staticmethod
     def delete_bookmark(user_id: int, bookmark_id: int) -> tuple[bool, str]:
         """取消收藏"""
@@ -381,3 +383,6 @@ class GoalService:
         db.session.delete(bookmark)
         db.session.commit()
         return True, "已取消收藏"
+
+
+job_queue.register(PLAN_JOB_KIND, GoalService._run_plan_job)
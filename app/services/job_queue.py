@@ -0,0 +1,313 @@
+# encoding: utf-8
+"""
+持久化任务队列：jobs 表 + 每个进程一个调度线程 + 有界线程池
+
+- 任务状态全部存库，gunicorn 多个 worker 看到的状态一致
+- 认领任务用条件 UPDATE（status='queued' 才能改成 running），多进程不会重复执行
+- 运行中的任务定期写心跳；进程被杀或重启后心跳中断，超时的任务重新排队或标记失败
+- 处理函数返回 (success, msg, result)：success=False 为业务失败，不重试；抛异常则按退避重试
+"""
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from loguru import logger
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.job import Job
+from app.services.scheduler import current_owner
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class ActiveJobExists(Exception):
+    """该用户已有同类任务在排队或运行（jobs 部分唯一索引拒绝插入）"""
+
+    def __init__(self, job: Job):
+        super().__init__(f"任务 {job.id} [{job.kind}] 正在进行")
+        self.job = job
+
+
+class JobProgress:
+    """
+    任务进度：计数器 + 部分结果（items）
+
+    通过独立连接直接 UPDATE jobs.progress_json，不经过任务自身的 session，
+    不会提前提交任务里尚未 flush 的数据；可在任意线程中调用。
+    """
+
+    def __init__(self, job_id: int, engine, **counters):
+        self.job_id = job_id
+        self._engine = engine
+        self._lock = threading.Lock()
+        self._state = {**counters, "items": []}
+        self._write()
+
+    def incr(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._state[key] = self._state.get(key, 0) + delta
+            self._write()
+
+    def add_item(self, item: dict, **deltas):
+        with self._lock:
+            self._state["items"].append(item)
+            for key, delta in deltas.items():
+                self._state[key] = self._state.get(key, 0) + delta
+            self._write()
+
+    def _write(self):
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(
+                    update(Job.__table__)
+                    .where(Job.__table__.c.id == self.job_id)
+                    .values(progress_json=json.dumps(self._state, ensure_ascii=False))
+                )
+        except Exception as e:
+            logger.warning(f"任务 {self.job_id} 进度写入失败: {e}")
+
+
+class JobQueue:
+    """数据库任务队列"""
+
+    def __init__(self):
+        self._handlers = {}
+        self._app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pool = None
+        self._slots = None
+        self._running = set()  # 当前进程正在执行的 job id
+        self.worker_name = None
+
+    # ─── 注册 / 提交 ─────────────────────────────────
+
+    def register(self, kind: str, handler):
+        """注册任务处理函数 handler(job) -> (success, msg, result)"""
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, user_id: int, payload: dict | None = None,
+                max_attempts: int | None = None) -> Job:
+        """提交任务并唤醒本进程的调度线程；该用户已有同类任务在进行时抛出 ActiveJobExists"""
+        if kind not in self._handlers:
+            raise ValueError(f"未注册的任务类型: {kind}")
+        if max_attempts is None:
+            max_attempts = current_app.config["JOB_MAX_ATTEMPTS"]
+        job = Job(
+            kind=kind,
+            user_id=user_id,
+            status="queued",
+            payload_json=json.dumps(payload or {}, ensure_ascii=False),
+            max_attempts=max(1, max_attempts),
+            msg="排队中",
+        )
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            active = self.active_job(user_id, kind)
+            if active is None:
+                raise
+            raise ActiveJobExists(active)
+        self.ensure_started(current_app._get_current_object())
+        self._wake.set()
+        return job
+
+    @staticmethod
+    def progress(job: Job, **counters) -> JobProgress:
+        """在任务处理函数中创建进度上报器（需在 app context 中调用）"""
+        return JobProgress(job.id, db.engine, **counters)
+
+    # ─── 查询 ────────────────────────────────────────
+
+    @staticmethod
+    def active_job(user_id: int, kind: str) -> Job | None:
+        return Job.query.filter(
+            Job.user_id == user_id, Job.kind == kind, Job.status.in_(ACTIVE_STATUSES)
+        ).order_by(Job.id.desc()).first()
+
+    @staticmethod
+    def latest_job(user_id: int, kind: str) -> Job | None:
+        return Job.query.filter_by(user_id=user_id, kind=kind).order_by(Job.id.desc()).first()
+
+    @staticmethod
+    def queue_position(job: Job) -> int:
+        """排在该任务之前的排队任务数（仅对 queued 状态有意义）"""
+        if job.status != "queued":
+            return 0
+        return db.session.scalar(
+            select(func.count(Job.id)).where(Job.status == "queued", Job.id < job.id)
+        )
+
+    @staticmethod
+    def queue_depth() -> dict:
+        """各状态的任务数：{"queued": n, "running": m}"""
+        rows = db.session.execute(
+            select(Job.status, func.count(Job.id))
+            .where(Job.status.in_(ACTIVE_STATUSES))
+            .group_by(Job.status)
+        ).all()
+        depth = {status: 0 for status in ACTIVE_STATUSES}
+        depth.update({status: count for status, count in rows})
+        return depth
+
+    # ─── 调度线程 ────────────────────────────────────
+
+    def ensure_started(self, app):
+        """按需启动当前进程的调度线程（preload_app fork 出的子进程会各自启动）"""
+        pid = os.getpid()
+        if self._pid == pid and self._app is app:
+            return
+        with self._lock:
+            self._app = app
+            if self._pid == pid:
+                return
+            workers = app.config["JOB_WORKERS"]
+            self._pid = pid
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+            self._slots = threading.BoundedSemaphore(workers)
+            self._running = set()
+            self.worker_name = f"{socket.gethostname()}:{pid}"
+            threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True).start()
+        logger.info(f"任务调度线程已启动 [{self.worker_name}]，并发 {workers}")
+
+    def _dispatch_loop(self):
+        last_maintenance = 0.0
+        while True:
+            app = self._app
+            try:
+                with app.app_context():
+                    config = app.config
+                    now = time.monotonic()
+                    if now - last_maintenance >= config["JOB_HEARTBEAT_INTERVAL"]:
+                        self._heartbeat()
+                        self._requeue_stale(config["JOB_STALE_SECONDS"])
+                        last_maintenance = now
+                    # 有空闲槽位时尽量多认领
+                    while self._slots.acquire(blocking=False):
+                        try:
+                            job_id = self._claim_next()
+                        except Exception:
+                            self._slots.release()
+                            raise
+                        if job_id is None:
+                            self._slots.release()
+                            break
+                        self._pool.submit(self._run, app, job_id)
+            except Exception as e:
+                logger.error(f"任务调度异常: {e}", exc_info=True)
+            self._wake.wait(app.config["JOB_POLL_INTERVAL"])
+            self._wake.clear()
+
+    def _claim_next(self) -> int | None:
+        """原子地认领一个到期的、本进程能处理的排队任务"""
+        while True:
+            now = datetime.utcnow()
+            candidate = db.session.scalar(
+                select(Job.id)
+                .where(Job.status == "queued", Job.available_at <= now,
+                       Job.kind.in_(list(self._handlers)))
+                .order_by(Job.id)
+                .limit(1)
+            )
+            if candidate is None:
+                db.session.rollback()
+                return None
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == candidate, Job.status == "queued")
+                .values(status="running", worker=self.worker_name, started_at=now,
+                        heartbeat_at=now, attempts=Job.attempts + 1, msg="正在生成...")
+            ).rowcount
+            db.session.commit()
+            # rowcount 为 0 说明被其他进程抢先认领，继续找下一个
+            if claimed:
+                with self._lock:
+                    self._running.add(candidate)
+                return candidate
+
+    def _run(self, app, job_id: int):
+        try:
+            with app.app_context():
+                job = db.session.get(Job, job_id)
+                handler = self._handlers[job.kind]
+                # 任务内的 XHS / LLM 调用按提交任务的用户公平排队
+                owner_token = current_owner.set(job.user_id)
+                try:
+                    success, msg, result = handler(job)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"任务 {job_id} [{job.kind}] 执行失败: {e}", exc_info=True)
+                    self._fail(job, f"生成失败: {str(e)}")
+                    return
+                finally:
+                    current_owner.reset(owner_token)
+                job.status = "done" if success else "error"
+                job.msg = msg
+                job.result_json = json.dumps(result or {}, ensure_ascii=False)
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"任务 {job_id} 状态更新失败: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+            self._slots.release()
+            self._wake.set()
+
+    def _fail(self, job: Job, msg: str):
+        """异常失败：还有重试次数则按指数退避重新排队"""
+        job = db.session.get(Job, job.id)
+        if job.attempts < job.max_attempts:
+            backoff = current_app.config["JOB_RETRY_BACKOFF"] * (2 ** (job.attempts - 1))
+            job.status = "queued"
+            job.available_at = datetime.utcnow() + timedelta(seconds=backoff)
+            job.msg = f"{msg}，{backoff:g} 秒后重试（第 {job.attempts}/{job.max_attempts} 次）"
+        else:
+            job.status = "error"
+            job.msg = msg
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    def _heartbeat(self):
+        with self._lock:
+            running = list(self._running)
+        if running:
+            db.session.execute(
+                update(Job).where(Job.id.in_(running)).values(heartbeat_at=datetime.utcnow())
+            )
+            db.session.commit()
+
+    def _requeue_stale(self, stale_seconds: float):
+        """心跳超时的 running 任务（所在进程已退出）重新排队或标记失败"""
+        deadline = datetime.utcnow() - timedelta(seconds=stale_seconds)
+        stale = Job.query.filter(Job.status == "running", Job.heartbeat_at < deadline).all()
+        for job in stale:
+            if job.attempts < job.max_attempts:
+                job.status = "queued"
+                job.available_at = datetime.utcnow()
+                job.msg = f"执行进程 {job.worker} 中断，重新排队"
+            else:
+                job.status = "error"
+                job.msg = "执行进程中断，已达最大重试次数"
+                job.finished_at = datetime.utcnow()
+            logger.warning(f"任务 {job.id} [{job.kind}] 心跳超时（{job.worker}），状态 -> {job.status}")
+        if stale:
+            db.session.commit()
+            self._wake.set()
+        else:
+            db.session.rollback()
+
+
+# 全局单例
+job_queue = JobQueue()
@@ -0,0 +1,158 @@
+# encoding: utf-8
+"""
+LLM 响应缓存 - 按 (模型, prompt 哈希, 采样参数) 内容寻址
+
+两级存储:
+- 内存层: cachetools.TTLCache，进程内 LRU + TTL
+- 持久层: 独立的 SQLite 文件（不占用业务库写锁），gunicorn 多个 worker 与重启后共享
+
+只缓存成功的响应；超过 TTL 的条目在读取时丢弃，持久层每 evict_every 次写入清理一次过期条目，
+超过 max_entries 时按最近访问时间淘汰（两次清理之间条目数可能略超上限）。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import TTLCache
+from loguru import logger
+
+
+class LLMResponseCache:
+    """两级 LLM 响应缓存"""
+
+    def __init__(self, db_path: str | None = None, ttl: float = 7 * 86400,
+                 memory_size: int = 1024, max_entries: int = 50000, evict_every: int = 100):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self._writes = 0
+        self._memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._conn = None
+        if db_path:
+            self._conn = self._open(db_path)
+
+    @staticmethod
+    def _open(db_path: str):
+        try:
+            directory = os.path.dirname(os.path.abspath(db_path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " response TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_created_at ON llm_cache (created_at)")
+            return conn
+        except sqlite3.Error as e:
+            logger.warning(f"LLM 持久缓存不可用，仅使用内存缓存: {e}")
+            return None
+
+    @staticmethod
+    def make_key(model: str, messages: list, params: dict) -> str:
+        """模型 + 消息内容 + 采样参数 -> sha256"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._stats["memory_hits"] += 1
+                return value
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["disk_hits"] += 1
+                self._memory[key] = value
+        return value
+
+    def set(self, key: str, model: str, value: str):
+        if value is None:
+            return
+        with self._lock:
+            self._memory[key] = value
+            self._stats["writes"] += 1
+        self._disk_set(key, model, value)
+
+    def _disk_get(self, key: str) -> str | None:
+        if self._conn is None:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > self.ttl:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    return None
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"读取 LLM 持久缓存失败: {e}")
+            return None
+
+    def _disk_set(self, key: str, model: str, value: str):
+        if self._conn is None:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, model, value, now, now),
+                )
+                self._writes += 1
+                # 每 evict_every 次写入清理一次，避免每次写入都 COUNT 全表
+                if self._writes % self.evict_every == 0:
+                    self._evict(now)
+        except sqlite3.Error as e:
+            logger.warning(f"写入 LLM 持久缓存失败: {e}")
+
+    def _evict(self, now: float):
+        """删除过期条目，并把条目数压回 max_entries 以内（最久未访问的先淘汰）"""
+        expired = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+        self._stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def stats(self) -> dict:
+        """命中 / 未命中计数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
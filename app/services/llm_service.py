@@ -7,10 +7,40 @@ LLM 服务抽象层 - 通过 vLLM OpenAI 兼容 API 调用沐曦 GPU 上的模
 - Qwen3-4B (port 8001): 标签生成、笔记匹配 (light)
 - Qwen3-VL-8B (port 8002): OCR 截图识别 (vision)
 """
+import contextvars
+import json
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 from flask import current_app
 from loguru import logger
 from openai import OpenAI
 
+from app.services.llm_cache import LLMResponseCache
+from app.services.scheduler import scheduler
+
+# 模型 -> 全局调度资源
+MODEL_RESOURCES = {
+    "Qwen3-8B": "llm_heavy",
+    "Qwen3-4B": "llm_light",
+    "Qwen3-VL-8B-Instruct": "llm_vision",
+}
+
+
+def _extract_json(text: str) -> dict | None:
+    """从模型回复中截取第一个 { 到最后一个 } 之间的 JSON 对象，解析失败时返回 None"""
+    start = text.find("{")
+    end = text.rfind("}") + 1
+    if start < 0 or end <= start:
+        return None
+    try:
+        value = json.loads(text[start:end])
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
 
 class LLMService:
     """统一本地模型调用层"""
@@ -19,6 +49,7 @@ class LLMService:
         self._heavy_client = None
         self._light_client = None
         self._vision_client = None
+        self._cache = None
 
     def _get_heavy_client(self) -> OpenAI:
         if self._heavy_client is None:
@@ -41,21 +72,57 @@ class LLMService:
             self._vision_client = OpenAI(base_url=f"{base}:{port}/v1", api_key="dummy")
         return self._vision_client
 
-    def _call(self, client: OpenAI, model: str, messages: list, **kwargs) -> str | None:
-        """统一调用封装"""
+    def _get_cache(self) -> LLMResponseCache | None:
+        """响应缓存，LLM_CACHE_ENABLED=false 时返回 None"""
+        if self._cache is None:
+            config = current_app.config
+            if not config["LLM_CACHE_ENABLED"]:
+                self._cache = False
+            else:
+                db_path = config["LLM_CACHE_DB_PATH"] or os.path.join(current_app.instance_path, "llm_cache.db")
+                self._cache = LLMResponseCache(
+                    db_path=db_path,
+                    ttl=config["LLM_CACHE_TTL"],
+                    memory_size=config["LLM_CACHE_MEMORY_SIZE"],
+                    max_entries=config["LLM_CACHE_MAX_ENTRIES"],
+                )
+        return self._cache or None
+
+    def cache_stats(self) -> dict | None:
+        """缓存命中统计，缓存未启用或尚未初始化时返回 None"""
+        return self._cache.stats() if self._cache else None
+
+    def _call(self, client: OpenAI, model: str, messages: list,
+              use_cache: bool = True, validate: Callable[[str], bool] | None = None,
+              **kwargs) -> str | None:
+        """
+        统一调用封装，use_cache=False 时跳过响应缓存（既不读也不写）
+        :param validate: 回复的校验函数，返回 False 时不写入缓存，下次调用重新请求模型
+        """
+        cache = self._get_cache() if use_cache else None
+        key = None
+        if cache is not None:
+            key = cache.make_key(model, messages, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
         try:
-            resp = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                **kwargs,
-            )
-            return resp.choices[0].message.content
+            with scheduler.slot(MODEL_RESOURCES.get(model, "llm_heavy")):
+                resp = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **kwargs,
+                )
+            content = resp.choices[0].message.content
         except Exception as e:
             logger.error(f"LLM 调用失败 [{model}]: {e}")
             return None
+        if cache is not None and content and (validate is None or validate(content)):
+            cache.set(key, model, content)
+        return content
 
-    def summarize_note(self, title: str, desc: str, tags: list[str] | None = None) -> str | None:
-        """Qwen3-8B 生成笔记摘要"""
+    @staticmethod
+    def _build_summary_prompt(title: str, desc: str, tags: list[str] | None = None) -> str:
         tags_str = ", ".join(tags) if tags else ""
         prompt = (
             f"请用 2-3 句话总结以下小红书笔记的核心内容：\n\n"
@@ -65,16 +132,66 @@ class LLMService:
         if tags_str:
             prompt += f"标签：{tags_str}\n"
         prompt += "\n请直接给出摘要，不要加任何前缀。"
+        return prompt
 
+    def summarize_note(self, title: str, desc: str, tags: list[str] | None = None,
+                       use_cache: bool = True) -> str | None:
+        """Qwen3-8B 生成笔记摘要"""
         return self._call(
             self._get_heavy_client(),
             "Qwen3-8B",
-            [{"role": "user", "content": prompt}],
+            [{"role": "user", "content": self._build_summary_prompt(title, desc, tags)}],
+            use_cache=use_cache,
             max_tokens=256,
             temperature=0.7,
         )
 
-    def generate_tags(self, notes_info: list[dict]) -> list[str]:
+    @contextmanager
+    def summary_pool(self, max_concurrency: int | None = None, use_cache: bool = True):
+        """
+        有界并发的摘要提交池：with 块内可随时 submit(note) 得到 Future，退出时等待全部完成
+
+        用于边抓取边摘要的流水线；note 包含 title / desc / tags
+        """
+        if max_concurrency is None:
+            max_concurrency = current_app.config["LLM_SUMMARY_CONCURRENCY"]
+        # 客户端和缓存在当前线程（有 app context）中初始化好，工作线程只负责发请求
+        client = self._get_heavy_client()
+        if use_cache:
+            self._get_cache()
+
+        def summarize(note: dict) -> str | None:
+            prompt = self._build_summary_prompt(note.get("title", ""), note.get("desc", ""), note.get("tags"))
+            return self._call(
+                client,
+                "Qwen3-8B",
+                [{"role": "user", "content": prompt}],
+                use_cache=use_cache,
+                max_tokens=256,
+                temperature=0.7,
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="llm-summary") as pool:
+            # 每个子任务带上当前 context，全局调度仍按提交任务的用户排队
+            yield lambda note: pool.submit(contextvars.copy_context().run, summarize, note)
+
+    def summarize_notes(self, notes: list[dict], max_concurrency: int | None = None,
+                        use_cache: bool = True) -> list[str | None]:
+        """
+        Qwen3-8B 批量生成笔记摘要
+
+        以有界并发一次性提交所有请求，由 vLLM 在服务端合批；
+        notes 每项包含 title / desc / tags，返回与输入顺序一致的摘要列表（失败项为 None）
+        """
+        if not notes:
+            return []
+        if max_concurrency is None:
+            max_concurrency = current_app.config["LLM_SUMMARY_CONCURRENCY"]
+        with self.summary_pool(min(max_concurrency, len(notes)), use_cache) as submit:
+            futures = [submit(note) for note in notes]
+        return [f.result() for f in futures]
+
+    def generate_tags(self, notes_info: list[dict], use_cache: bool = True) -> list[str]:
         """Qwen3-4B 根据博主笔记自动生成分类标签"""
         notes_text = "\n".join(
             f"- {n.get('title', '')}：{n.get('desc', '')[:100]}" for n in notes_info[:10]
@@ -88,6 +205,7 @@ class LLMService:
             self._get_light_client(),
             "Qwen3-4B",
             [{"role": "user", "content": prompt}],
+            use_cache=use_cache,
             max_tokens=100,
             temperature=0.5,
         )
@@ -95,7 +213,7 @@ class LLMService:
             return [t.strip() for t in result.split(",") if t.strip()]
         return []
 
-    def decompose_goal(self, goal: str, user_notes_context: str = "") -> dict | None:
+    def decompose_goal(self, goal: str, user_notes_context: str = "", use_cache: bool = True) -> dict | None:
         """Qwen3-8B 目标拆解为计划步骤"""
         prompt = (
             f"你是一个学习规划助手。请将以下学习目标拆解为具体的学习步骤。\n\n"
@@ -112,22 +230,20 @@ class LLMService:
             self._get_heavy_client(),
             "Qwen3-8B",
             [{"role": "user", "content": prompt}],
+            use_cache=use_cache,
+            # 没有 steps 的回复不缓存，任务重试时才能拿到新的回复
+            validate=lambda text: isinstance((_extract_json(text) or {}).get("steps"), list),
             max_tokens=1024,
             temperature=0.7,
         )
         if result:
-            import json
-            try:
-                # 尝试从回复中提取 JSON
-                start = result.find("{")
-                end = result.rfind("}") + 1
-                if start >= 0 and end > start:
-                    return json.loads(result[start:end])
-            except json.JSONDecodeError:
-                logger.warning(f"解析目标拆解结果失败: {result[:200]}")
+            plan = _extract_json(result)
+            if plan is not None:
+                return plan
+            logger.warning(f"解析目标拆解结果失败: {result[:200]}")
         return None
 
-    def match_notes_to_steps(self, steps: list[dict], notes: list[dict]) -> dict:
+    def match_notes_to_steps(self, steps: list[dict], notes: list[dict], use_cache: bool = True) -> dict:
         """Qwen3-4B 将笔记匹配到对应学习步骤"""
         steps_text = "\n".join(
             f"步骤{i+1}: {s.get('title', '')}" for i, s in enumerate(steps)
@@ -147,18 +263,16 @@ class LLMService:
             self._get_light_client(),
             "Qwen3-4B",
             [{"role": "user", "content": prompt}],
+            use_cache=use_cache,
+            validate=lambda text: _extract_json(text) is not None,
             max_tokens=512,
             temperature=0.3,
         )
         if result:
-            import json
-            try:
-                start = result.find("{")
-                end = result.rfind("}") + 1
-                if start >= 0 and end > start:
-                    return json.loads(result[start:end])
-            except json.JSONDecodeError:
-                logger.warning(f"解析笔记匹配结果失败: {result[:200]}")
+            matches = _extract_json(result)
+            if matches is not None:
+                return matches
+            logger.warning(f"解析笔记匹配结果失败: {result[:200]}")
         return {"matches": {}}
 
     def ocr_follow_list(self, image_base64: str) -> list[str]:
@@ -185,6 +299,8 @@ class LLMService:
             self._get_vision_client(),
             "Qwen3-VL-8B-Instruct",
             messages,
+            # 截图几乎不会重复，base64 入缓存只会挤占空间
+            use_cache=False,
             max_tokens=512,
             temperature=0.1,
         )
@@ -0,0 +1,58 @@
+# encoding: utf-8
+"""
+按 (created_at, id) 的游标（keyset）分页，列表按时间倒序
+
+与 OFFSET 分页相比，翻到第几页都只需要沿索引从游标位置往后读 limit 行，不会越翻越慢；
+总数需要单独一次 COUNT，只在调用方要求时才查。
+游标是上一页最后一行的 (created_at, id)，编码为不透明的 URL 安全字符串。
+"""
+import base64
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+MAX_PER_PAGE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """解析游标，格式不对时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def keyset_page(query, model, cursor: str | None = None, per_page: int = 20,
+                with_total: bool = False) -> dict:
+    """
+    取一页 model 行（按 created_at、id 倒序）
+    :param query: 已加好过滤条件（如 user_id）的查询，不要带排序
+    :param cursor: 上一页返回的 next_cursor，为空时取第一页
+    :return: {"items": [model], "next_cursor": str | None, "has_more": bool, "per_page": int[, "total": int]}
+    游标格式不对时抛出 ValueError
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    key = tuple_(model.created_at, model.id)
+    page_query = query
+    if cursor:
+        page_query = page_query.filter(key < tuple_(*decode_cursor(cursor)))
+    # 多取一行判断是否还有下一页
+    rows = page_query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    result = {
+        "items": rows,
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+        "has_more": has_more,
+        "per_page": per_page,
+    }
+    if with_total:
+        result["total"] = query.order_by(None).count()
+    return result
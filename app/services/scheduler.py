@@ -0,0 +1,170 @@
+# encoding: utf-8
+"""
+全局资源调度：XHS 抓取与各档 LLM 服务的并发上限 + 按用户公平排队
+
+每类资源一个公平信号量：等待者按用户分队，用户之间轮转放行，
+一个用户一次提交大量请求时不会把其他用户饿死。
+当前用户通过 contextvar 传递（任务队列执行任务时设置），线程池中的子任务需显式传 owner
+或用 contextvars.copy_context() 提交。
+
+上限为单进程内的并发数，多 worker 部署时总并发 = 上限 x worker 数。
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_OWNER = "anonymous"
+
+# 当前请求 / 任务所属用户
+current_owner = contextvars.ContextVar("scheduler_owner", default=DEFAULT_OWNER)
+
+# 资源名 -> 配置项
+RESOURCE_CONFIG_KEYS = {
+    "xhs": "SCHED_XHS_CONCURRENCY",
+    "llm_heavy": "SCHED_LLM_HEAVY_CONCURRENCY",
+    "llm_light": "SCHED_LLM_LIGHT_CONCURRENCY",
+    "llm_vision": "SCHED_LLM_VISION_CONCURRENCY",
+}
+
+
+class FairSemaphore:
+    """按 owner 轮转放行的信号量"""
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = max(1, int(capacity))
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._queues = {}          # owner -> deque[ticket]
+        self._rotation = deque()   # 有等待者的 owner，队首先放行
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def set_capacity(self, capacity: int):
+        with self._cond:
+            self.capacity = max(1, int(capacity))
+            self._cond.notify_all()
+
+    def _is_next(self, owner, ticket) -> bool:
+        return (self._in_use < self.capacity and self._rotation
+                and self._rotation[0] == owner and self._queues[owner][0] is ticket)
+
+    def acquire(self, owner=DEFAULT_OWNER, timeout: float | None = None) -> bool:
+        start = time.monotonic()
+        with self._cond:
+            if self._in_use < self.capacity and not self._rotation:
+                self._grant(start)
+                return True
+
+            ticket = object()
+            if owner not in self._queues:
+                self._queues[owner] = deque()
+                self._rotation.append(owner)
+            self._queues[owner].append(ticket)
+
+            deadline = None if timeout is None else start + timeout
+            while not self._is_next(owner, ticket):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._remove(owner, ticket)
+                    self._timeouts += 1
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(remaining)
+
+            # 放行队首用户的一个请求，该用户还有等待者则排到轮转队尾
+            self._rotation.popleft()
+            queue = self._queues[owner]
+            queue.popleft()
+            if queue:
+                self._rotation.append(owner)
+            else:
+                del self._queues[owner]
+            self._grant(start)
+            # 下一位可能也能立即放行
+            self._cond.notify_all()
+            return True
+
+    def _grant(self, start: float):
+        waited = time.monotonic() - start
+        self._in_use += 1
+        self._acquired += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def _remove(self, owner, ticket):
+        queue = self._queues[owner]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[owner]
+            self._rotation.remove(owner)
+
+    def release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "in_use": self._in_use,
+                "waiting": sum(len(q) for q in self._queues.values()),
+                "waiting_owners": len(self._queues),
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._wait_total / self._acquired * 1000, 1) if self._acquired else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 1),
+            }
+
+
+class ResourceScheduler:
+    """按资源名管理公平信号量"""
+
+    def __init__(self):
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """按配置设置各资源并发上限"""
+        for resource, key in RESOURCE_CONFIG_KEYS.items():
+            self.configure(resource, app.config[key])
+
+    def configure(self, resource: str, capacity: int):
+        with self._lock:
+            semaphore = self._resources.get(resource)
+            if semaphore is None:
+                self._resources[resource] = FairSemaphore(resource, capacity)
+                return
+        semaphore.set_capacity(capacity)
+
+    def _get(self, resource: str) -> FairSemaphore:
+        with self._lock:
+            semaphore = self._resources.get(resource)
+            if semaphore is None:
+                # 未配置的资源给一个保守的默认值
+                semaphore = self._resources[resource] = FairSemaphore(resource, 4)
+            return semaphore
+
+    @contextmanager
+    def slot(self, resource: str, owner=None):
+        """占用一个资源槽位，owner 缺省取 current_owner"""
+        semaphore = self._get(resource)
+        semaphore.acquire(current_owner.get() if owner is None else owner)
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            resources = dict(self._resources)
+        return {name: semaphore.stats() for name, semaphore in resources.items()}
+
+
+# 全局单例
+scheduler = ResourceScheduler()
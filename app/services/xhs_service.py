@@ -1,42 +1,156 @@
 # encoding: utf-8
-"""XHS 爬虫服务封装层，包装现有 XHS_Apis + TTLCache 缓存"""
-from cachetools import TTLCache
+"""XHS 爬虫服务封装层，包装现有 XHS_Apis + 可插拔缓存后端（进程内 / SQLite / Redis）"""
+import threading
+
 from flask import current_app
 from loguru import logger
 
 from apis.xhs_pc_apis import XHS_Apis
+from app.services.cache_backend import CacheBackend, NamespacedCache, create_cache_backend
+from app.services.cookie_pool import CookiePool, load_cookie_strings
+from app.services.feed_cache import NAMESPACE as FEED_NAMESPACE, BloggerFeedCache
+from app.services.scheduler import current_owner, scheduler
 from xhs_utils.note_fetcher import NoteFetcher
 from xhs_utils.share_link_parser import ShareLinkParser
 from xhs_utils.data_util import handle_note_info
+from xhs_utils.rate_limiter import RateLimiter, parse_rates
 
 
 class XHSService:
     """封装 XHS API 调用，提供缓存和统一错误处理"""
 
     def __init__(self):
-        self.api = XHS_Apis()
+        self._api = None
+        self._api_lock = threading.Lock()
+        self._cookie_pool = None
+        self._cookie_pool_lock = threading.Lock()
         self.parser = ShareLinkParser()
-        # 缓存：最多 256 条，TTL 10 分钟
-        self._user_cache = TTLCache(maxsize=256, ttl=600)
-        self._note_cache = TTLCache(maxsize=512, ttl=600)
+        # 缓存后端与各命名空间，首次使用时按配置创建
+        self._cache_lock = threading.RLock()
+        self._cache = None
+        self._user_cache = None
+        self._note_cache = None
+        self._feed_cache = None
+
+    @property
+    def api(self) -> XHS_Apis:
+        """首次使用时按配置创建 XHS_Apis（进程内共享连接池，gunicorn fork 之后才建立连接）"""
+        if self._api is None:
+            with self._api_lock:
+                if self._api is None:
+                    config = current_app.config
+                    self._api = XHS_Apis(
+                        pool_size=config["XHS_HTTP_POOL_SIZE"],
+                        timeout=(config["XHS_CONNECT_TIMEOUT"], config["XHS_READ_TIMEOUT"]),
+                        max_retries=config["XHS_HTTP_RETRIES"],
+                        rate_limiter=self._build_rate_limiter(config),
+                        on_response=self.cookie_pool.observe,
+                    )
+        return self._api
+
+    @property
+    def cookie_pool(self) -> CookiePool:
+        """XHS 账号池（COOKIES + COOKIES_POOL），每次调用选一个账号签名"""
+        if self._cookie_pool is None:
+            with self._cookie_pool_lock:
+                if self._cookie_pool is None:
+                    config = current_app.config
+                    self._cookie_pool = CookiePool(
+                        load_cookie_strings(config),
+                        strategy=config["COOKIE_POOL_STRATEGY"],
+                        threshold=config["COOKIE_POOL_THRESHOLD"],
+                        quarantine=config["COOKIE_POOL_QUARANTINE"],
+                        max_quarantine=config["COOKIE_POOL_MAX_QUARANTINE"],
+                    )
+        return self._cookie_pool
+
+    @staticmethod
+    def _build_rate_limiter(config) -> RateLimiter | None:
+        if not config["XHS_RATE_LIMIT_ENABLED"]:
+            return None
+        return RateLimiter(
+            parse_rates(config["XHS_RATE_LIMITS"]),
+            min_rate=config["XHS_RATE_MIN"],
+            increase=config["XHS_RATE_INCREASE"],
+            decrease=config["XHS_RATE_DECREASE"],
+            penalty=config["XHS_RATE_PENALTY"],
+        )
+
+    def _init_cache(self):
+        """按 CACHE_BACKEND 配置创建缓存后端，以及搜索 / 笔记详情 / 博主笔记流三个命名空间"""
+        if self._cache is not None:
+            return
+        with self._cache_lock:
+            if self._cache is None:
+                config = current_app.config
+                backend = create_cache_backend(config, current_app.instance_path)
+                self._user_cache = backend.namespace("xhs_search_user", config["XHS_SEARCH_CACHE_TTL"])
+                self._note_cache = backend.namespace("xhs_note", config["XHS_NOTE_CACHE_TTL"])
+                self._feed_cache = BloggerFeedCache(
+                    store=backend.namespace(FEED_NAMESPACE, config["XHS_FEED_CACHE_TTL"])
+                )
+                self._cache = backend
 
     @property
-    def cookies(self) -> str:
-        return current_app.config["COOKIES"]
+    def cache(self) -> CacheBackend:
+        self._init_cache()
+        return self._cache
+
+    @property
+    def user_cache(self) -> NamespacedCache:
+        """用户搜索结果缓存"""
+        self._init_cache()
+        return self._user_cache
+
+    @property
+    def note_cache(self) -> NamespacedCache:
+        """笔记详情缓存"""
+        self._init_cache()
+        return self._note_cache
+
+    @property
+    def feed_cache(self) -> BloggerFeedCache:
+        """博主笔记流缓存（跨用户共享）"""
+        self._init_cache()
+        return self._feed_cache
+
+    def cache_stats(self) -> dict | None:
+        """缓存后端各命名空间的命中统计，未初始化时为 None"""
+        return self._cache.stats() if self._cache is not None else None
+
+    def feed_cache_stats(self) -> dict | None:
+        """博主笔记流缓存命中 / 单飞共享统计，未初始化时为 None"""
+        return self._feed_cache.stats() if self._feed_cache is not None else None
+
+    def rate_limiter_stats(self) -> dict | None:
+        """各接口族的当前速率、令牌、461 / 非 200 次数，未初始化或未启用限速时为 None"""
+        if self._api is None or self._api.rate_limiter is None:
+            return None
+        return self._api.rate_limiter.stats()
+
+    def cookie_pool_stats(self) -> dict | None:
+        """各账号健康分、隔离状态，未初始化时为 None"""
+        return self._cookie_pool.stats() if self._cookie_pool is not None else None
 
     def search_user(self, query: str, page: int = 1) -> tuple[bool, str, dict | None]:
         """搜索小红书用户"""
-        cache_key = f"search_user:{query}:{page}"
-        if cache_key in self._user_cache:
-            return True, "搜索成功(缓存)", self._user_cache[cache_key]
+        cache_key = f"{query}:{page}"
+        cached = self.user_cache.get(cache_key)
+        if cached is not None:
+            return True, "搜索成功(缓存)", cached
 
-        success, msg, res_json = self.api.search_user(query, self.cookies, page)
+        account = self.cookie_pool.acquire()
+        with scheduler.slot("xhs"):
+            success, msg, res_json = self.api.search_user(query, account.cookies, page)
+        # HTTP 错误已由 observe 按状态码计入，这里只补记 HTTP 200 但接口返回失败（如登录失效）
+        if not success and self.api.last_status_code() == 200:
+            self.cookie_pool.report(account, False)
         if success and res_json:
             data = res_json.get("data", {})
             result_code = data.get("result", {}).get("code")
             if result_code == 1000:
                 # 业务成功，缓存并返回
-                self._user_cache[cache_key] = data
+                self.user_cache.set(cache_key, data)
                 return True, "搜索成功", data
             # 非 1000（如 3002 无更多结果）：不缓存，返回空数据
             logger.warning(f"XHS search_user 业务码: code={result_code}, msg={msg}")
@@ -44,12 +158,95 @@ class XHSService:
         return False, msg, None
 
     def get_users_latest_notes(
-        self, user_ids: list[str], max_users: int = 5, notes_per_user: int = 5
+        self, user_ids: list[str], max_users: int = 5, notes_per_user: int = 5,
+        on_user_done=None, stop_at: dict | None = None
     ) -> list[dict]:
-        """批量获取多个用户最新笔记"""
-        fetcher = NoteFetcher(self.cookies)
-        notes = fetcher.get_users_latest_notes(user_ids, max_users, notes_per_user)
-        return notes
+        """
+        批量获取多个用户最新笔记，on_user_done(user_id, notes) 在每个博主完成时回调；
+        stop_at 为 {用户ID: 上次见过的最新笔记ID} 时只获取更新的笔记
+
+        先查博主笔记流缓存：命中的博主不再请求；其他任务正在抓取的博主等待对方结果；
+        其余博主由本次调用抓取并写入缓存。
+        """
+        stop_at = stop_at or {}
+        cache = self.feed_cache
+        results = {}   # 用户ID -> 笔记列表
+        claimed = {}   # 本次负责抓取的用户ID -> 单飞 token
+        waiting = {}   # 其他任务正在抓取的用户ID -> 单飞 token
+
+        def user_done(user_id: str, notes: list[dict], store: bool):
+            if store:
+                cache.store(user_id, notes, notes_per_user, stop_at.get(user_id))
+            if user_id in claimed:
+                cache.release(user_id, claimed.pop(user_id))
+            results[user_id] = notes
+            if on_user_done:
+                on_user_done(user_id, notes)
+
+        def claim(user_id: str):
+            state, value = cache.acquire(user_id, notes_per_user, stop_at.get(user_id))
+            if state == "hit":
+                user_done(user_id, value, store=False)
+            elif state == "leader":
+                claimed[user_id] = value
+            else:
+                waiting[user_id] = value
+
+        for user_id in user_ids[:max_users]:
+            claim(user_id)
+
+        try:
+            # 抓取失败的博主由 max_users 之后的博主按顺序补位；补位博主同样先查缓存、登记单飞再抓取
+            replacements = iter(user_ids[max_users:])
+            while claimed:
+                batch = list(claimed)
+                self._fetch_latest_notes(
+                    batch, len(batch), notes_per_user,
+                    lambda user_id, notes: user_done(user_id, notes, store=True), stop_at,
+                )
+                failed = [user_id for user_id in batch if user_id in claimed]
+                for user_id in failed:
+                    cache.release(user_id, claimed.pop(user_id))
+                for _ in failed:
+                    user_id = next(replacements, None)
+                    if user_id is None:
+                        break
+                    claim(user_id)
+        finally:
+            for user_id, token in claimed.items():
+                cache.release(user_id, token)
+            claimed.clear()
+
+        retry = []
+        for user_id, token in waiting.items():
+            notes = cache.wait(user_id, token, notes_per_user, stop_at.get(user_id),
+                               timeout=current_app.config["XHS_FEED_CACHE_WAIT"])
+            if notes is None:
+                retry.append(user_id)
+            else:
+                user_done(user_id, notes, store=False)
+        if retry:
+            # 等待超时或对方抓取失败：自己抓取
+            self._fetch_latest_notes(
+                retry, len(retry), notes_per_user,
+                lambda user_id, notes: user_done(user_id, notes, store=True), stop_at,
+            )
+
+        return [note for user_id in user_ids if user_id in results for note in results[user_id]]
+
+    def _fetch_latest_notes(self, user_ids: list[str], max_users: int, notes_per_user: int,
+                            on_user_done, stop_at: dict) -> list[dict]:
+        """用 NoteFetcher 实际抓取"""
+        # 抓取线程池里没有调用方的 context，这里先取出用户
+        owner = current_owner.get()
+        fetcher = NoteFetcher(
+            cookie_pool=self.cookie_pool,
+            max_workers=current_app.config["XHS_FETCH_WORKERS"],
+            per_client_limit=current_app.config["XHS_PER_CLIENT_CONCURRENCY"],
+            xhs_apis=self.api,
+            request_slot=lambda: scheduler.slot("xhs", owner),
+        )
+        return fetcher.get_users_latest_notes(user_ids, max_users, notes_per_user, on_user_done, stop_at)
 
     def parse_share_link(self, share_text: str) -> dict | None:
         """解析分享链接"""
@@ -67,9 +264,12 @@ class XHSService:
         return parsed
 
     def get_note_by_share_link(
-        self, share_text: str, get_comments: bool = False
+        self, share_text: str, get_comments: bool = False, comments_limit: int | None = None
     ) -> tuple[bool, str, dict | None]:
-        """通过分享链接获取笔记详情"""
+        """
+        通过分享链接获取笔记详情
+        :param comments_limit: 只取前若干条一级评论（不超过 XHS_COMMENT_MAX），取够即停止翻页，用于快速返回第一页
+        """
         parsed = self.parse_share_link(share_text)
         if not parsed:
             return False, "无法解析分享链接", None
@@ -78,16 +278,22 @@ class XHSService:
         explore_url = parsed["explore_url"]
 
         # 查缓存
-        if note_id in self._note_cache and not get_comments:
-            return True, "获取成功(缓存)", self._note_cache[note_id]
+        if not get_comments:
+            cached = self.note_cache.get(note_id)
+            if cached is not None:
+                return True, "获取成功(缓存)", cached
 
         # 获取笔记详情
-        success, msg, note_info = self.api.get_note_info(explore_url, self.cookies)
+        account = self.cookie_pool.acquire()
+        with scheduler.slot("xhs"):
+            success, msg, note_info = self.api.get_note_info(explore_url, account.cookies)
         if not success:
             return False, f"获取笔记失败: {msg}", None
 
         # 检查业务错误
         if note_info and not note_info.get("success", True):
+            # 只有 HTTP 200 才会解析出接口 JSON，HTTP 错误已由 observe 计入
+            self.cookie_pool.report(account, False)
             api_msg = note_info.get("msg", "未知错误")
             return False, f"小红书API返回错误: {api_msg}", None
 
@@ -111,26 +317,40 @@ class XHSService:
         # 获取评论
         if get_comments:
             handled_note["comments"] = self._fetch_comments(
-                note_id, parsed.get("xsec_token", "")
+                note_id, parsed.get("xsec_token", ""), comments_limit
             )
 
-        self._note_cache[note_id] = handled_note
+        self.note_cache.set(note_id, handled_note)
         return True, "获取笔记成功", handled_note
 
-    def _fetch_comments(self, note_id: str, xsec_token: str) -> list:
-        """获取笔记评论"""
+    def _fetch_comments(self, note_id: str, xsec_token: str, limit: int | None = None) -> list:
+        """
+        获取笔记评论：一级评论按顺序，二级评论并发展开，条数受 XHS_COMMENT_MAX / XHS_COMMENT_MAX_REPLIES 限制
+        :param limit: 一级评论条数上限（不超过 XHS_COMMENT_MAX），取够即停止翻页
+        """
         if not xsec_token:
             return []
+        config = current_app.config
+        max_comments = config["XHS_COMMENT_MAX"] if limit is None else min(limit, config["XHS_COMMENT_MAX"])
+        # 展开线程里没有调用方的 context，这里先取出用户
+        owner = current_owner.get()
+        account = self.cookie_pool.acquire()
+        comments = []
         try:
-            success, msg, comments = self.api.get_note_all_out_comment(
-                note_id, xsec_token, self.cookies
-            )
-            if success:
-                return comments
-            logger.warning(f"获取评论失败: {msg}")
+            for comment in self.api.iter_note_comments(
+                note_id, xsec_token, account.cookies,
+                workers=config["XHS_COMMENT_WORKERS"],
+                max_comments=max_comments,
+                max_replies=config["XHS_COMMENT_MAX_REPLIES"],
+                request_slot=lambda: scheduler.slot("xhs", owner),
+            ):
+                comments.append(comment)
         except Exception as e:
-            logger.error(f"获取评论异常: {e}")
-        return []
+            # 已取到的评论照常返回；HTTP 错误已由 observe 计入，只补记 HTTP 200 的业务失败
+            if getattr(e, "status_code", None) == 200:
+                self.cookie_pool.report(account, False)
+            logger.warning(f"获取评论失败（已获取 {len(comments)} 条）: {e}")
+        return comments
 
 
 # 全局单例
@@ -0,0 +1,80 @@
+# encoding: utf-8
+"""
+笔记网页 __INITIAL_STATE__ 解析基准：正则匹配整段 state + 全量 replace + json.loads（旧路径）
+vs 字符串定位 + 只解析 note.noteDetailMap 子树
+
+对 tests/fixtures 下保存的笔记页面 HTML 逐个测每页 CPU 时间和解析过程的峰值内存（tracemalloc）。
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_initial_state.py --n 200
+    python benchmarks/bench_initial_state.py --n 200 path/to/page1.html path/to/page2.html
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from xhs_utils.initial_state import extract_state_value, locate_initial_state  # noqa: E402
+
+NOTE_ID = re.compile(r'"firstNoteId":"([0-9a-z]+)"')
+
+
+def parse_full(html, note_id):
+    """旧路径：整页正则 -> 整段 replace -> 全量 json.loads"""
+    match = re.search(r'window\.__INITIAL_STATE__\s*=\s*({.*?})\s*</script>', html, re.DOTALL)
+    state = json.loads(match.group(1).replace('undefined', 'null'))
+    return state.get('note', {}).get('noteDetailMap', {}).get(note_id, {}).get('note')
+
+
+def parse_subtree(html, note_id):
+    """新路径：字符串定位，只解析 noteDetailMap"""
+    note_detail_map = extract_state_value(html, 'noteDetailMap', locate_initial_state(html)) or {}
+    return (note_detail_map.get(note_id) or {}).get('note')
+
+
+def cpu_per_page(fn, html, note_id, n):
+    start = time.process_time()
+    for _ in range(n):
+        fn(html, note_id)
+    return (time.process_time() - start) / n
+
+
+def peak_memory(fn, html, note_id):
+    tracemalloc.start()
+    try:
+        fn(html, note_id)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pages', nargs='*', help='笔记页面 HTML 文件，默认使用 tests/fixtures/xhs_note_*.html')
+    parser.add_argument('--n', type=int, default=200, help='每个页面每种解析方式的重复次数')
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(glob.glob(os.path.join(ROOT, 'tests', 'fixtures', 'xhs_note_*.html')))
+    print(f'{"页面":<24} {"大小":>8}  {"方式":<8} {"CPU/页":>10} {"峰值内存":>10}')
+    for path in pages:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        note_id = NOTE_ID.search(html).group(1)
+        # 旧路径会把正文里的 "undefined" 也替换掉，这里只核对取到的是同一篇笔记
+        assert parse_full(html, note_id)['noteId'] == parse_subtree(html, note_id)['noteId'] == note_id
+        name = os.path.basename(path)
+        for label, fn in (('整页', parse_full), ('子树', parse_subtree)):
+            cpu = cpu_per_page(fn, html, note_id, args.n)
+            peak = peak_memory(fn, html, note_id)
+            print(f'{name:<24} {len(html) // 1024:>6}KB  {label:<8} {cpu * 1000:>8.3f}ms {peak / 1024:>8.1f}KB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# encoding: utf-8
+"""
+博主列表基准：逐个博主 to_dict 时查标签（旧路径，1 + N 次查询）vs 一次批量查出全部标签（2 次查询）
+
+在临时 SQLite 文件库上为一个用户写入指定数量的博主（每个 0~3 个标签），测每次列表的耗时和 SQL 条数。
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_list_bloggers.py --sizes 10 100 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_list_bloggers_')
+os.environ['DATABASE_URI'] = f'sqlite:///{os.path.join(_tmpdir, "bench.db")}'
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.blogger import Blogger  # noqa: E402
+from app.models.tag import Tag  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.content_pool_service import ContentPoolService  # noqa: E402
+
+
+def seed(n):
+    """新建一个用户并写入 n 个博主，返回 user_id"""
+    user = User(username=f'bench_{n}', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    tags = [Tag(name=f'标签{i}', user_id=user.id) for i in range(3)]
+    db.session.add_all(tags)
+    for i in range(n):
+        blogger = Blogger(user_id=user.id, xhs_user_id=f'b{i}', nickname=f'博主{i}')
+        blogger.tags.extend(tags[:i % 4])
+        db.session.add(blogger)
+    db.session.commit()
+    return user.id
+
+
+def list_per_blogger(user_id):
+    """旧路径：to_dict 里按关系逐个查询标签"""
+    bloggers = Blogger.query.filter_by(user_id=user_id).order_by(Blogger.created_at.desc()).all()
+    return [b.to_dict() for b in bloggers]
+
+
+def bench(name, fn, user_id, n, rounds):
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            db.session.expire_all()
+            fn(user_id)
+        elapsed = (time.perf_counter() - start) / rounds
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    print(f'{name:<10} {n:>6} 个博主  {elapsed * 1000:9.2f}ms/次  {len(statements) // rounds:>6} 条 SQL')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='每个用户的博主数')
+    parser.add_argument('--rounds', type=int, default=5, help='每种方式重复次数')
+    args = parser.parse_args()
+
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        for n in args.sizes:
+            user_id = seed(n)
+            bench('逐个查标签', list_per_blogger, user_id, n, args.rounds)
+            bench('批量查标签', ContentPoolService.list_bloggers, user_id, n, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
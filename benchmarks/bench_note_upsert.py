@@ -0,0 +1,92 @@
+# encoding: utf-8
+"""
+notes 表写入基准：逐条 SELECT + add + commit（旧路径）vs 一次 IN 查询 + 批量 upsert + 一次提交
+
+在临时 SQLite 文件库（WAL）上分别测首次写入（全部新增）和再次写入（全部已存在）的行/秒。
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_note_upsert.py --sizes 10 100 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='bench_note_upsert_')
+os.environ['DATABASE_URI'] = f'sqlite:///{os.path.join(_tmpdir, "bench.db")}'
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.note import Note  # noqa: E402
+
+
+def make_rows(n, round_no):
+    now = datetime.utcnow()
+    return [{
+        'note_id': f'bench_{i:06d}',
+        'title': f'笔记 {i} 第 {round_no} 轮',
+        'description': '内容' * 50,
+        'note_type': '图集',
+        'liked_count': i + round_no,
+        'collected_count': i,
+        'comment_count': i,
+        'note_url': f'https://www.xiaohongshu.com/explore/bench_{i:06d}',
+        'upload_time': '2026-10-17 12:00:00',
+        'fetched_at': now,
+        'summary': f'摘要 {i}',
+    } for i in range(n)]
+
+
+def write_per_row(rows):
+    """旧路径：每条笔记一次 SELECT，新增或更新后立即提交"""
+    for row in rows:
+        note = Note.query.filter_by(note_id=row['note_id']).first()
+        if note is None:
+            note = Note(**row)
+            db.session.add(note)
+        else:
+            for key, value in row.items():
+                setattr(note, key, value)
+        db.session.flush()
+        db.session.commit()
+
+
+def write_bulk(rows):
+    """新路径：一次 IN 查询（判断已有摘要）+ 批量 upsert + 一次提交"""
+    Note.find_by_note_ids(row['note_id'] for row in rows)
+    Note.bulk_upsert(rows)
+    db.session.commit()
+
+
+def bench(name, fn, n):
+    results = []
+    db.session.execute(Note.__table__.delete())
+    db.session.commit()
+    for round_no, label in ((1, '新增'), (2, '更新')):
+        rows = make_rows(n, round_no)
+        start = time.perf_counter()
+        fn(rows)
+        elapsed = time.perf_counter() - start
+        results.append(f'{label} {elapsed:8.3f}s {n / elapsed:10.1f} 行/秒')
+    print(f'{name:<10} {n:>6} 行  ' + '   '.join(results))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='每轮写入的笔记数')
+    args = parser.parse_args()
+
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        for n in args.sizes:
+            bench('逐条提交', write_per_row, n)
+            bench('批量upsert', write_bulk, n)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# encoding: utf-8
+"""
+签名吞吐基准：execjs（每次调用新起 node 进程）vs 常驻 node 签名引擎
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_sign.py --n 50 --workers 2 --threads 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from xhs_utils.sign_engine import NodeSignEngine  # noqa: E402
+from xhs_utils.xhs_util import generate_xs_xs_common_by_execjs  # noqa: E402
+
+A1 = '18f2c2e1a4bm0v1xq2k3z4y5w6v7u8t9s0r1q2p3o4n'
+API = '/api/sns/web/v1/feed'
+DATA = {'source_note_id': '67d7c713000000000900e391', 'image_formats': ['jpg', 'webp', 'avif'],
+        'extra': {'need_body_topic': '1'}, 'xsec_source': 'pc_user', 'xsec_token': 'AB1ACxbo5cevHxV'}
+
+
+def bench(name, fn, n, threads=1):
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda _: fn(), range(n)))
+    else:
+        for _ in range(n):
+            fn()
+    elapsed = time.perf_counter() - start
+    print(f'{name:<36} {n:>6} 次  {elapsed:8.3f}s  {n / elapsed:10.1f} 签名/秒')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=50, help='execjs 路径的签名次数（每次都会启动 node，较慢）')
+    parser.add_argument('--engine-n', type=int, default=2000, help='常驻引擎的签名次数')
+    parser.add_argument('--workers', type=int, default=2, help='常驻 node 进程数')
+    parser.add_argument('--threads', type=int, default=4, help='并发调用线程数')
+    parser.add_argument('--batch', type=int, default=20, help='批量签名每批条数')
+    args = parser.parse_args()
+
+    bench('execjs 串行', lambda: generate_xs_xs_common_by_execjs(A1, API, DATA, 'POST'), args.n)
+    bench(f'execjs {args.threads} 线程', lambda: generate_xs_xs_common_by_execjs(A1, API, DATA, 'POST'),
+          args.n, args.threads)
+
+    engine = NodeSignEngine(workers=args.workers)
+    try:
+        engine.sign(API, DATA, A1, 'POST')  # 预热：启动第一个 worker
+        bench('常驻引擎 串行', lambda: engine.sign(API, DATA, A1, 'POST'), args.engine_n)
+        bench(f'常驻引擎 {args.threads} 线程 / {args.workers} 进程', lambda: engine.sign(API, DATA, A1, 'POST'),
+              args.engine_n, args.threads)
+        batch = [{'api': API, 'data': DATA, 'a1': A1, 'method': 'POST'}] * args.batch
+        rounds = max(1, args.engine_n // args.batch)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            engine.sign_batch(batch)
+        elapsed = time.perf_counter() - start
+        total = rounds * args.batch
+        print(f'{"常驻引擎 批量(" + str(args.batch) + "/批)":<36} {total:>6} 次  {elapsed:8.3f}s  {total / elapsed:10.1f} 签名/秒')
+    finally:
+        engine.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,11 @@ import os
 bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
 
 # Worker 配置（2C4G 服务器推荐 2-3 workers）
+# 并发容量 = workers × threads；其中每个 worker 最多 DIGEST_STREAM_MAX_CONNECTIONS 个线程
+# 被 /api/digest/stream 长连接占用（每条最长 DIGEST_STREAM_TIMEOUT 秒），其余线程处理普通请求
 workers = int(os.getenv("GUNICORN_WORKERS", min(2, multiprocessing.cpu_count())))
 worker_class = "sync"
-threads = 2
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
 
 # 超时
 timeout = 120
@@ -18,6 +20,8 @@ graceful_timeout = 30
 # 日志
 accesslog = "-"
 errorlog = "-"
+# 只记录路径不记录查询串，避免 /api/digest/stream?jwt=<token> 的令牌写进访问日志
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
 loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
 
 # 进程名
@@ -0,0 +1,32 @@
+"""add bloggers.last_note_id / last_note_at
+
+Revision ID: c3e5a7b9d1f2
+Revises: b2d4f6a8c0e1
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7b9d1f2'
+down_revision: Union[str, Sequence[str], None] = 'b2d4f6a8c0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('bloggers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_note_id', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('last_note_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('bloggers', schema=None) as batch_op:
+        batch_op.drop_column('last_note_at')
+        batch_op.drop_column('last_note_id')
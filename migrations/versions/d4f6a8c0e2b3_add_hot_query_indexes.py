@@ -0,0 +1,42 @@
+"""add composite indexes for hot list queries
+
+Revision ID: d4f6a8c0e2b3
+Revises: c3e5a7b9d1f2
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6a8c0e2b3'
+down_revision: Union[str, Sequence[str], None] = 'c3e5a7b9d1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (表, 索引名, 列)
+INDEXES = (
+    ('digests', 'ix_digests_user_created_at', ['user_id', 'created_at', 'id']),
+    ('user_bookmarks', 'ix_user_bookmarks_user_created_at', ['user_id', 'created_at', 'id']),
+    ('notes', 'ix_notes_blogger_fetched_at', ['blogger_id', 'fetched_at']),
+    ('bloggers', 'ix_bloggers_user_created_at', ['user_id', 'created_at']),
+    ('goals', 'ix_goals_user_created_at', ['user_id', 'created_at']),
+    ('plan_steps', 'ix_plan_steps_goal_step_number', ['goal_id', 'step_number']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, name, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, name, _ in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
@@ -0,0 +1,128 @@
+"""add digest_items table and digests.total_notes / bloggers_count
+
+Revision ID: e5a7c9b1d3f4
+Revises: d4f6a8c0e2b3
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9b1d3f4'
+down_revision: Union[str, Sequence[str], None] = 'd4f6a8c0e2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+digests = sa.table(
+    'digests',
+    sa.column('id', sa.Integer),
+    sa.column('total_notes', sa.Integer),
+    sa.column('bloggers_count', sa.Integer),
+    sa.column('digest_json', sa.Text),
+)
+digest_items = sa.table(
+    'digest_items',
+    sa.column('digest_id', sa.Integer),
+    sa.column('position', sa.Integer),
+    sa.column('note_id', sa.Integer),
+    sa.column('blogger_nickname', sa.String),
+    sa.column('blogger_xhs_id', sa.String),
+)
+notes = sa.table(
+    'notes',
+    sa.column('id', sa.Integer),
+    sa.column('note_id', sa.String),
+    sa.column('blogger_id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('summary', sa.Text),
+    sa.column('description', sa.Text),
+    sa.column('note_type', sa.String),
+    sa.column('note_url', sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('digests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_notes', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('bloggers_count', sa.Integer(), nullable=True))
+
+    op.create_table('digest_items',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('digest_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('note_id', sa.Integer(), nullable=False),
+    sa.Column('blogger_nickname', sa.String(length=200), nullable=True),
+    sa.Column('blogger_xhs_id', sa.String(length=100), nullable=True),
+    sa.ForeignKeyConstraint(['digest_id'], ['digests.id'], ),
+    sa.ForeignKeyConstraint(['note_id'], ['notes.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('digest_id', 'position', name='uq_digest_item_position')
+    )
+
+    # 已有摘要：回填计数；条目中的笔记都能在 notes 表找到时转存到 digest_items（博主名沿用 JSON 中的值）
+    # 并清空 JSON，找不到的（笔记行已不存在）保留 JSON，读取时照旧解析
+    bind = op.get_bind()
+    note_pks = dict(bind.execute(sa.select(notes.c.note_id, notes.c.id)).all())
+    for digest_id, raw in bind.execute(
+            sa.select(digests.c.id, digests.c.digest_json).where(digests.c.digest_json.isnot(None))).all():
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        items = data.get('items', [])
+        values = {'total_notes': data.get('total_notes', len(items)), 'bloggers_count': data.get('bloggers_count')}
+        pks = [note_pks.get(item.get('note_id')) for item in items]
+        if all(pks):
+            if pks:
+                bind.execute(digest_items.insert(), [{
+                    'digest_id': digest_id, 'position': position, 'note_id': pk,
+                    'blogger_nickname': item.get('blogger_nickname', ''),
+                    'blogger_xhs_id': item.get('blogger_xhs_id', ''),
+                } for position, (pk, item) in enumerate(zip(pks, items))])
+            values['digest_json'] = None
+        bind.execute(digests.update().where(digests.c.id == digest_id).values(**values))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 条目表中的摘要写回 JSON
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(digest_items.c.digest_id, notes.c.note_id, notes.c.title, notes.c.summary,
+                  notes.c.description, notes.c.note_type, notes.c.note_url,
+                  digest_items.c.blogger_nickname, digest_items.c.blogger_xhs_id)
+        .select_from(digest_items.join(notes, notes.c.id == digest_items.c.note_id))
+        .order_by(digest_items.c.digest_id, digest_items.c.position)
+    ).all()
+    items_by_digest = {}
+    for digest_id, note_id, title, summary, description, note_type, note_url, nickname, xhs_user_id in rows:
+        items_by_digest.setdefault(digest_id, []).append({
+            'note_id': note_id,
+            'title': title or '',
+            'summary': summary or (description or '')[:100],
+            'note_type': note_type or 'normal',
+            'note_url': note_url or '',
+            'blogger_nickname': nickname or '',
+            'blogger_xhs_id': xhs_user_id or '',
+        })
+    for digest_id, total_notes, bloggers_count in bind.execute(
+            sa.select(digests.c.id, digests.c.total_notes, digests.c.bloggers_count)
+            .where(digests.c.digest_json.is_(None))).all():
+        items = items_by_digest.get(digest_id, [])
+        digest_json = json.dumps({
+            'total_notes': total_notes if total_notes is not None else len(items),
+            'bloggers_count': bloggers_count if bloggers_count is not None else 0,
+            'items': items,
+        }, ensure_ascii=False)
+        bind.execute(digests.update().where(digests.c.id == digest_id).values(digest_json=digest_json))
+
+    op.drop_table('digest_items')
+    with op.batch_alter_table('digests', schema=None) as batch_op:
+        batch_op.drop_column('bloggers_count')
+        batch_op.drop_column('total_notes')
@@ -0,0 +1,37 @@
+"""add partial unique index: one queued/running job per (user_id, kind)
+
+Revision ID: f6b8d0a2c4e5
+Revises: e5a7c9b1d3f4
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d0a2c4e5'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c9b1d3f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status IN ('queued', 'running')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 已存在的重复任务（并发提交产生）只保留最早的一个，其余标记失败，否则无法建唯一索引
+    op.execute(
+        "UPDATE jobs SET status = 'error', msg = '重复提交的任务已取消', finished_at = CURRENT_TIMESTAMP "
+        f"WHERE {ACTIVE} AND id NOT IN ("
+        f"SELECT MIN(id) FROM jobs WHERE {ACTIVE} GROUP BY user_id, kind)"
+    )
+    op.create_index('uq_jobs_active_user_kind', 'jobs', ['user_id', 'kind'], unique=True,
+                    sqlite_where=sa.text(ACTIVE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_jobs_active_user_kind', table_name='jobs')
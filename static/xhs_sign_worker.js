@@ -0,0 +1,37 @@
+// 常驻签名进程（配合 xhs_utils/sign_engine.py 使用）
+// 协议：stdin 每行一个 JSON 请求 {"id": 1, "requests": [{"api", "data", "a1", "method"}, ...]}
+//      stdout 每行一个 JSON 响应 {"id": 1, "results": [{"xs", "xt", "xs_common"}, ...]} 或 {"id": 1, "error": "..."}
+// xhs_xs_xsc_56.js 只在进程启动时加载一次，之后的签名请求不再重复编译
+
+const path = require("path");
+const readline = require("readline");
+const { get_request_headers_params } = require(path.join(__dirname, "xhs_xs_xsc_56.js"));
+
+function reply(obj) {
+  process.stdout.write(JSON.stringify(obj) + "\n");
+}
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+
+rl.on("line", (line) => {
+  if (!line.trim()) return;
+  let msg;
+  try {
+    msg = JSON.parse(line);
+  } catch (e) {
+    reply({ id: null, error: "invalid request: " + e.message });
+    return;
+  }
+  try {
+    const results = msg.requests.map((r) =>
+      get_request_headers_params(r.api, r.data, r.a1, r.method || "POST")
+    );
+    reply({ id: msg.id, results: results });
+  } catch (e) {
+    reply({ id: msg.id, error: String((e && e.stack) || e) });
+  }
+});
+
+rl.on("close", () => process.exit(0));
+
+reply({ id: 0, ready: true });
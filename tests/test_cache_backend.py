@@ -0,0 +1,116 @@
+# encoding: utf-8
+"""缓存后端测试：进程内 / SQLite 共享 / Redis 降级"""
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.cache_backend import (
+    CacheBackend, MemoryCacheBackend, RedisCacheBackend, SQLiteCacheBackend, create_cache_backend,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(maxsize=16)
+    return SQLiteCacheBackend(str(tmp_path / "cache.db"))
+
+
+class TestCacheBackend:
+    def test_namespaces_are_isolated(self, backend):
+        users = backend.namespace("users", ttl=60)
+        notes = backend.namespace("notes", ttl=60)
+        users.set("k", {"nickname": "博主", "count": 1})
+        assert users.get("k") == {"nickname": "博主", "count": 1}
+        assert notes.get("k") is None
+        users.clear()
+        assert users.get("k") is None
+
+    def test_ttl_expiry(self, backend):
+        ns = backend.namespace("short", ttl=0.05)
+        ns.set("k", [1, 2])
+        assert ns.get("k") == [1, 2]
+        time.sleep(0.1)
+        assert ns.get("k") is None
+
+    def test_hit_ratio_per_namespace(self, backend):
+        users = backend.namespace("users", ttl=60)
+        notes = backend.namespace("notes", ttl=60)
+        users.set("a", 1)
+        users.get("a")
+        users.get("a")
+        users.get("b")
+        notes.get("x")
+        stats = backend.stats()["namespaces"]
+        assert stats["users"] == {"hits": 2, "misses": 1, "sets": 1, "hit_ratio": 0.6667}
+        assert stats["notes"]["hit_ratio"] == 0.0
+
+
+class TestSharedBackend:
+    def test_sqlite_shared_between_workers(self, tmp_path):
+        """两个 SQLite 后端实例（相当于两个 gunicorn worker）共用同一个文件"""
+        path = str(tmp_path / "cache.db")
+        worker_a = SQLiteCacheBackend(path).namespace("xhs_note", ttl=60)
+        worker_b = SQLiteCacheBackend(path).namespace("xhs_note", ttl=60)
+        worker_a.set("n1", {"title": "标题"})
+        assert worker_b.get("n1") == {"title": "标题"}
+
+    def test_sqlite_evicts_over_max_entries(self, tmp_path):
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries=50)
+        ns = backend.namespace("n", ttl=60)
+        for i in range(200):
+            ns.set(str(i), i)
+        count = backend._conn.execute("SELECT COUNT(*) FROM kv_cache").fetchone()[0]
+        assert count <= 150
+        assert ns.get("199") == 199
+
+    def test_sqlite_expired_row_deleted_on_read(self, tmp_path):
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+        ns = backend.namespace("short", ttl=0.05)
+        ns.set("k", 1)
+        time.sleep(0.1)
+        assert ns.get("k") is None
+        assert backend._conn.execute("SELECT COUNT(*) FROM kv_cache").fetchone()[0] == 0
+
+    def test_sqlite_errors_do_not_propagate(self, tmp_path):
+        """库文件损坏或被锁时，删除 / 清空与读写一样只记日志"""
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+        ns = backend.namespace("n", ttl=60)
+        backend._conn.close()
+        ns.set("k", 1)
+        assert ns.get("k") is None
+        ns.delete("k")
+        ns.clear()
+
+    def test_redis_errors_do_not_propagate(self):
+        """Redis 连接中断时，删除 / 清空与读写一样只记日志"""
+        backend = RedisCacheBackend.__new__(RedisCacheBackend)
+        CacheBackend.__init__(backend)
+        backend.prefix = "test:"
+        backend._client = MagicMock()
+        for method in ("get", "set", "delete", "scan_iter"):
+            getattr(backend._client, method).side_effect = ConnectionError("redis down")
+        ns = backend.namespace("n", ttl=60)
+        ns.set("k", 1)
+        assert ns.get("k") is None
+        ns.delete("k")
+        ns.clear()
+
+    def test_backend_must_implement_storage_methods(self):
+        class Incomplete(CacheBackend):
+            def _get(self, namespace, key):
+                return None
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_redis_unavailable_falls_back_to_sqlite(self, tmp_path):
+        config = {
+            "CACHE_BACKEND": "redis", "CACHE_REDIS_URL": "redis://127.0.0.1:1/0",
+            "CACHE_REDIS_PREFIX": "test:", "CACHE_DB_PATH": "", "CACHE_MAX_ENTRIES": 100,
+            "CACHE_MEMORY_SIZE": 16,
+        }
+        backend = create_cache_backend(config, str(tmp_path))
+        assert backend.name == "sqlite"
+        assert (tmp_path / "cache.db").exists()
@@ -2,15 +2,19 @@
 """Phase 2 内容池模块测试"""
 import json
 import pytest
+from sqlalchemy import event
+
 from app import create_app
 from app.extensions import db
+from app.models.blogger import Blogger
+from app.models.tag import Tag
+from app.models.user import User
+from app.services.content_pool_service import ContentPoolService
 
 
 @pytest.fixture
 def app():
-    app = create_app("development")
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
-    app.config["TESTING"] = True
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
     with app.app_context():
         db.create_all()
         yield app
@@ -189,3 +193,49 @@ class TestInputValidation:
     def test_unauthorized_access(self, client):
         resp = client.get("/api/bloggers")
         assert resp.status_code == 401
+
+
+class TestListBloggersQueries:
+    """博主列表的查询次数不随博主数量增长"""
+
+    def _seed(self, n):
+        user = User.query.filter_by(username="testuser").one()
+        tags = [Tag(name=f"标签{i}", user_id=user.id) for i in range(3)]
+        db.session.add_all(tags)
+        for i in range(n):
+            blogger = Blogger(user_id=user.id, xhs_user_id=f"b{i}", nickname=f"博主{i}")
+            blogger.tags.extend(tags[:i % 4])
+            db.session.add(blogger)
+        db.session.commit()
+        return user.id
+
+    def _count_selects(self, fn):
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        return result, statements
+
+    @pytest.mark.parametrize("n", [1, 50])
+    def test_constant_query_count(self, app, auth_token, n):
+        user_id = self._seed(n)
+        db.session.expire_all()
+        bloggers, statements = self._count_selects(lambda: ContentPoolService.list_bloggers(user_id))
+        assert len(bloggers) == n
+        # 一次查博主 + 一次查全部标签
+        assert len(statements) == 2
+        by_xhs_id = {b["xhs_user_id"]: [t["name"] for t in b["tags"]] for b in bloggers}
+        assert by_xhs_id[f"b{n - 1}"] == [f"标签{i}" for i in range((n - 1) % 4)]
+
+    def test_same_tags_as_per_blogger_path(self, app, auth_token):
+        user_id = self._seed(8)
+        bloggers = ContentPoolService.list_bloggers(user_id)
+        expected = [db.session.get(Blogger, b["id"]).to_dict() for b in bloggers]
+        assert bloggers == expected
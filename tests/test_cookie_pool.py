@@ -0,0 +1,195 @@
+# encoding: utf-8
+"""XHS 账号池测试：选择策略、健康分与隔离"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apis.xhs_pc_apis import XHS_Apis
+from app import create_app
+from app.services.cookie_pool import CookiePool, load_cookie_strings
+from app.services.xhs_service import XHSService
+from xhs_utils.note_fetcher import NoteFetcher
+
+COOKIES = ["a1=aaa111; web_session=s1", "a1=bbb222; web_session=s2", "a1=ccc333; web_session=s3"]
+
+
+def _response(status_code: int):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = {"success": status_code == 200, "msg": "", "data": {}}
+    return response
+
+
+class TestSelection:
+    """账号选择策略"""
+
+    def test_round_robin(self):
+        pool = CookiePool(COOKIES)
+        assert [pool.cookies() for _ in range(4)] == COOKIES + COOKIES[:1]
+
+    def test_lru_picks_least_recently_used(self):
+        pool = CookiePool(COOKIES, strategy="lru")
+        first, second = pool.acquire(), pool.acquire()
+        assert first is not second
+        third = pool.acquire()
+        assert third not in (first, second)
+        assert pool.acquire() is first
+
+    def test_dedupe_and_empty_pool(self):
+        assert len(CookiePool(COOKIES[:1] * 3 + [" ", ""]).accounts) == 1
+        pool = CookiePool([])
+        assert pool.cookies() == ""
+        pool.observe({}, 461)  # 空账号不参与健康统计
+        assert pool.stats()["available"] == 1
+
+    def test_load_cookie_strings(self):
+        config = {"COOKIES": COOKIES[0], "COOKIES_POOL": f"{COOKIES[1]} || {COOKIES[2]}||"}
+        assert [c.strip() for c in load_cookie_strings(config)] == COOKIES
+
+
+class TestHealth:
+    """健康分与隔离"""
+
+    def test_anti_bot_quarantines_account(self):
+        pool = CookiePool(COOKIES[:2], threshold=0.3, quarantine=60)
+        pool.observe({"a1": "aaa111"}, 461)
+        assert pool.stats()["available"] == 2
+        pool.observe({"a1": "aaa111"}, 461)
+        stats = pool.stats()
+        assert stats["available"] == 1
+        account = stats["accounts"][0]
+        assert account["quarantined"] and account["anti_bot"] == 2
+        assert 59 < account["quarantine_remaining"] <= 60
+        # 隔离期内只选其他账号
+        assert {pool.cookies() for _ in range(3)} == {COOKIES[1]}
+
+    def test_repeated_quarantine_backs_off(self):
+        pool = CookiePool(COOKIES[:2], quarantine=10, max_quarantine=25)
+        account = pool.accounts[0]
+        durations = []
+        for _ in range(3):
+            account.quarantined_until = 0  # 模拟隔离期已过
+            for _ in range(3):
+                pool.observe({"a1": "aaa111"}, 461)
+            durations.append(account.quarantine_count)
+        assert durations == [1, 2, 3]
+        assert 24 < pool.stats()["accounts"][0]["quarantine_remaining"] <= 25
+
+    def test_recovery_resets_backoff(self):
+        pool = CookiePool(COOKIES[:1])
+        account = pool.accounts[0]
+        account.quarantine_count = 2
+        account.score = 0.5
+        for _ in range(20):
+            pool.observe({"a1": "aaa111"}, 200)
+        assert account.score >= 0.9 and account.quarantine_count == 0
+
+    def test_all_quarantined_falls_back_to_earliest(self):
+        pool = CookiePool(COOKIES[:2], quarantine=100)
+        for a1 in ("aaa111", "bbb222"):
+            pool.observe({"a1": a1}, 461)
+            pool.observe({"a1": a1}, 461)
+        pool.accounts[1].quarantined_until -= 50
+        assert pool.stats()["available"] == 0
+        assert pool.acquire() is pool.accounts[1]
+
+    def test_report_failure_lowers_score(self):
+        pool = CookiePool(COOKIES[:1])
+        account = pool.acquire()
+        pool.report(account, True)
+        assert account.score == 1.0
+        pool.report(account, False)
+        assert account.score == pytest.approx(0.8) and account.errors == 1
+
+    def test_apis_hook_reports_status(self):
+        """XHS_Apis.on_response 把每个响应状态按 a1 回报给账号池"""
+        pool = CookiePool(COOKIES[:2])
+        api = XHS_Apis(on_response=pool.observe)
+        with patch.object(api, "sign", return_value=({}, {"a1": "bbb222"}, None)), \
+                patch.object(api.session, "get", return_value=_response(461)):
+            api.get_user_note_info("u1", "", COOKIES[1])
+        accounts = pool.stats()["accounts"]
+        assert accounts[0]["anti_bot"] == 0 and accounts[1]["anti_bot"] == 1
+
+    @pytest.mark.parametrize("status, errors, anti_bot", [(200, 1, 0), (461, 0, 1)])
+    def test_note_fetcher_reports_business_failure(self, status, errors, anti_bot):
+        """批量抓取路径：HTTP 200 的业务失败（登录失效）回报给账号池，HTTP 错误只由 observe 计一次"""
+        pool = CookiePool(COOKIES[:1])
+        api = XHS_Apis(on_response=pool.observe)
+        fetcher = NoteFetcher(cookie_pool=pool, xhs_apis=api)
+        response = _response(status)
+        response.json.return_value = {"success": False, "msg": "登录已过期", "code": -100}
+        with patch.object(api, "sign", return_value=({}, {"a1": "aaa111"}, None)), \
+                patch.object(api.session, "get", return_value=response):
+            assert fetcher.get_users_latest_notes(["u1"], max_users=1, notes_per_user=1) == []
+        account = pool.stats()["accounts"][0]
+        assert (account["errors"], account["anti_bot"]) == (errors, anti_bot)
+
+
+@pytest.fixture
+def app():
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    app.config["CACHE_BACKEND"] = "memory"
+    app.config["COOKIES"] = COOKIES[0]
+    app.config["COOKIES_POOL"] = COOKIES[1]
+    with app.app_context():
+        yield app
+
+
+class TestServiceIntegration:
+    def test_search_rotates_accounts(self, app):
+        """XHSService 每次请求换一个账号，业务失败计入账号健康分"""
+        service = XHSService()
+        used = []
+
+        def fake_sign(api, data, cookies_str):
+            used.append(cookies_str)
+            return {}, {"a1": cookies_str[3:9]}, b"{}"
+
+        expired = _response(200)
+        expired.json.return_value = {"success": False, "msg": "登录已过期", "code": -100}
+        with patch.object(service.api, "sign", side_effect=fake_sign), \
+                patch.object(service.api.session, "post", return_value=expired):
+            service.search_user("榴莲", 1)
+            service.search_user("芒果", 1)
+        assert used == COOKIES[:2]
+        stats = service.cookie_pool_stats()
+        assert [account["errors"] for account in stats["accounts"]] == [1, 1]
+
+    def test_http_error_counted_once(self, app):
+        """HTTP 461 只由 observe 计一次，search_user 不再重复扣分"""
+        service = XHSService()
+        with patch.object(service.api, "sign", return_value=({}, {"a1": "aaa111"}, b"{}")), \
+                patch.object(service.api.session, "post", return_value=_response(461)):
+            success, _, _ = service.search_user("榴莲", 1)
+        assert not success
+        account = service.cookie_pool_stats()["accounts"][0]
+        assert account["anti_bot"] == 1 and account["errors"] == 0
+        assert account["score"] == pytest.approx(0.5)
+
+    @pytest.mark.parametrize("status, errors, anti_bot", [(200, 1, 0), (461, 0, 1)])
+    def test_comment_failure_counted_once(self, app, status, errors, anti_bot):
+        """评论翻页失败：HTTP 错误只由 observe 计一次，HTTP 200 的业务失败才额外扣分"""
+        service = XHSService()
+        response = _response(status)
+        response.json.return_value = {"success": False, "msg": "登录已过期", "code": -100}
+        with patch.object(service.api, "sign", return_value=({}, {"a1": "aaa111"}, None)), \
+                patch.object(service.api.session, "get", return_value=response):
+            assert list(service._fetch_comments("n1", "token")) == []
+        account = service.cookie_pool_stats()["accounts"][0]
+        assert (account["errors"], account["anti_bot"]) == (errors, anti_bot)
+
+    def test_comment_limit_stops_after_first_page(self, app):
+        """comments_limit 取够即停止翻页；默认不展开二级评论"""
+        service = XHSService()
+        page = _response(200)
+        page.json.return_value = {"success": True, "msg": "", "data": {
+            "comments": [{"id": f"c{i}", "sub_comments": [], "sub_comment_has_more": True,
+                          "sub_comment_cursor": "0"} for i in range(10)],
+            "cursor": "next", "has_more": True,
+        }}
+        with patch.object(service.api, "sign", return_value=({}, {"a1": "aaa111"}, None)), \
+                patch.object(service.api.session, "get", return_value=page) as mock_get:
+            comments = service._fetch_comments("n1", "token", limit=5)
+        assert [c["id"] for c in comments] == [f"c{i}" for i in range(5)]
+        assert mock_get.call_count == 1
@@ -2,19 +2,23 @@
 """Phase 3 每日摘要模块测试"""
 import json
 import time
+from concurrent.futures import Future
+from contextlib import contextmanager
 from unittest.mock import patch, MagicMock
 import pytest
+from sqlalchemy import event
 from app import create_app
 from app.extensions import db
 from app.models.blogger import Blogger
 from app.models.digest import Digest
+from app.models.job import Job
+from app.models.user import User
+from app.services.digest_service import DigestService
 
 
 @pytest.fixture
 def app():
-    app = create_app("development")
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
-    app.config["TESTING"] = True
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
     with app.app_context():
         db.create_all()
         yield app
@@ -54,6 +58,49 @@ def auth_header(token):
     return {"Authorization": f"Bearer {token}"}
 
 
+def fake_fetch(raw_notes):
+    """模拟 xhs_service.get_users_latest_notes：按博主回调 on_user_done 后返回全部笔记，遇到 stop_at 中的笔记即停止"""
+    def fetch(user_ids, max_users=5, notes_per_user=3, on_user_done=None, stop_at=None):
+        fetched = []
+        for uid in dict.fromkeys(n["user_id"] for n in raw_notes):
+            user_notes = []
+            for n in raw_notes:
+                if n["user_id"] != uid:
+                    continue
+                if (stop_at or {}).get(uid) == n["note_id"]:
+                    break
+                user_notes.append(n)
+            if on_user_done:
+                on_user_done(uid, user_notes)
+            fetched.extend(user_notes)
+        return fetched
+    return fetch
+
+
+def fake_summary_pool(summarize):
+    """模拟 llm_service.summary_pool：submit 立即返回已完成的 Future"""
+    @contextmanager
+    def pool(*args, **kwargs):
+        def submit(note):
+            future = Future()
+            try:
+                future.set_result(summarize(note))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        yield submit
+    return pool
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
 class TestDigestGeneration:
     """摘要生成测试"""
 
@@ -69,13 +116,13 @@ class TestDigestGeneration:
     def test_generate_digest_success(self, mock_xhs, mock_llm,
                                      client, user_with_bloggers):
         """成功生成摘要（mock 外部服务）"""
-        mock_xhs.get_users_latest_notes.return_value = [
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
             {"note_id": "n1", "title": "美食笔记1", "desc": "好吃的内容",
              "type": "normal", "user_id": "blogger_001"},
             {"note_id": "n2", "title": "旅行笔记1", "desc": "好玩的地方",
              "type": "normal", "user_id": "blogger_002"},
-        ]
-        mock_llm.summarize_note.return_value = "这是AI生成的摘要"
+        ])
+        mock_llm.summary_pool.side_effect = fake_summary_pool(lambda note: "这是AI生成的摘要")
 
         resp = client.post("/api/digest/generate", json={},
                            headers=auth_header(user_with_bloggers))
@@ -91,16 +138,174 @@ class TestDigestGeneration:
         data = resp.get_json()["data"]
         assert data["status"] == "done"
 
+    @patch("app.services.digest_service.llm_service")
+    @patch("app.services.digest_service.xhs_service")
+    def test_generate_digest_batches_summaries(self, mock_xhs, mock_llm,
+                                               app, client, user_with_bloggers):
+        """未缓存摘要的笔记一次性批量提交，已有摘要的笔记不再请求"""
+        from app.models.note import Note
+        with app.app_context():
+            db.session.add(Note(note_id="cached", title="旧笔记", summary="已有摘要"))
+            db.session.commit()
+
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
+            {"note_id": "n1", "title": "美食笔记1", "desc": "好吃的内容", "user_id": "blogger_001"},
+            {"note_id": "cached", "title": "旧笔记", "desc": "旧内容", "user_id": "blogger_001"},
+            {"note_id": "n2", "title": "旅行笔记1", "desc": "好玩的地方", "user_id": "blogger_002"},
+        ])
+        submitted = []
+        mock_llm.summary_pool.side_effect = fake_summary_pool(
+            lambda note: submitted.append(note["title"]) or f"摘要:{note['title']}"
+        )
+
+        client.post("/api/digest/generate", json={}, headers=auth_header(user_with_bloggers))
+        time.sleep(1)
+
+        assert submitted == ["美食笔记1", "旅行笔记1"]
+        resp = client.get("/api/digest/latest", headers=auth_header(user_with_bloggers))
+        items = resp.get_json()["data"]["digest"]["items"]
+        assert [i["summary"] for i in items] == ["摘要:美食笔记1", "已有摘要", "摘要:旅行笔记1"]
+
+    @patch("app.services.digest_service.llm_service")
+    @patch("app.services.digest_service.xhs_service")
+    def test_failed_summary_falls_back_to_desc(self, mock_xhs, mock_llm, app, client, user_with_bloggers):
+        """单条摘要任务抛出异常时该条退回正文开头，其余条目和整个任务不受影响"""
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
+            {"note_id": "n1", "title": "美食笔记1", "desc": "好吃的内容", "user_id": "blogger_001"},
+            {"note_id": "n2", "title": "旅行笔记1", "desc": "好玩的地方", "user_id": "blogger_002"},
+        ])
+
+        def summarize(note):
+            if note["title"] == "美食笔记1":
+                raise RuntimeError("vLLM 超时")
+            return f"摘要:{note['title']}"
+
+        mock_llm.summary_pool.side_effect = fake_summary_pool(summarize)
+        headers = auth_header(user_with_bloggers)
+        client.post("/api/digest/generate", json={}, headers=headers)
+        time.sleep(1)
+
+        assert client.get("/api/digest/status", headers=headers).get_json()["data"]["status"] == "done"
+        items = client.get("/api/digest/latest", headers=headers).get_json()["data"]["digest"]["items"]
+        assert [i["summary"] for i in items] == ["好吃的内容", "摘要:旅行笔记1"]
+
+    @patch("app.services.digest_service.llm_service")
+    @patch("app.services.digest_service.xhs_service")
+    def test_digest_items_stored_by_reference(self, mock_xhs, mock_llm, app, client, user_with_bloggers):
+        """条目存到 digest_items（只存笔记引用和顺序），详情可分批读取"""
+        from app.models.digest import DigestItem
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
+            {"note_id": f"n{i}", "title": f"笔记{i}", "desc": f"内容{i}", "url": f"https://x/{i}",
+             "user_id": "blogger_001" if i < 3 else "blogger_002"} for i in range(5)
+        ])
+        mock_llm.summary_pool.side_effect = fake_summary_pool(lambda note: f"摘要:{note['title']}")
+        headers = auth_header(user_with_bloggers)
+        client.post("/api/digest/generate", json={"notes_per_blogger": 3}, headers=headers)
+        time.sleep(1)
+
+        with app.app_context():
+            digest = Digest.query.one()
+            assert digest.digest_json is None
+            assert (digest.total_notes, digest.bloggers_count) == (5, 2)
+            assert [i.position for i in digest.items.order_by(DigestItem.position)] == list(range(5))
+            digest_id = digest.id
+
+        full = client.get(f"/api/digest/{digest_id}", headers=headers).get_json()["data"]
+        assert "next_after" not in full
+        assert full["digest"]["items"][3] == {
+            "note_id": "n3", "title": "笔记3", "summary": "摘要:笔记3", "note_type": "normal",
+            "note_url": "https://x/3", "blogger_nickname": "旅行博主", "blogger_xhs_id": "blogger_002",
+        }
+
+        pages, after = [], -1
+        while after is not None:
+            data = client.get(f"/api/digest/{digest_id}?limit=2&after={after}", headers=headers).get_json()["data"]
+            pages.append([i["note_id"] for i in data["digest"]["items"]])
+            after = data["next_after"]
+        assert pages == [["n0", "n1"], ["n2", "n3"], ["n4"]]
+        assert [i["note_id"] for i in full["digest"]["items"]] == [n for page in pages for n in page]
+
+    @patch("app.services.digest_service.llm_service")
+    @patch("app.services.digest_service.xhs_service")
+    def test_blogger_name_per_user(self, mock_xhs, mock_llm, app, client, user_with_bloggers):
+        """两个用户关注同一博主：各自的摘要显示自己备注的博主名，另一用户重新抓取或移除博主都不影响"""
+        client.post("/api/auth/register", json={"username": "otheruser", "password": "test123456"})
+        other_token = client.post("/api/auth/login", json={
+            "username": "otheruser", "password": "test123456"
+        }).get_json()["data"]["access_token"]
+        other_blogger = client.post("/api/bloggers", json={
+            "xhs_user_id": "blogger_001", "nickname": "B-nick"
+        }, headers=auth_header(other_token)).get_json()["data"]["id"]
+
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
+            {"note_id": "n1", "title": "美食笔记1", "desc": "好吃的内容", "user_id": "blogger_001"},
+        ])
+        mock_llm.summary_pool.side_effect = fake_summary_pool(lambda note: "摘要")
+        for token in (user_with_bloggers, other_token):
+            client.post("/api/digest/generate", json={}, headers=auth_header(token))
+            time.sleep(1)
+
+        def nicknames(token):
+            items = client.get("/api/digest/latest", headers=auth_header(token)).get_json()["data"]["digest"]["items"]
+            return [(i["blogger_nickname"], i["blogger_xhs_id"]) for i in items]
+
+        assert nicknames(user_with_bloggers) == [("美食博主", "blogger_001")]
+        assert nicknames(other_token) == [("B-nick", "blogger_001")]
+
+        resp = client.delete(f"/api/bloggers/{other_blogger}", headers=auth_header(other_token))
+        assert resp.status_code == 200
+        assert nicknames(user_with_bloggers) == [("美食博主", "blogger_001")]
+        assert nicknames(other_token) == [("B-nick", "blogger_001")]
+
+    @patch("app.services.digest_service.llm_service")
+    @patch("app.services.digest_service.xhs_service")
+    def test_incremental_digest(self, mock_xhs, mock_llm, app, client, user_with_bloggers):
+        """第二次生成只抓取上次之后的新笔记，其余用已有摘要补足"""
+        headers = auth_header(user_with_bloggers)
+        first = [
+            {"note_id": "a2", "upload_time": "2026-10-02 09:00:00", "title": "美食2", "desc": "d", "user_id": "blogger_001"},
+            {"note_id": "a1", "upload_time": "2026-10-01 09:00:00", "title": "美食1", "desc": "d", "user_id": "blogger_001"},
+            {"note_id": "b1", "upload_time": "2026-09-30 09:00:00", "title": "旅行1", "desc": "d", "user_id": "blogger_002"},
+        ]
+        submitted = []
+        mock_llm.summary_pool.side_effect = fake_summary_pool(
+            lambda note: submitted.append(note["title"]) or f"摘要:{note['title']}"
+        )
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch(first)
+        client.post("/api/digest/generate", json={"notes_per_blogger": 2}, headers=headers)
+        time.sleep(1)
+        assert submitted == ["美食2", "美食1", "旅行1"]
+        with app.app_context():
+            marks = {b.xhs_user_id: b.last_note_id for b in Blogger.query.all()}
+        assert marks == {"blogger_001": "a2", "blogger_002": "b1"}
+
+        # blogger_001 发了一条新笔记，blogger_002 没有更新
+        submitted.clear()
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch(
+            [{"note_id": "a3", "upload_time": "2026-10-03 09:00:00", "title": "美食3", "desc": "d", "user_id": "blogger_001"}] + first
+        )
+        client.post("/api/digest/generate", json={"notes_per_blogger": 2}, headers=headers)
+        time.sleep(1)
+
+        _, kwargs = mock_xhs.get_users_latest_notes.call_args
+        assert kwargs["stop_at"] == {"blogger_001": "a2", "blogger_002": "b1"}
+        assert submitted == ["美食3"]
+        items = client.get("/api/digest/latest", headers=headers).get_json()["data"]["digest"]["items"]
+        assert [i["note_id"] for i in items] == ["a3", "a2", "b1"]
+        assert items[2]["summary"] == "摘要:旅行1"
+        with app.app_context():
+            assert db.session.get(Blogger, 1).last_note_id == "a3"
+
     @patch("app.services.digest_service.llm_service")
     @patch("app.services.digest_service.xhs_service")
     def test_generate_digest_duplicate_blocked(self, mock_xhs, mock_llm,
                                                 client, user_with_bloggers):
         """重复触发时阻止"""
-        mock_xhs.get_users_latest_notes.return_value = [
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
             {"note_id": "n1", "title": "笔记", "desc": "内容",
              "type": "normal", "user_id": "blogger_001"},
-        ]
-        mock_llm.summarize_note.return_value = "摘要"
+        ])
+        mock_llm.summary_pool.side_effect = fake_summary_pool(lambda note: "摘要")
 
         headers = auth_header(user_with_bloggers)
         # 第一次触发
@@ -115,6 +320,105 @@ class TestDigestGeneration:
         time.sleep(1)  # 等待完成
 
 
+class TestDigestStream:
+    """SSE 进度推送测试"""
+
+    def test_stream_requires_job(self, client, auth_token):
+        resp = client.get("/api/digest/stream", headers=auth_header(auth_token))
+        assert resp.status_code == 404
+
+    @patch("app.services.digest_service.llm_service")
+    @patch("app.services.digest_service.xhs_service")
+    def test_stream_items_then_done(self, mock_xhs, mock_llm, app, client, user_with_bloggers):
+        """逐条推送摘要条目和进度，最后推送 done；支持 ?jwt= 传令牌"""
+        app.config["DIGEST_STREAM_TIMEOUT"] = 10
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
+            {"note_id": "n1", "title": "美食笔记1", "desc": "好吃", "user_id": "blogger_001"},
+            {"note_id": "n2", "title": "旅行笔记1", "desc": "好玩", "user_id": "blogger_002"},
+        ])
+        mock_llm.summary_pool.side_effect = fake_summary_pool(lambda note: f"摘要:{note['title']}")
+
+        client.post("/api/digest/generate", json={}, headers=auth_header(user_with_bloggers))
+        resp = client.get(f"/api/digest/stream?jwt={user_with_bloggers}")
+        assert resp.status_code == 200
+        assert resp.mimetype == "text/event-stream"
+
+        events = parse_sse(resp.get_data(as_text=True))
+        resp.close()
+        items = [data for name, data in events if name == "item"]
+        assert [i["summary"] for i in items] == ["摘要:美食笔记1", "摘要:旅行笔记1"]
+        progress = [data for name, data in events if name == "progress"][-1]
+        assert progress["bloggers_done"] == progress["bloggers_total"] == 2
+        assert progress["notes_done"] == progress["notes_total"] == 2
+        name, data = events[-1]
+        assert name == "done" and data["digest_id"]
+
+        status = client.get("/api/digest/status", headers=auth_header(user_with_bloggers)).get_json()["data"]
+        assert status["progress"]["notes_done"] == 2
+
+    @patch("app.services.digest_service.llm_service")
+    @patch("app.services.digest_service.xhs_service")
+    def test_stream_resumes_from_last_event_id(self, mock_xhs, mock_llm, app, client, user_with_bloggers):
+        """重连时带 Last-Event-ID，只推送之后的条目"""
+        mock_xhs.get_users_latest_notes.side_effect = fake_fetch([
+            {"note_id": "n1", "title": "美食笔记1", "desc": "好吃", "user_id": "blogger_001"},
+            {"note_id": "n2", "title": "旅行笔记1", "desc": "好玩", "user_id": "blogger_002"},
+        ])
+        mock_llm.summary_pool.side_effect = fake_summary_pool(lambda note: f"摘要:{note['title']}")
+
+        client.post("/api/digest/generate", json={}, headers=auth_header(user_with_bloggers))
+        time.sleep(1)
+        resp = client.get("/api/digest/stream",
+                          headers={**auth_header(user_with_bloggers), "Last-Event-ID": "1"})
+        body = resp.get_data(as_text=True)
+        resp.close()
+        assert body.startswith("retry: ")
+        items = [data for name, data in parse_sse(body) if name == "item"]
+        assert [i["summary"] for i in items] == ["摘要:旅行笔记1"]
+        assert "id: 2\n" in body
+
+    def test_stream_timeout_closes_for_reconnect(self, app, client, auth_token):
+        """连接到时直接结束（不推送 error），由 EventSource 重连"""
+        app.config["DIGEST_STREAM_TIMEOUT"] = 0
+        with app.app_context():
+            user_id = User.query.first().id
+            job = Job(user_id=user_id, kind="digest", status="running")
+            db.session.add(job)
+            db.session.commit()
+
+        resp = client.get("/api/digest/stream", headers=auth_header(auth_token))
+        events = parse_sse(resp.get_data(as_text=True))
+        resp.close()
+        assert [name for name, _ in events] == ["progress"]
+
+    def test_stream_connection_cap(self, app, client, auth_token):
+        """本进程进度流已满时返回 503，名额在响应关闭后归还"""
+        app.config["DIGEST_STREAM_MAX_CONNECTIONS"] = 1
+        with app.app_context():
+            user_id = User.query.first().id
+            db.session.add(Job(user_id=user_id, kind="digest", status="done",
+                               result_json=json.dumps({"digest_id": 1})))
+            db.session.commit()
+
+        with app.test_request_context():
+            assert DigestService.acquire_stream_slot()
+        try:
+            resp = client.get("/api/digest/stream", headers=auth_header(auth_token))
+            assert resp.status_code == 503
+            assert resp.headers["Retry-After"]
+        finally:
+            DigestService.release_stream_slot()
+
+        resp = client.get("/api/digest/stream", headers=auth_header(auth_token))
+        assert resp.status_code == 200
+        resp.get_data()
+        resp.close()
+        resp = client.get("/api/digest/stream", headers=auth_header(auth_token))
+        assert resp.status_code == 200
+        resp.close()
+
+
+
 class TestDigestQuery:
     """摘要查询测试"""
 
@@ -177,6 +481,70 @@ class TestDigestQuery:
         assert len(data["items"]) == 2
         assert data["pages"] == 2
 
+    def test_history_loads_items_in_one_query(self, app, client, auth_token):
+        """历史列表中的 digest_items 条目整页一次查询读出，查询次数与摘要数无关"""
+        from app.models.digest import DigestItem
+        from app.models.note import Note
+
+        def seed(count):
+            for _ in range(count):
+                digest = Digest(user_id=1, total_notes=2, bloggers_count=1)
+                db.session.add(digest)
+                db.session.flush()
+                for position, note_id in enumerate(["n1", "n2"]):
+                    note = db.session.query(Note).filter_by(note_id=note_id).one()
+                    db.session.add(DigestItem(digest_id=digest.id, position=position, note_id=note.id,
+                                              blogger_nickname="美食博主", blogger_xhs_id="blogger_001"))
+            db.session.commit()
+
+        def history_selects():
+            statements = []
+
+            def listener(conn, cursor, statement, *args):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    statements.append(statement)
+
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try:
+                resp = client.get("/api/digest/history?page=1&per_page=10", headers=auth_header(auth_token))
+            finally:
+                event.remove(db.engine, "before_cursor_execute", listener)
+            return resp.get_json()["data"]["items"], len(statements)
+
+        with app.app_context():
+            db.session.add_all([Note(note_id="n1", title="笔记1", summary="摘要1"),
+                                Note(note_id="n2", title="笔记2", description="正文2")])
+            seed(1)
+            items, one = history_selects()
+            seed(4)
+            items, five = history_selects()
+
+        assert one == five
+        assert len(items) == 5
+        assert all([i["summary"] for i in item["digest"]["items"]] == ["摘要1", "正文2"] for item in items)
+
+    def test_get_history_by_cursor(self, app, client, auth_token):
+        """传 cursor 时按游标分页，默认返回不含摘要内容的轻量格式"""
+        with app.app_context():
+            for i in range(3):
+                db.session.add(Digest(user_id=1, digest_json=json.dumps({"total_notes": i})))
+            db.session.commit()
+
+        resp = client.get("/api/digest/history?cursor=&per_page=2&with_total=1",
+                          headers=auth_header(auth_token))
+        data = resp.get_json()["data"]
+        assert data["total"] == 3 and data["has_more"]
+        assert [set(item) for item in data["items"]] == [{"id", "created_at", "total_notes", "bloggers_count"}] * 2
+
+        resp = client.get(f"/api/digest/history?cursor={data['next_cursor']}&view=full",
+                          headers=auth_header(auth_token))
+        data = resp.get_json()["data"]
+        assert [item["digest"]["total_notes"] for item in data["items"]] == [0]
+        assert data["next_cursor"] is None
+
+        resp = client.get("/api/digest/history?cursor=bad", headers=auth_header(auth_token))
+        assert resp.status_code == 400
+
     def test_get_digest_detail_success(self, app, client, auth_token):
         """获取特定摘要详情"""
         with app.app_context():
@@ -199,11 +567,6 @@ class TestDigestStatus:
     """任务状态查询测试"""
 
     def test_status_idle(self, client, auth_token):
-        # 清除可能遗留的任务状态
-        from app.services.digest_service import _digest_tasks, _tasks_lock
-        with _tasks_lock:
-            _digest_tasks.clear()
-
         resp = client.get("/api/digest/status",
                           headers=auth_header(auth_token))
         assert resp.status_code == 200
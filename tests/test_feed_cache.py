@@ -0,0 +1,142 @@
+# encoding: utf-8
+"""博主笔记流缓存测试：跨用户共享、增量停止点、单飞"""
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app import create_app
+from app.services.feed_cache import BloggerFeedCache
+from app.services.xhs_service import XHSService
+
+
+def _notes(user_id, ids):
+    return [{"note_id": i, "user_id": user_id} for i in ids]
+
+
+class TestBloggerFeedCache:
+    def test_hit_requires_enough_notes(self):
+        cache = BloggerFeedCache()
+        state, token = cache.acquire("b1", 3)
+        assert state == "leader"
+        cache.store("b1", _notes("b1", ["n5", "n4", "n3"]), 3)
+        cache.release("b1", token)
+
+        state, notes = cache.acquire("b1", 2)
+        assert state == "hit" and [n["note_id"] for n in notes] == ["n5", "n4"]
+        # 要 5 条但只抓了 3 条（还有更多）：未命中
+        assert cache.acquire("b1", 5)[0] == "leader"
+
+    def test_stop_point(self):
+        """增量请求：停止点在缓存中时只返回更新的笔记；缓存按其他停止点抓取且不足时不命中"""
+        cache = BloggerFeedCache()
+        cache.store("b1", _notes("b1", ["n5", "n4", "n3"]), 3)
+        assert [n["note_id"] for n in cache.acquire("b1", 3, stop_at="n4")[1]] == ["n5"]
+        assert [n["note_id"] for n in cache.acquire("b1", 3, stop_at="n1")[1]] == ["n5", "n4", "n3"]
+
+        cache.store("b2", _notes("b2", ["m9"]), 3, stop_at="m8")
+        assert [n["note_id"] for n in cache.acquire("b2", 3, stop_at="m8")[1]] == ["m9"]
+        assert cache.acquire("b2", 3, stop_at="m1")[0] == "leader"
+
+    def test_expired_entry_is_refetched(self):
+        cache = BloggerFeedCache(ttl=0.05)
+        cache.store("b1", _notes("b1", ["n1"]), 1)
+        assert cache.acquire("b1", 1)[0] == "hit"
+        time.sleep(0.1)
+        assert cache.acquire("b1", 1)[0] == "leader"
+
+
+@pytest.fixture
+def app():
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    app.config["CACHE_BACKEND"] = "memory"
+    with app.app_context():
+        yield app
+
+
+class TestSharedFeedFetch:
+    def test_concurrent_jobs_share_one_crawl(self, app):
+        """多个任务同时请求同一博主：只抓取一次，其余等待并共用结果"""
+        service = XHSService()
+        calls = []
+
+        def fake_fetch(user_ids, max_users, notes_per_user, on_user_done, stop_at):
+            calls.append(list(user_ids))
+            time.sleep(0.2)
+            notes = []
+            for user_id in user_ids[:max_users]:
+                user_notes = _notes(user_id, [f"{user_id}_n{i}" for i in range(notes_per_user)])
+                on_user_done(user_id, user_notes)
+                notes.extend(user_notes)
+            return notes
+
+        results = []
+
+        def job():
+            with app.app_context():
+                results.append(service.get_users_latest_notes(["top"], max_users=1, notes_per_user=3))
+
+        with patch.object(service, "_fetch_latest_notes", side_effect=fake_fetch):
+            threads = [threading.Thread(target=job) for _ in range(20)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            # 缓存期内再次请求也不抓取；新博主照常抓取
+            done = []
+            service.get_users_latest_notes(["top", "other"], max_users=2, notes_per_user=2,
+                                           on_user_done=lambda user_id, notes: done.append(user_id))
+
+        assert calls == [["top"], ["other"]]
+        assert len(results) == 20
+        assert all([n["note_id"] for n in r] == ["top_n0", "top_n1", "top_n2"] for r in results)
+        assert sorted(done) == ["other", "top"]
+        stats = service.feed_cache_stats()
+        assert stats["misses"] == 2 and stats["hits"] + stats["shared"] == 20
+
+    def test_failed_crawl_releases_waiters(self, app):
+        """抓取失败时不写缓存，下次请求重新抓取"""
+        service = XHSService()
+        with patch.object(service, "_fetch_latest_notes", return_value=[]) as mock_fetch:
+            assert service.get_users_latest_notes(["b1"], max_users=1) == []
+            assert service.get_users_latest_notes(["b1"], max_users=1) == []
+        assert mock_fetch.call_count == 2
+        assert service.feed_cache_stats()["inflight"] == 0
+
+    def test_replacement_blogger_is_single_flight(self, app):
+        """补位的博主同样登记单飞：它正在被抓取时，其他任务等待并共用结果"""
+        service = XHSService()
+        calls = []
+        started = threading.Event()
+
+        def fake_fetch(user_ids, max_users, notes_per_user, on_user_done, stop_at):
+            calls.append(list(user_ids))
+            for user_id in user_ids[:max_users]:
+                if user_id.startswith("bad"):
+                    continue
+                started.set()
+                time.sleep(0.2)
+                on_user_done(user_id, _notes(user_id, [f"{user_id}_n0"]))
+            return []
+
+        results = {}
+
+        def job(name, user_ids):
+            with app.app_context():
+                results[name] = service.get_users_latest_notes(user_ids, max_users=1, notes_per_user=1)
+
+        with patch.object(service, "_fetch_latest_notes", side_effect=fake_fetch):
+            first = threading.Thread(target=job, args=("first", ["bad", "r1"]))
+            first.start()
+            started.wait(2)
+            second = threading.Thread(target=job, args=("second", ["r1"]))
+            second.start()
+            first.join()
+            second.join()
+            # 补位博主的结果已写入缓存，再次补位时直接命中
+            job("third", ["bad2", "r1"])
+
+        assert calls == [["bad"], ["r1"], ["bad2"]]
+        assert all([n["note_id"] for n in results[name]] == ["r1_n0"] for name in ("first", "second", "third"))
+        assert service.feed_cache_stats()["inflight"] == 0
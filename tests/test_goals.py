@@ -0,0 +1,100 @@
+# encoding: utf-8
+"""目标列表批量加载测试"""
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models.goal import Goal, PlanStep
+from app.models.note import Note
+
+
+@pytest.fixture
+def app():
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_token(client):
+    client.post("/api/auth/register", json={
+        "username": "goaluser", "password": "test123456"
+    })
+    resp = client.post("/api/auth/login", json={
+        "username": "goaluser", "password": "test123456"
+    })
+    return resp.get_json()["data"]["access_token"]
+
+
+def auth_header(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _seed(goals=4, steps=3, notes_per_step=2):
+    """第一个用户下建 goals 个目标，每个 steps 步，每步关联 notes_per_step 篇笔记"""
+    notes = [Note(note_id=f"n{i}", title=f"笔记{i}") for i in range(10)]
+    db.session.add_all(notes)
+    for g in range(goals):
+        goal = Goal(user_id=1, title=f"目标{g}")
+        db.session.add(goal)
+        # 倒序插入，验证按 step_number 排序
+        for number in range(steps, 0, -1):
+            step = PlanStep(goal=goal, step_number=number, title=f"目标{g}-步骤{number}")
+            step.related_notes.extend(notes[(g + number + k) % 10] for k in range(notes_per_step))
+            db.session.add(step)
+    db.session.commit()
+
+
+def _count_selects(fn):
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    return result, statements
+
+
+class TestListGoals:
+    @pytest.mark.parametrize("goals", [1, 10])
+    def test_fixed_query_count(self, client, auth_token, goals):
+        _seed(goals=goals)
+        db.session.expire_all()
+        resp, statements = _count_selects(lambda: client.get("/api/goals", headers=auth_header(auth_token)))
+        data = resp.get_json()["data"]
+        assert len(data) == goals
+        assert [s["step_number"] for s in data[0]["steps"]] == [1, 2, 3]
+        assert all(len(s["related_notes"]) == 2 for g in data for s in g["steps"])
+        # 目标、步骤、关联笔记各一次
+        assert len(statements) == 3
+
+    def test_summary_skips_notes(self, client, auth_token):
+        _seed()
+        db.session.expire_all()
+        resp, statements = _count_selects(
+            lambda: client.get("/api/goals?view=summary", headers=auth_header(auth_token)))
+        data = resp.get_json()["data"]
+        assert len(data) == 4 and len(data[0]["steps"]) == 3
+        assert all("related_notes" not in s for g in data for s in g["steps"])
+        assert not any("notes" in s for s in statements)
+
+    def test_batch_matches_per_goal(self, client, auth_token):
+        """批量序列化与逐个目标 to_dict 的结果一致"""
+        _seed()
+        resp = client.get("/api/goals", headers=auth_header(auth_token))
+        for goal in resp.get_json()["data"]:
+            detail = client.get(f"/api/goals/{goal['id']}", headers=auth_header(auth_token)).get_json()["data"]
+            assert detail == goal
@@ -0,0 +1,68 @@
+# encoding: utf-8
+"""笔记网页 __INITIAL_STATE__ 子树提取测试"""
+import json
+import os
+
+import pytest
+
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.initial_state import extract_state_value, locate_initial_state
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGES = {
+    "xhs_note_image.html": "68f1a2b3000000000703c4d5",
+    "xhs_note_video.html": "68f1a2b3000000000703e6f7",
+}
+
+
+def _page(state_js: str) -> str:
+    return f"<html><script>var a={{}};</script><script>window.__INITIAL_STATE__={state_js}</script></html>"
+
+
+class TestExtractStateValue:
+    def test_only_target_subtree_parsed(self):
+        """子树之外的内容即使不是合法 JSON 也不影响解析"""
+        html = _page('{"feed":{"x":function(){}},"note":{"noteDetailMap":{"n1":{"note":{"noteId":"n1"}}},"y":[}')
+        span = locate_initial_state(html)
+        assert extract_state_value(html, "noteDetailMap", span) == {"n1": {"note": {"noteId": "n1"}}}
+
+    def test_undefined_values_become_null(self):
+        html = _page('{"note":{"noteDetailMap":{"n1":{"note":{"video":undefined,"tags":[undefined],'
+                     '"desc":"说明:undefined,保留"}}}}}')
+        note = extract_state_value(html, "noteDetailMap", locate_initial_state(html))["n1"]["note"]
+        assert note == {"video": None, "tags": [None], "desc": "说明:undefined,保留"}
+
+    def test_missing_state_or_key(self):
+        assert locate_initial_state("<html></html>") is None
+        html = _page('{"note":{"noteDetailMap":undefined}}')
+        span = locate_initial_state(html)
+        assert extract_state_value(html, "noteDetailMap", span) is None
+        assert extract_state_value(html, "commentMap", span) is None
+
+    def test_truncated_state_raises(self):
+        html = _page('{"note":{"noteDetailMap":{"n1":{"note":{"noteId":"n1"')
+        with pytest.raises(json.JSONDecodeError):
+            extract_state_value(html, "noteDetailMap", locate_initial_state(html))
+
+
+class TestParseNoteHtml:
+    """保存的笔记页面"""
+
+    @pytest.mark.parametrize("name", sorted(PAGES))
+    def test_fixture_pages(self, name):
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+            html = f.read()
+        note_id = PAGES[name]
+        success, msg, res_json = XHS_Apis.parse_note_html(html, f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token=t")
+        assert success, msg
+        card = res_json["data"]["items"][0]["note_card"]
+        assert card["title"] == "杭州三天两夜｜这份攻略请收好"
+        # 正文里的 "undefined" 原样保留
+        assert "undefined 不是 bug" in card["desc"]
+        assert card["user"]["nickname"] == "西湖边的猫"
+
+    def test_other_note_id_not_found(self):
+        with open(os.path.join(FIXTURES, "xhs_note_image.html"), encoding="utf-8") as f:
+            html = f.read()
+        success, msg, _ = XHS_Apis.parse_note_html(html, "https://www.xiaohongshu.com/explore/other")
+        assert not success and "未找到笔记数据" in msg
@@ -0,0 +1,143 @@
+# encoding: utf-8
+"""持久化任务队列测试"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from app import create_app
+from app.extensions import db
+from app.models.job import Job
+from app.models.user import User
+from app.services.job_queue import ActiveJobExists, JobQueue
+
+
+@pytest.fixture
+def app():
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    app.config["JOB_RETRY_BACKOFF"] = 0
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="jobuser", password_hash="x"))
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        db.session.expire_all()
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestJobQueue:
+    """任务认领 / 重试 / 中断恢复"""
+
+    def test_job_runs_and_records_timing(self, app):
+        queue = JobQueue()
+        queue.register("echo", lambda job: (True, "完成", {"echo": job.payload["value"]}))
+        job = queue.enqueue("echo", 1, {"value": 42})
+
+        assert _wait_for(lambda: db.session.get(Job, job.id).status == "done")
+        job = db.session.get(Job, job.id)
+        assert job.result == {"echo": 42}
+        assert job.attempts == 1
+        info = job.to_dict()
+        assert info["queue_seconds"] >= 0 and info["run_seconds"] >= 0
+
+    def test_business_failure_not_retried(self, app):
+        queue = JobQueue()
+        queue.register("nope", lambda job: (False, "未能获取到任何笔记", None))
+        job = queue.enqueue("nope", 1, max_attempts=3)
+
+        assert _wait_for(lambda: db.session.get(Job, job.id).status == "error")
+        assert db.session.get(Job, job.id).attempts == 1
+
+    def test_exception_retried_until_max_attempts(self, app):
+        calls = []
+
+        def flaky(job):
+            calls.append(job.attempts)
+            if len(calls) < 2:
+                raise RuntimeError("XHS 461")
+            return True, "完成", None
+
+        queue = JobQueue()
+        queue.register("flaky", flaky)
+        job = queue.enqueue("flaky", 1, max_attempts=2)
+
+        assert _wait_for(lambda: db.session.get(Job, job.id).status == "done")
+        assert calls == [1, 2]
+
+    def test_duplicate_active_job_rejected(self, app):
+        """同一用户同类任务在排队 / 运行时，再次提交由唯一索引拒绝（不依赖提交前的检查）"""
+        db.session.add(Job(kind="echo", user_id=1, status="running", max_attempts=1))
+        db.session.commit()
+        queue = JobQueue()
+        queue.register("echo", lambda job: (True, "完成", None))
+
+        with pytest.raises(ActiveJobExists) as exc:
+            queue.enqueue("echo", 1, {"value": 1})
+        assert exc.value.job.status == "running"
+        assert Job.query.filter_by(kind="echo").count() == 1
+
+        Job.query.filter_by(kind="echo").update({"status": "done"})
+        db.session.commit()
+        job = queue.enqueue("echo", 1, {"value": 2})
+        assert _wait_for(lambda: db.session.get(Job, job.id).status == "done")
+
+    def test_claim_is_exclusive(self, app):
+        """两个进程的调度器不会认领同一个任务"""
+        db.session.add(Job(kind="echo", user_id=1, status="queued", max_attempts=1,
+                           available_at=datetime.utcnow()))
+        db.session.commit()
+        first, second = JobQueue(), JobQueue()
+        for queue, name in [(first, "host:1"), (second, "host:2")]:
+            queue.register("echo", lambda job: (True, "完成", None))
+            queue.worker_name = name
+
+        assert first._claim_next() is not None
+        assert second._claim_next() is None
+
+    def test_only_claims_registered_kinds(self, app):
+        db.session.add(Job(kind="digest", user_id=1, status="queued", max_attempts=1,
+                           available_at=datetime.utcnow()))
+        db.session.commit()
+        queue = JobQueue()
+        queue.register("echo", lambda job: (True, "完成", None))
+        assert queue._claim_next() is None
+
+    def test_stale_running_job_requeued(self, app):
+        """执行进程退出后（心跳超时）任务重新排队"""
+        old = datetime.utcnow() - timedelta(minutes=10)
+        job = Job(kind="echo", user_id=1, status="running", attempts=1, max_attempts=2,
+                  worker="dead:1", started_at=old, heartbeat_at=old)
+        other = User(username="jobuser2", password_hash="x")
+        db.session.add(other)
+        db.session.flush()
+        exhausted = Job(kind="echo", user_id=other.id, status="running", attempts=2, max_attempts=2,
+                        worker="dead:1", started_at=old, heartbeat_at=old)
+        db.session.add_all([job, exhausted])
+        db.session.commit()
+
+        JobQueue()._requeue_stale(stale_seconds=60)
+
+        assert db.session.get(Job, job.id).status == "queued"
+        assert db.session.get(Job, exhausted.id).status == "error"
+
+    def test_queue_depth_and_position(self, app):
+        now = datetime.utcnow()
+        users = [User(username=f"queueuser{i}", password_hash="x") for i in range(3)]
+        db.session.add_all(users)
+        db.session.flush()
+        jobs = [Job(kind="echo", user_id=user.id, status="queued", max_attempts=1, available_at=now)
+                for user in users]
+        jobs.append(Job(kind="echo", user_id=1, status="running", max_attempts=1))
+        db.session.add_all(jobs)
+        db.session.commit()
+
+        assert JobQueue.queue_depth() == {"queued": 3, "running": 1}
+        assert JobQueue.queue_position(jobs[2]) == 2
@@ -0,0 +1,134 @@
+# encoding: utf-8
+"""LLM 响应缓存测试（不访问模型服务）"""
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_service import LLMService
+
+
+def _fake_client(content="回复"):
+    client = MagicMock()
+    client.chat.completions.create.return_value = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+    return client
+
+
+def _service_with_cache(cache):
+    service = LLMService()
+    service._cache = cache
+    return service
+
+
+class TestLLMResponseCache:
+    """两级缓存"""
+
+    def test_key_depends_on_model_prompt_and_params(self):
+        messages = [{"role": "user", "content": "你好"}]
+        key = LLMResponseCache.make_key("Qwen3-8B", messages, {"temperature": 0.7})
+        assert key == LLMResponseCache.make_key("Qwen3-8B", messages, {"temperature": 0.7})
+        assert key != LLMResponseCache.make_key("Qwen3-4B", messages, {"temperature": 0.7})
+        assert key != LLMResponseCache.make_key("Qwen3-8B", messages, {"temperature": 0.3})
+
+    def test_disk_tier_survives_new_instance(self, tmp_path):
+        path = str(tmp_path / "llm_cache.db")
+        LLMResponseCache(db_path=path).set("k", "Qwen3-8B", "摘要")
+
+        cache = LLMResponseCache(db_path=path)
+        assert cache.get("k") == "摘要"
+        assert cache.get("k") == "摘要"
+        stats = cache.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = LLMResponseCache(db_path=str(tmp_path / "c.db"), ttl=0.05)
+        cache.set("k", "m", "v")
+        time.sleep(0.1)
+        assert cache.get("k") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_size_eviction_drops_least_recently_used(self, tmp_path):
+        cache = LLMResponseCache(db_path=str(tmp_path / "c.db"), memory_size=1, max_entries=2, evict_every=1)
+        cache.set("a", "m", "1")
+        cache.set("b", "m", "2")
+        cache._memory.clear()
+        assert cache.get("a") == "1"  # a 最近被访问
+        cache.set("c", "m", "3")
+        cache._memory.clear()
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.stats()["evictions"] == 1
+
+    def test_eviction_runs_every_n_writes(self, tmp_path):
+        cache = LLMResponseCache(db_path=str(tmp_path / "c.db"), max_entries=2, evict_every=4)
+        for i in range(3):
+            cache.set(str(i), "m", "v")
+        assert cache._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 3
+        cache.set("3", "m", "v")
+        assert cache._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 2
+        assert cache.stats()["evictions"] == 2
+
+    def test_created_at_indexed(self, tmp_path):
+        cache = LLMResponseCache(db_path=str(tmp_path / "c.db"))
+        plan = cache._conn.execute(
+            "EXPLAIN QUERY PLAN DELETE FROM llm_cache WHERE created_at < ?", (0,)
+        ).fetchall()
+        assert any("ix_llm_cache_created_at" in row[-1] for row in plan)
+
+
+class TestCachedCall:
+    """LLMService._call 接入缓存"""
+
+    def test_identical_prompt_hits_cache(self):
+        service = _service_with_cache(LLMResponseCache())
+        client = _fake_client("同一个答案")
+        messages = [{"role": "user", "content": "总结一下"}]
+
+        first = service._call(client, "Qwen3-8B", messages, max_tokens=256, temperature=0.7)
+        second = service._call(client, "Qwen3-8B", messages, max_tokens=256, temperature=0.7)
+
+        assert first == second == "同一个答案"
+        assert client.chat.completions.create.call_count == 1
+        assert service.cache_stats()["memory_hits"] == 1
+
+    def test_bypass_flag(self):
+        service = _service_with_cache(LLMResponseCache())
+        client = _fake_client()
+        messages = [{"role": "user", "content": "总结一下"}]
+
+        service._call(client, "Qwen3-8B", messages, temperature=0.7)
+        service._call(client, "Qwen3-8B", messages, use_cache=False, temperature=0.7)
+
+        assert client.chat.completions.create.call_count == 2
+        assert "use_cache" not in client.chat.completions.create.call_args.kwargs
+
+    def test_failures_not_cached(self):
+        service = _service_with_cache(LLMResponseCache())
+        client = MagicMock()
+        client.chat.completions.create.side_effect = RuntimeError("vLLM 不可用")
+        messages = [{"role": "user", "content": "总结一下"}]
+
+        assert service._call(client, "Qwen3-8B", messages) is None
+        assert service._call(client, "Qwen3-8B", messages) is None
+        assert client.chat.completions.create.call_count == 2
+
+    def test_unparseable_reply_not_cached(self):
+        """解析失败的回复不进缓存，重试时重新请求模型"""
+        service = _service_with_cache(LLMResponseCache())
+        client = MagicMock()
+        client.chat.completions.create.side_effect = [
+            SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="步骤如下：1. 先学基础"))]),
+            SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+                content='{"steps": [{"title": "基础", "description": "", "time_estimate": "2天"}]}'))]),
+        ]
+        service._heavy_client = client
+
+        assert service.decompose_goal("学 Python") is None
+        plan = service.decompose_goal("学 Python")
+        assert plan["steps"][0]["title"] == "基础"
+        # 合法回复已缓存，第三次不再请求
+        assert service.decompose_goal("学 Python") == plan
+        assert client.chat.completions.create.call_count == 2
@@ -0,0 +1,109 @@
+# encoding: utf-8
+"""NoteFetcher 批量抓取测试（mock XHS_Apis）"""
+import random
+import threading
+import time
+from unittest.mock import MagicMock
+
+from xhs_utils.note_fetcher import NoteFetcher
+
+
+def _make_fetcher(max_workers, per_client_limit=None, failing_users=()):
+    """构造一个使用假 XHS_Apis 的 NoteFetcher，随机延迟以打乱完成顺序"""
+    fetcher = NoteFetcher("a1=test", max_workers=max_workers, per_client_limit=per_client_limit)
+    api = MagicMock()
+    api.base_url = "https://edith.xiaohongshu.com"
+    stats = {"in_flight": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def track(fn):
+        def wrapper(*args, **kwargs):
+            with lock:
+                stats["in_flight"] += 1
+                stats["peak"] = max(stats["peak"], stats["in_flight"])
+            try:
+                time.sleep(random.uniform(0, 0.02))
+                return fn(*args, **kwargs)
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+        return wrapper
+
+    def get_user_latest_notes(user_url, cookies_str, limit=5, proxies=None, page_stats=None,
+                              stop_at_note_id=None):
+        user_id = user_url.rsplit("/", 1)[-1]
+        notes = [{"note_id": f"{user_id}_n{i}"} for i in range(5)]
+        ids = [n["note_id"] for n in notes]
+        reached_known = stop_at_note_id in ids
+        if reached_known:
+            notes = notes[:ids.index(stop_at_note_id)]
+        if page_stats is not None:
+            page_stats.update(pages=1, stopped_early=True)
+            if stop_at_note_id:
+                page_stats["reached_known"] = reached_known
+        if user_id in failing_users:
+            return False, "failed", []
+        return True, "ok", notes[:limit]
+
+    def get_note_info(note_url, cookies_str, proxies=None):
+        # 详情失败，走基本信息分支
+        return False, "detail failed", None
+
+    api.get_user_latest_notes.side_effect = track(get_user_latest_notes)
+    api.get_note_info.side_effect = track(get_note_info)
+    fetcher.xhs_apis = api
+    return fetcher, stats
+
+
+class TestNoteFetcher:
+    """串行 / 并发抓取结果一致性"""
+
+    def test_concurrent_preserves_order(self):
+        user_ids = [f"u{i}" for i in range(6)]
+        serial, _ = _make_fetcher(max_workers=1)
+        concurrent, _ = _make_fetcher(max_workers=8)
+
+        expected = serial.get_users_latest_notes(user_ids, max_users=4, notes_per_user=3)
+        result = concurrent.get_users_latest_notes(user_ids, max_users=4, notes_per_user=3)
+
+        assert [n["note_id"] for n in result] == [n["note_id"] for n in expected]
+        assert [n["note_id"] for n in result][:3] == ["u0_n0", "u0_n1", "u0_n2"]
+        assert len(result) == 12
+
+    def test_failed_user_is_replaced_in_order(self):
+        fetcher, _ = _make_fetcher(max_workers=4, failing_users={"u1"})
+        result = fetcher.get_users_latest_notes(["u0", "u1", "u2", "u3"], max_users=2, notes_per_user=1)
+        assert [n["note_id"] for n in result] == ["u0_n0", "u2_n0"]
+
+    def test_per_client_limit(self):
+        fetcher, stats = _make_fetcher(max_workers=8, per_client_limit=2)
+        fetcher.get_users_latest_notes([f"u{i}" for i in range(5)], max_users=5, notes_per_user=5)
+        assert stats["peak"] <= 2
+
+    def test_limit_aware_walk_reports_saved_pages(self):
+        fetcher, _ = _make_fetcher(max_workers=1)
+        fetcher.get_users_latest_notes(["u0", "u1"], max_users=2, notes_per_user=3)
+        _, kwargs = fetcher.xhs_apis.get_user_latest_notes.call_args
+        assert kwargs["limit"] == 3
+        fetcher.xhs_apis.get_user_all_notes.assert_not_called()
+        assert fetcher.page_stats == {"pages_fetched": 2, "early_stops": 2, "known_stops": 0}
+
+    def test_on_user_done_called_per_blogger(self):
+        fetcher, _ = _make_fetcher(max_workers=6)
+        done = {}
+        fetcher.get_users_latest_notes(
+            ["u0", "u1", "u2"], max_users=3, notes_per_user=2,
+            on_user_done=lambda user_id, notes: done.setdefault(user_id, [n["note_id"] for n in notes]),
+        )
+        assert done == {"u0": ["u0_n0", "u0_n1"], "u1": ["u1_n0", "u1_n1"], "u2": ["u2_n0", "u2_n1"]}
+
+    def test_stop_at_known_note(self):
+        """增量抓取：每个博主只取上次见过的笔记之前的新笔记"""
+        for workers in (1, 4):
+            fetcher, _ = _make_fetcher(max_workers=workers)
+            notes = fetcher.get_users_latest_notes(
+                ["u0", "u1", "u2"], max_users=3, notes_per_user=3,
+                stop_at={"u0": "u0_n1", "u1": "u1_n0"},
+            )
+            assert [n["note_id"] for n in notes] == ["u0_n0", "u2_n0", "u2_n1", "u2_n2"]
+            assert fetcher.page_stats["known_stops"] == 2
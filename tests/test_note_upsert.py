@@ -0,0 +1,72 @@
+# encoding: utf-8
+"""Note 批量查询 / upsert 测试"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models.note import Note
+
+
+@pytest.fixture
+def app():
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+def _row(note_id, **kwargs):
+    row = {"note_id": note_id, "title": f"标题{note_id}", "liked_count": 1,
+           "summary": None, "fetched_at": datetime.utcnow()}
+    row.update(kwargs)
+    return row
+
+
+class TestNoteBulkUpsert:
+    def test_insert_then_update(self, app):
+        """新笔记插入，已有笔记更新；新摘要为空时保留已有摘要"""
+        db.session.add(Note(note_id="old", title="旧标题", liked_count=0, summary="已有摘要"))
+        db.session.commit()
+
+        assert Note.bulk_upsert([_row("old", liked_count=9), _row("new", summary="新摘要")]) == 2
+        db.session.commit()
+
+        notes = Note.find_by_note_ids(["old", "new", "missing"])
+        assert set(notes) == {"old", "new"}
+        assert (notes["old"].title, notes["old"].liked_count, notes["old"].summary) == ("标题old", 9, "已有摘要")
+        assert notes["new"].summary == "新摘要"
+        assert Note.query.count() == 2
+
+    def test_partial_rows_only_touch_given_columns(self, app):
+        """只给出部分列的行不覆盖其他列，重复 note_id 以最后一行为准"""
+        db.session.add(Note(note_id="n1", title="标题", liked_count=5))
+        db.session.commit()
+
+        Note.bulk_upsert([{"note_id": "n1", "summary": "旧"}, {"note_id": "n1", "summary": "摘要"}])
+        db.session.commit()
+
+        note = Note.query.filter_by(note_id="n1").one()
+        assert (note.title, note.liked_count, note.summary) == ("标题", 5, "摘要")
+
+    def test_large_batch_is_split_by_bind_limit(self, app):
+        """超过绑定参数上限时拆成多条多行 INSERT，而不是逐行写入"""
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            Note.bulk_upsert([_row(f"n{i}") for i in range(1000)])
+            db.session.commit()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+
+        inserts = [s for s in statements if s.startswith("INSERT INTO notes")]
+        assert 1 < len(inserts) < 100
+        assert Note.query.count() == 1000
+        assert len(Note.find_by_note_ids(f"n{i}" for i in range(1500))) == 1000
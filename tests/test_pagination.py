@@ -0,0 +1,125 @@
+# encoding: utf-8
+"""游标（keyset）分页测试"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models.bookmark import UserBookmark
+from app.models.digest import Digest
+from app.models.note import Note
+from app.models.user import User
+from app.services.digest_service import DigestService
+from app.services.goal_service import GoalService
+from app.services.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def app():
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(username="u1", password_hash="x"), User(username="u2", password_hash="x")])
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+
+def _seed_digests(n, user_id=1):
+    """每两条摘要共用一个 created_at，验证同一时间的行不会重复或遗漏"""
+    base = datetime(2026, 10, 1)
+    db.session.add_all(
+        Digest(user_id=user_id, created_at=base + timedelta(minutes=i // 2), digest_json=f'{{"total_notes": {i}}}')
+        for i in range(n)
+    )
+    db.session.commit()
+
+
+def _statements(fn):
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        return fn(), statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+
+class TestCursor:
+    def test_roundtrip(self):
+        created_at = datetime(2026, 10, 17, 12, 30, 1, 123456)
+        assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+    @pytest.mark.parametrize("cursor", ["abc", "!!!", encode_cursor(datetime(2026, 1, 1), 1)[:-3]])
+    def test_invalid(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestKeysetPage:
+    def test_walks_all_rows_once(self, app):
+        _seed_digests(25)
+        _seed_digests(3, user_id=2)
+        seen, cursor = [], ""
+        while True:
+            page = keyset_page(Digest.query.filter_by(user_id=1), Digest, cursor, per_page=4)
+            seen.extend(d.id for d in page["items"])
+            if not page["has_more"]:
+                assert page["next_cursor"] is None
+                break
+            cursor = page["next_cursor"]
+        assert seen == sorted(range(1, 26), reverse=True)
+
+    def test_deep_page_has_no_offset_or_count(self, app):
+        _seed_digests(30)
+        first = keyset_page(Digest.query.filter_by(user_id=1), Digest, None, per_page=20)
+        page, statements = _statements(
+            lambda: keyset_page(Digest.query.filter_by(user_id=1), Digest, first["next_cursor"], per_page=20))
+        assert [d.id for d in page["items"]] == list(range(10, 0, -1))
+        assert "total" not in page
+        assert len(statements) == 1
+        statement, parameters = statements[0]
+        # SQLite 方言总会带上 OFFSET ?，这里核对偏移量为 0，靠游标条件定位
+        assert "(digests.created_at, digests.id) <" in statement
+        assert parameters[-1] == 0 and "count(" not in statement.lower()
+
+    def test_optional_total_and_clamped_size(self, app):
+        _seed_digests(5)
+        page = keyset_page(Digest.query.filter_by(user_id=1), Digest, None, per_page=1000, with_total=True)
+        assert page["total"] == 5 and page["per_page"] == 100
+
+
+class TestServices:
+    def test_digest_summary_skips_json(self, app):
+        _seed_digests(3)
+        db.session.expire_all()
+        (success, _, page), statements = _statements(lambda: DigestService.get_digest_history_page(1))
+        assert success
+        assert set(page["items"][0]) == {"id", "created_at", "total_notes", "bloggers_count"}
+        assert "digest_json" not in statements[0][0]
+        success, _, page = DigestService.get_digest_history_page(1, summary=False)
+        assert page["items"][0]["digest"] == {"total_notes": 2}
+
+    def test_invalid_cursor_reported(self, app):
+        success, msg, page = DigestService.get_digest_history_page(1, "bad")
+        assert not success and "游标" in msg and page is None
+
+    def test_bookmarks_page_joins_notes(self, app):
+        notes = [Note(note_id=f"n{i}", title=f"笔记{i}") for i in range(5)]
+        db.session.add_all(notes)
+        db.session.flush()
+        db.session.add_all(UserBookmark(user_id=1, note_id=note.id) for note in notes)
+        db.session.commit()
+        db.session.expire_all()
+        (success, _, page), statements = _statements(lambda: GoalService.list_bookmarks_page(1, per_page=3))
+        assert success and page["has_more"]
+        assert [bm["note"]["note_id"] for bm in page["items"]] == ["n4", "n3", "n2"]
+        assert len(statements) == 1
+        success, _, page = GoalService.list_bookmarks_page(1, page["next_cursor"], per_page=3, with_total=True)
+        assert [bm["note"]["note_id"] for bm in page["items"]] == ["n1", "n0"]
+        assert page["total"] == 5 and not page["has_more"]
@@ -0,0 +1,99 @@
+# encoding: utf-8
+"""热点查询的 EXPLAIN QUERY PLAN 检查：按用户/博主/目标过滤的列表查询都应走索引，不能退化为全表扫描"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models.digest import DigestItem
+from app.models.goal import Goal, PlanStep
+from app.models.note import Note
+from app.models.user import User
+from app.services.content_pool_service import ContentPoolService
+from app.services.digest_service import DigestService
+from app.services.goal_service import MAX_NOTES_FOR_MATCHING, GoalService
+from app.services.pagination import encode_cursor
+
+
+@pytest.fixture
+def app():
+    app = create_app("development", {"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="planuser", password_hash="x"))
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+
+def _query_plans(fn) -> list[tuple[str, list[str]]]:
+    """执行 fn，对其间发出的每条 SELECT 跑 EXPLAIN QUERY PLAN，返回 [(SQL, [计划明细])]"""
+    captured = []
+
+    def listener(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    connection = db.session.connection()
+    return [
+        (statement, [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)])
+        for statement, parameters in captured
+    ]
+
+
+def assert_no_full_scan(fn, sorted_by_index: bool = True):
+    """
+    fn 发出的查询都不能全表扫描（SCAN）；sorted_by_index=True 时排序也必须由索引完成，不能用临时 B 树
+    """
+    plans = _query_plans(fn)
+    assert plans, "没有捕获到查询"
+    for statement, details in plans:
+        scans = [d for d in details if d.startswith("SCAN")]
+        assert not scans, f"全表扫描 {scans}:\n{statement}"
+        if sorted_by_index:
+            temp = [d for d in details if "TEMP B-TREE" in d]
+            assert not temp, f"排序未走索引 {temp}:\n{statement}"
+
+
+class TestHotQueryPlans:
+    def test_digest_history(self, app):
+        assert_no_full_scan(lambda: DigestService.get_digest_history(1))
+        assert_no_full_scan(lambda: DigestService.get_latest_digest(1))
+        cursor = encode_cursor(datetime(2026, 10, 17), 100)
+        assert_no_full_scan(lambda: DigestService.get_digest_history_page(1, cursor, with_total=True))
+
+    def test_digest_items(self, app):
+        assert_no_full_scan(lambda: DigestItem.list_items(1, after=10, limit=20))
+
+    def test_bookmarks(self, app):
+        assert_no_full_scan(lambda: GoalService.list_bookmarks(1))
+        cursor = encode_cursor(datetime(2026, 10, 17), 100)
+        assert_no_full_scan(lambda: GoalService.list_bookmarks_page(1, cursor, with_total=True))
+
+    def test_bloggers(self, app):
+        assert_no_full_scan(lambda: ContentPoolService.list_bloggers(1))
+
+    def test_goals_and_steps(self, app):
+        goal = Goal(user_id=1, title="目标")
+        db.session.add(goal)
+        db.session.commit()
+        assert_no_full_scan(lambda: GoalService.list_goals(1))
+        assert_no_full_scan(lambda: goal.steps.order_by(PlanStep.step_number).all())
+
+    def test_notes_by_bloggers(self, app):
+        """多个博主 IN 查询后按抓取时间合并排序，允许临时 B 树排序，但每个博主都应走索引"""
+        assert_no_full_scan(
+            lambda: Note.query.filter(Note.blogger_id.in_([1, 2, 3]))
+            .order_by(Note.fetched_at.desc()).limit(MAX_NOTES_FOR_MATCHING).all(),
+            sorted_by_index=False,
+        )
+        assert_no_full_scan(
+            lambda: Note.query.filter(Note.blogger_id == 1).order_by(Note.fetched_at.desc()).limit(10).all()
+        )
@@ -0,0 +1,99 @@
+# encoding: utf-8
+"""XHS 接口族令牌桶 + AIMD 限速测试"""
+from unittest.mock import MagicMock, patch
+
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.rate_limiter import AdaptiveTokenBucket, RateLimiter, endpoint_family, parse_rates
+
+
+def _response(status_code: int, payload=None, text=""):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload or {}
+    response.text = text
+    return response
+
+
+class TestTokenBucket:
+    """令牌发放与 AIMD"""
+
+    def test_burst_then_paced(self):
+        bucket = AdaptiveTokenBucket("feed", max_rate=2)
+        waits = [bucket.reserve() for _ in range(4)]
+        assert waits[0] == 0 and waits[1] == 0
+        # 令牌用完后按 0.5 秒一个排队
+        assert 0.4 < waits[2] <= 0.5
+        assert 0.9 < waits[3] <= 1.0
+
+    def test_multiplicative_decrease_once_per_cooldown(self):
+        bucket = AdaptiveTokenBucket("feed", max_rate=4, min_rate=0.5, cooldown=60)
+        bucket.record(461)
+        bucket.record(461)  # 同一窗口内的并发 461 只降一次
+        assert bucket.rate == 2
+        stats = bucket.stats()
+        assert stats["throttled"] == 2 and stats["anti_bot"] == 2
+        assert stats["in_penalty"] is True
+
+    def test_floor_and_additive_recovery(self):
+        bucket = AdaptiveTokenBucket("search", max_rate=1, min_rate=0.3, increase=0.1, cooldown=0)
+        for _ in range(5):
+            bucket.record(500)
+        assert bucket.rate == 0.3
+        assert not bucket.in_penalty()  # 非 461 只降速，不进入惩罚期
+        for _ in range(3):
+            bucket.record(200)
+        assert abs(bucket.rate - 0.6) < 1e-9
+        for _ in range(10):
+            bucket.record(200)
+        assert bucket.rate == 1
+
+    def test_decrease_drains_burst(self):
+        bucket = AdaptiveTokenBucket("feed", max_rate=4, cooldown=0)
+        bucket.record(461)
+        assert bucket.reserve() > 0
+
+
+class TestRateLimiter:
+    def test_endpoint_families(self):
+        assert endpoint_family("https://edith.xiaohongshu.com/api/sns/web/v1/feed") == "feed"
+        assert endpoint_family("https://edith.xiaohongshu.com/api/sns/web/v1/user_posted?num=30") == "user_posted"
+        assert endpoint_family("https://edith.xiaohongshu.com/api/sns/web/v2/comment/sub/page?x=1") == "comment"
+        assert endpoint_family("https://edith.xiaohongshu.com/api/sns/web/v1/search/notes") == "search"
+        assert endpoint_family("https://www.xiaohongshu.com/explore/abc?xsec_token=t") == "web"
+        assert endpoint_family("https://edith.xiaohongshu.com/api/sns/web/v1/user/otherinfo") is None
+
+    def test_parse_rates(self):
+        assert parse_rates("feed:2, search:0.5,") == {"feed": 2.0, "search": 0.5}
+
+    def test_unlisted_family_not_limited(self):
+        limiter = RateLimiter({"feed": 1})
+        assert limiter.bucket_for("https://edith.xiaohongshu.com/api/sns/web/v1/search/notes") is None
+        assert set(limiter.stats()) == {"feed"}
+
+
+class TestApisIntegration:
+    """XHS_Apis 接入限速器"""
+
+    def test_status_fed_back(self):
+        limiter = RateLimiter({"user_posted": 5}, cooldown=0)
+        api = XHS_Apis(rate_limiter=limiter)
+        with patch.object(api, "sign", return_value=({}, {}, None)), \
+                patch.object(api.session, "get", return_value=_response(503)):
+            api.get_user_note_info("u1", "", "a1=x")
+        stats = limiter.stats()["user_posted"]
+        assert stats["requests"] == 1 and stats["throttled"] == 1
+        assert stats["rate"] == 2.5
+
+    def test_note_info_skips_api_after_461(self):
+        """feed 收到 461 后，惩罚期内的笔记详情直接走网页解析"""
+        limiter = RateLimiter({"feed": 5, "web": 5})
+        api = XHS_Apis(rate_limiter=limiter)
+        url = "https://www.xiaohongshu.com/explore/n1?xsec_token=t"
+        with patch.object(api, "sign", return_value=({}, {}, b"{}")), \
+                patch.object(api.session, "post", return_value=_response(461)) as mock_post, \
+                patch.object(api.session, "get", return_value=_response(404)) as mock_get:
+            api.get_note_info(url, "a1=x")
+            api.get_note_info(url, "a1=x")
+        assert mock_post.call_count == 1
+        assert mock_get.call_count == 2
+        assert limiter.stats()["feed"]["in_penalty"] is True
@@ -0,0 +1,108 @@
+# encoding: utf-8
+"""全局资源调度测试"""
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_service import LLMService
+from app.services.scheduler import FairSemaphore, ResourceScheduler, current_owner
+
+
+def _start_waiter(semaphore, owner, order):
+    def run():
+        semaphore.acquire(owner)
+        order.append(owner)
+        semaphore.release()
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+class TestFairSemaphore:
+    """公平信号量"""
+
+    def test_round_robin_between_owners(self):
+        semaphore = FairSemaphore("llm_heavy", 1)
+        semaphore.acquire("holder")
+        order, threads = [], []
+        # 用户 a 先排 3 个请求，用户 b 后排 1 个
+        for owner in ["a", "a", "a", "b"]:
+            threads.append(_start_waiter(semaphore, owner, order))
+            time.sleep(0.05)
+        semaphore.release()
+        for thread in threads:
+            thread.join(timeout=2)
+        assert order == ["a", "b", "a", "a"]
+
+    def test_capacity_respected(self):
+        semaphore = FairSemaphore("xhs", 2)
+        peak, active, lock = [0], [0], threading.Lock()
+
+        def work(owner):
+            semaphore.acquire(owner)
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            semaphore.release()
+
+        threads = [threading.Thread(target=work, args=(i % 3,)) for i in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        assert peak[0] == 2
+        stats = semaphore.stats()
+        assert stats["acquired"] == 12 and stats["in_use"] == 0 and stats["waiting"] == 0
+
+    def test_timeout_leaves_queue(self):
+        semaphore = FairSemaphore("llm_vision", 1)
+        semaphore.acquire("a")
+        assert semaphore.acquire("b", timeout=0.05) is False
+        stats = semaphore.stats()
+        assert stats["timeouts"] == 1 and stats["waiting"] == 0
+        semaphore.release()
+        assert semaphore.acquire("b", timeout=0.05) is True
+
+
+class TestScheduler:
+    """调度器接入"""
+
+    def test_configure_updates_capacity(self):
+        scheduler = ResourceScheduler()
+        scheduler.configure("xhs", 3)
+        scheduler.configure("xhs", 5)
+        assert scheduler.stats()["xhs"]["capacity"] == 5
+
+    def test_batch_summaries_queue_under_submitting_user(self, monkeypatch):
+        """批量摘要的子线程仍按提交任务的用户排队"""
+        scheduler = ResourceScheduler()
+        seen = []
+        original_slot = scheduler.slot
+
+        def recording_slot(resource, owner=None):
+            seen.append((resource, current_owner.get() if owner is None else owner))
+            return original_slot(resource, owner)
+
+        monkeypatch.setattr(scheduler, "slot", recording_slot)
+        monkeypatch.setattr("app.services.llm_service.scheduler", scheduler)
+
+        service = LLMService()
+        service._cache = LLMResponseCache()
+        client = MagicMock()
+        client.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="摘要"))]
+        )
+        service._heavy_client = client
+
+        token = current_owner.set(7)
+        try:
+            notes = [{"title": f"t{i}", "desc": "d"} for i in range(4)]
+            assert service.summarize_notes(notes, max_concurrency=4, use_cache=False) == ["摘要"] * 4
+        finally:
+            current_owner.reset(token)
+        assert seen == [("llm_heavy", 7)] * 4
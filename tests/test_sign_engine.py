@@ -0,0 +1,74 @@
+# encoding: utf-8
+"""常驻 Node 签名引擎测试"""
+import shutil
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from xhs_utils import xhs_util
+from xhs_utils.sign_engine import NodeSignEngine, SignEngineError
+
+requires_node = pytest.mark.skipif(shutil.which("node") is None, reason="需要 node")
+
+
+@pytest.fixture
+def engine():
+    engine = NodeSignEngine(workers=2, timeout=10)
+    yield engine
+    engine.close()
+
+
+@requires_node
+class TestNodeSignEngine:
+
+    def test_sign(self, engine):
+        ret = engine.sign("/api/sns/web/v1/feed", {"source_note_id": "abc"}, "a1value", "POST")
+        assert ret["xs"].startswith("XYS_")
+        assert ret["xs_common"]
+        assert isinstance(ret["xt"], int)
+
+    def test_sign_batch_keeps_order(self, engine):
+        reqs = [{"api": f"/api/{i}", "data": "", "a1": "a1value", "method": "GET"} for i in range(5)]
+        rets = engine.sign_batch(reqs)
+        assert len(rets) == 5
+        assert all(r["xs"].startswith("XYS_") for r in rets)
+
+    def test_recovers_after_worker_crash(self, engine):
+        engine.sign("/api/x", "", "a1value", "GET")
+        for worker in list(engine._workers):
+            worker._proc.kill()
+            worker._proc.wait()
+        ret = engine.sign("/api/x", "", "a1value", "GET")
+        assert ret["xs"].startswith("XYS_")
+
+
+class TestFallback:
+
+    def test_falls_back_to_execjs(self):
+        broken = MagicMock()
+        broken.sign.side_effect = SignEngineError("boom")
+        fake_js = MagicMock()
+        fake_js.call.return_value = {"xs": "XYS_fallback", "xt": 1, "xs_common": "c"}
+        with patch.object(xhs_util, "get_sign_engine", return_value=broken), \
+                patch.object(xhs_util, "_get_sign_js", return_value=fake_js):
+            xs, xt, xs_common = xhs_util.generate_xs_xs_common("a1", "/api/x", "", "GET")
+        assert xs == "XYS_fallback"
+        fake_js.call.assert_called_once()
+
+
+class TestXrayTraceId:
+    """纯 Python x-xray-traceid"""
+
+    def test_format_and_sequence(self):
+        first = xhs_util.generate_xray_traceid()
+        second = xhs_util.generate_xray_traceid()
+        assert len(first) == 32 and int(first, 16) >= 0
+        high1, high2 = int(first[:16], 16), int(second[:16], 16)
+        assert abs((high1 >> 23) - int(time.time() * 1000)) < 5000
+        assert (high2 & 0x7FFFFF) == ((high1 & 0x7FFFFF) + 1) & 0x7FFFFF
+
+    def test_header_template_needs_no_js(self):
+        with patch.object(xhs_util, "_get_sign_js", side_effect=AssertionError("不应调用 JS")):
+            headers = xhs_util.get_request_headers_template()
+        assert len(headers["x-xray-traceid"]) == 32
@@ -0,0 +1,275 @@
+# encoding: utf-8
+"""XHS_Apis 翻页逻辑测试（mock 单页请求，不访问网络）"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+
+from apis.xhs_pc_apis import XHS_Apis, XHSApiError
+
+
+def _fake_pages(total_notes, page_size=30):
+    """模拟 user_posted 分页：返回 (success, msg, res_json)"""
+    def get_user_note_info(user_id, cursor, cookies_str, xsec_token='', xsec_source='', proxies=None):
+        start = int(cursor or 0)
+        notes = [{"note_id": f"n{i}"} for i in range(start, min(start + page_size, total_notes))]
+        end = start + len(notes)
+        return True, "ok", {"data": {"notes": notes, "cursor": str(end), "has_more": end < total_notes}}
+    return get_user_note_info
+
+
+class TestUserLatestNotes:
+    """get_user_latest_notes 取够即停"""
+
+    def test_stops_after_first_page(self):
+        api = XHS_Apis()
+        with patch.object(api, "get_user_note_info", side_effect=_fake_pages(3000)) as mock_page:
+            stats = {}
+            success, msg, notes = api.get_user_latest_notes(
+                "https://www.xiaohongshu.com/user/profile/u1", "a1=x", limit=3, page_stats=stats
+            )
+        assert success
+        assert [n["note_id"] for n in notes] == ["n0", "n1", "n2"]
+        assert mock_page.call_count == 1
+        assert stats == {"pages": 1, "stopped_early": True}
+
+    def test_walks_until_limit(self):
+        api = XHS_Apis()
+        with patch.object(api, "get_user_note_info", side_effect=_fake_pages(100)) as mock_page:
+            stats = {}
+            success, msg, notes = api.get_user_latest_notes(
+                "https://www.xiaohongshu.com/user/profile/u1", "a1=x", limit=45, page_stats=stats
+            )
+        assert len(notes) == 45
+        assert mock_page.call_count == 2
+        assert stats["stopped_early"] is True
+
+    def test_short_history(self):
+        api = XHS_Apis()
+        with patch.object(api, "get_user_note_info", side_effect=_fake_pages(2)):
+            stats = {}
+            success, msg, notes = api.get_user_latest_notes(
+                "https://www.xiaohongshu.com/user/profile/u1", "a1=x", limit=5, page_stats=stats
+            )
+        assert len(notes) == 2
+        assert stats == {"pages": 1, "stopped_early": False}
+
+    def test_stop_at_known_note(self):
+        """翻到上次见过的笔记即停止，只返回更新的笔记"""
+        api = XHS_Apis()
+        with patch.object(api, "get_user_note_info", side_effect=_fake_pages(3000, page_size=10)) as mock_page:
+            stats = {}
+            success, msg, notes = api.get_user_latest_notes(
+                "https://www.xiaohongshu.com/user/profile/u1", "a1=x", limit=20, page_stats=stats,
+                stop_at_note_id="n12",
+            )
+        assert [n["note_id"] for n in notes] == [f"n{i}" for i in range(12)]
+        assert mock_page.call_count == 2
+        assert stats == {"pages": 2, "stopped_early": True, "reached_known": True}
+
+    def test_sticky_note_is_not_stop_point(self):
+        """上次见过的笔记被置顶后排在最前，不按它停止，继续往后取"""
+        api = XHS_Apis()
+        page = [
+            {"note_id": "old", "interact_info": {"sticky": True}},
+            {"note_id": "new1"},
+            {"note_id": "older"},
+        ]
+        res_json = {"data": {"notes": page, "cursor": "", "has_more": False}}
+        with patch.object(api, "get_user_note_info", return_value=(True, "ok", res_json)):
+            stats = {}
+            success, msg, notes = api.get_user_latest_notes(
+                "https://www.xiaohongshu.com/user/profile/u1", "a1=x", limit=5, page_stats=stats,
+                stop_at_note_id="old",
+            )
+        assert [n["note_id"] for n in notes] == ["old", "new1", "older"]
+        assert stats["reached_known"] is False
+
+
+class TestHttpSession:
+    """连接池会话配置"""
+
+    def test_default_timeout_applied(self):
+        api = XHS_Apis(timeout=(1, 2))
+        with patch.object(api.session, "get") as mock_get:
+            api._get("https://edith.xiaohongshu.com/x", headers={})
+        assert mock_get.call_args.kwargs["timeout"] == (1, 2)
+
+    def test_retry_only_on_connect_errors(self):
+        api = XHS_Apis(pool_size=7, max_retries=3)
+        adapter = api.session.get_adapter("https://edith.xiaohongshu.com")
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.connect == 3
+        assert adapter.max_retries.read == 0
+        assert adapter.max_retries.status == 0
+
+    def test_session_ignores_server_cookies(self):
+        """服务端 Set-Cookie 不会写入共享会话"""
+        api = XHS_Apis()
+        assert api.session.cookies.get_policy().is_not_allowed("edith.xiaohongshu.com")
+
+
+class TestPaginators:
+    """iter_* 翻页器：惰性、可断点继续，列表方法基于翻页器"""
+
+    def test_lazy_and_stops_early(self):
+        """只取前 N 条时不再请求后续页"""
+        api = XHS_Apis()
+        with patch.object(api, "get_user_note_info", side_effect=_fake_pages(3000, page_size=10)) as mock_page:
+            pages = api.iter_user_notes("https://www.xiaohongshu.com/user/profile/u1", "a1=x")
+            first = list(itertools.islice(api.iter_items(pages, "notes"), 15))
+        assert [n["note_id"] for n in first] == [f"n{i}" for i in range(15)]
+        assert mock_page.call_count == 2
+
+    def test_resume_from_cursor(self):
+        api = XHS_Apis()
+        with patch.object(api, "get_user_note_info", side_effect=_fake_pages(25, page_size=10)):
+            pages = api.iter_user_notes("https://www.xiaohongshu.com/user/profile/u1", "a1=x")
+            cursor = next(pages)["cursor"]
+            resumed = list(api.iter_user_notes("https://www.xiaohongshu.com/user/profile/u1", "a1=x", cursor=cursor))
+        assert [len(page["notes"]) for page in resumed] == [10, 5]
+        assert resumed[0]["notes"][0]["note_id"] == "n10"
+
+    def test_all_notes_built_on_paginator(self):
+        api = XHS_Apis()
+        with patch.object(api, "get_user_note_info", side_effect=_fake_pages(65)) as mock_page:
+            success, msg, notes = api.get_user_all_notes("https://www.xiaohongshu.com/user/profile/u1", "a1=x")
+        assert success
+        assert len(notes) == 65
+        assert mock_page.call_count == 3
+
+    def test_failure_keeps_list_contract(self):
+        """翻页中途失败：列表方法返回 success=False，翻页器抛 XHSApiError"""
+        api = XHS_Apis()
+        pages = [
+            (True, "ok", {"data": {"message_list": [{"id": 1}], "cursor": "c1", "has_more": True}}),
+            (False, "登录已过期", None),
+        ]
+        with patch.object(api, "get_metions", side_effect=pages * 2):
+            success, msg, items = api.get_all_metions("a1=x")
+            assert not success and msg == "登录已过期"
+            with pytest.raises(XHSApiError):
+                list(api.iter_metions("a1=x"))
+
+    def test_search_pages_are_numbered(self):
+        api = XHS_Apis()
+
+        def search_user(query, cookies_str, page=1, proxies=None):
+            users = [{"id": f"{page}-{i}"} for i in range(15)]
+            return True, "ok", {"data": {"users": users, "has_more": page < 3}}
+
+        with patch.object(api, "search_user", side_effect=search_user):
+            pages = [page for page, _ in api.iter_search_users("q", "a1=x", page=2)]
+            success, msg, users = api.search_some_user("q", 20, "a1=x")
+        assert pages == [2, 3]
+        assert len(users) == 20
+
+
+def _fake_comments(api, top_pages=3, per_page=10, replies_per_comment=5, delay=0.0):
+    """模拟一级评论分页（每条都有更多回复）和二级评论分页（每页 1 条），记录最大并发"""
+    state = {"active": 0, "max_active": 0, "inner_calls": 0}
+    lock = threading.Lock()
+
+    def out_comment(note_id, cursor, xsec_token, cookies_str, proxies=None):
+        page = int(cursor or 0)
+        comments = [
+            {"id": f"c{page * per_page + i}", "note_id": note_id, "sub_comments": [{"id": "inline"}],
+             "sub_comment_has_more": True, "sub_comment_cursor": "0"}
+            for i in range(per_page)
+        ]
+        data = {"comments": comments, "cursor": str(page + 1), "has_more": page + 1 < top_pages}
+        return True, "ok", {"data": data}
+
+    def inner_comment(comment, cursor, xsec_token, cookies_str, proxies=None):
+        with lock:
+            state["active"] += 1
+            state["inner_calls"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        index = int(cursor)
+        data = {"comments": [{"id": f"{comment['id']}-r{index}"}], "cursor": str(index + 1),
+                "has_more": index + 1 < replies_per_comment}
+        return True, "ok", {"data": data}
+
+    api.get_note_out_comment = out_comment
+    api.get_note_inner_comment = inner_comment
+    return state
+
+
+class TestNoteComments:
+    """二级评论有界并发展开，按原顺序产出"""
+
+    def test_parallel_expansion_keeps_order(self):
+        api = XHS_Apis()
+        state = _fake_comments(api, delay=0.01)
+        comments = list(api.iter_note_comments("n1", "tok", "a1=x", workers=4))
+        assert [c["id"] for c in comments] == [f"c{i}" for i in range(30)]
+        assert [r["id"] for r in comments[7]["sub_comments"]] == ["inline"] + [f"c7-r{i}" for i in range(5)]
+        assert 1 < state["max_active"] <= 4
+
+    def test_caps_comments_and_replies(self):
+        api = XHS_Apis()
+        state = _fake_comments(api)
+        success, msg, comments = api.get_note_all_comment(
+            "https://www.xiaohongshu.com/explore/n1?xsec_token=t", "a1=x", max_comments=12, max_replies=7
+        )
+        assert success
+        assert len(comments) == 12
+        assert sum(len(c["sub_comments"]) - 1 for c in comments) == 7
+        assert state["inner_calls"] <= 7 + 4
+
+    def test_no_expansion_when_replies_disabled(self):
+        api = XHS_Apis()
+        state = _fake_comments(api)
+        comments = list(api.iter_note_comments("n1", "tok", "a1=x", max_replies=0))
+        assert len(comments) == 30
+        assert state["inner_calls"] == 0
+
+    def test_first_comment_before_all_pages(self):
+        """提前停止时不再翻后续一级评论页"""
+        api = XHS_Apis()
+        _fake_comments(api, top_pages=100)
+        with patch.object(api, "get_note_out_comment", wraps=api.get_note_out_comment) as mock_out:
+            pager = api.iter_note_comments("n1", "tok", "a1=x", workers=2)
+            first = next(pager)
+            pager.close()
+        assert first["id"] == "c0"
+        assert mock_out.call_count == 1
+
+    def test_request_slot_wraps_every_request(self):
+        api = XHS_Apis()
+        state = _fake_comments(api, top_pages=1, per_page=3, replies_per_comment=2)
+        entered = []
+
+        @contextmanager
+        def slot():
+            entered.append(1)
+            yield
+
+        list(api.iter_note_comments("n1", "tok", "a1=x", workers=2, request_slot=slot))
+        assert len(entered) == 1 + state["inner_calls"]
+
+    def test_failed_expansion_keeps_all_comments(self):
+        """某条评论的回复翻页失败：仍返回全部一级评论，失败的那条带着已取到的回复"""
+        api = XHS_Apis()
+        _fake_comments(api)
+        inner_comment = api.get_note_inner_comment
+
+        def flaky_inner(comment, cursor, xsec_token, cookies_str, proxies=None):
+            if comment["id"] == "c5" and cursor == "2":
+                return False, "HTTP 461", None
+            return inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
+
+        api.get_note_inner_comment = flaky_inner
+        success, msg, comments = api.get_note_all_comment(
+            "https://www.xiaohongshu.com/explore/n1?xsec_token=t", "a1=x"
+        )
+        assert not success and "461" in msg
+        assert [c["id"] for c in comments] == [f"c{i}" for i in range(30)]
+        assert [r["id"] for r in comments[5]["sub_comments"]] == ["inline", "c5-r0", "c5-r1"]
+        assert len(comments[6]["sub_comments"]) == 6
@@ -0,0 +1,262 @@
+# encoding: utf-8
+"""AsyncXHS_Apis 测试（httpx.MockTransport 模拟接口，签名打桩，不访问网络）"""
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from apis.xhs_pc_apis import XHS_Apis, XHSApiError
+from apis.xhs_pc_apis_async import AsyncXHS_Apis
+
+USER_URL = "https://www.xiaohongshu.com/user/profile/u1?xsec_token=tok%3D&xsec_source=pc_feed"
+
+
+def _fake_sign(api, data, cookies_str):
+    body = None if data is None else json.dumps(data, ensure_ascii=False).encode("utf-8")
+    return {"x-s": "signed"}, {"a1": "x", "web_session": "s"}, body
+
+
+def _run(handler, coro_fn):
+    """用 MockTransport 构造客户端并执行 coro_fn(api)"""
+    async def main():
+        async with AsyncXHS_Apis(transport=httpx.MockTransport(handler)) as api:
+            with patch.object(api, "sign", side_effect=_fake_sign):
+                return await coro_fn(api)
+    return asyncio.run(main())
+
+
+def _user_posted(total_notes, page_size=10, requests=None):
+    """模拟 user_posted 分页"""
+    def handler(request: httpx.Request):
+        if requests is not None:
+            requests.append(request)
+        start = int(request.url.params.get("cursor") or 0)
+        notes = [{"note_id": f"n{i}"} for i in range(start, min(start + page_size, total_notes))]
+        end = start + len(notes)
+        data = {"notes": notes, "cursor": str(end), "has_more": end < total_notes}
+        return httpx.Response(200, json={"success": True, "msg": "成功", "data": data})
+    return handler
+
+
+class TestAsyncRequests:
+    """单页接口与同步版本共用请求构造"""
+
+    def test_get_request_carries_cookies_and_signature(self):
+        requests = []
+        success, msg, res_json = _run(
+            _user_posted(3, requests=requests),
+            lambda api: api.get_user_note_info("u1", "", "a1=x; web_session=s", "tok", "pc_feed"),
+        )
+        assert success and len(res_json["data"]["notes"]) == 3
+        request = requests[0]
+        assert request.method == "GET"
+        assert request.url.path == "/api/sns/web/v1/user_posted"
+        assert request.url.params["xsec_token"] == "tok"
+        assert request.headers["x-s"] == "signed"
+        assert request.headers["cookie"] == "a1=x; web_session=s"
+
+    def test_post_body_is_utf8(self):
+        seen = {}
+
+        def handler(request):
+            seen["body"] = json.loads(request.content.decode("utf-8"))
+            return httpx.Response(200, json={"success": True, "msg": "成功", "data": {"users": []}})
+
+        success, _, _ = _run(handler, lambda api: api.search_user("榴莲", "a1=x", page=2))
+        assert success
+        assert seen["body"]["search_user_request"]["keyword"] == "榴莲"
+        assert seen["body"]["search_user_request"]["page"] == 2
+
+    def test_failure_is_returned_not_raised(self):
+        def handler(request):
+            return httpx.Response(200, json={"success": False, "msg": "登录已过期", "data": {}})
+
+        success, msg, _ = _run(handler, lambda api: api.get_user_info("u1", "a1=x"))
+        assert not success and msg == "登录已过期"
+
+    def test_same_request_as_sync_client(self):
+        """同步与异步客户端发出的请求一致（路径、查询参数）"""
+        requests = []
+        _run(_user_posted(1, requests=requests),
+             lambda api: api.get_note_out_comment("n1", "c1", "tok", "a1=x"))
+        api = XHS_Apis()
+        with patch.object(api, "sign", side_effect=_fake_sign), patch.object(api.session, "get") as mock_get:
+            api.get_note_out_comment("n1", "c1", "tok", "a1=x")
+        assert mock_get.call_args.args[0] == str(requests[0].url)
+
+    @pytest.mark.parametrize("call", [
+        lambda api: api.get_user_like_note_info("u1", "c1", "a1=x", "tok", "pc_user"),
+        lambda api: api.get_user_collect_notes("u1", "a1=x", "c1"),
+        lambda api: api.get_metions("c1", "a1=x"),
+        lambda api: api.get_likesAndcollects("c1", "a1=x"),
+        lambda api: api.get_new_connections("c1", "a1=x"),
+        lambda api: api.get_unread_message("a1=x"),
+        lambda api: api.get_user_self_info2("a1=x"),
+    ])
+    def test_message_and_profile_requests_match_sync(self, call):
+        requests = []
+        _run(_user_posted(1, requests=requests), call)
+        api = XHS_Apis()
+        with patch.object(api, "sign", side_effect=_fake_sign), patch.object(api.session, "get") as mock_get:
+            call(api)
+        assert mock_get.call_args.args[0] == str(requests[0].url)
+
+    def test_homefeed_recommend_posts_same_body_as_sync(self):
+        seen = {}
+
+        def handler(request):
+            seen["body"] = request.content
+            return httpx.Response(200, json={"success": True, "msg": "成功", "data": {"items": []}})
+
+        _run(handler, lambda api: api.get_homefeed_recommend("homefeed_recommend", "", 1, 0, "a1=x"))
+        api = XHS_Apis()
+        with patch.object(api, "sign", side_effect=_fake_sign), patch.object(api.session, "post") as mock_post:
+            api.get_homefeed_recommend("homefeed_recommend", "", 1, 0, "a1=x")
+        assert mock_post.call_args.kwargs["data"] == seen["body"]
+
+    def test_on_response_receives_cookies_and_status(self):
+        seen = []
+
+        async def main():
+            handler = lambda request: httpx.Response(461, text="captcha")
+            async with AsyncXHS_Apis(transport=httpx.MockTransport(handler),
+                                     on_response=lambda cookies, status: seen.append((cookies, status))) as api:
+                with patch.object(api, "sign", side_effect=_fake_sign):
+                    await api.get_user_info("u1", "a1=x")
+                    return api.last_status_code()
+
+        assert asyncio.run(main()) == 461
+        assert seen == [({"a1": "x", "web_session": "s"}, 461)]
+
+    def test_note_info_falls_back_to_web(self):
+        state = {"note": {"noteDetailMap": {"n1": {"note": {"noteId": "n1", "title": "网页标题", "user": {}}}}}}
+        html = f"<script>window.__INITIAL_STATE__={json.dumps(state, ensure_ascii=False)}</script>"
+
+        def handler(request):
+            if request.url.host == "edith.xiaohongshu.com":
+                return httpx.Response(461, text="captcha")
+            return httpx.Response(200, text=html)
+
+        success, msg, res_json = _run(
+            handler, lambda api: api.get_note_info("https://www.xiaohongshu.com/explore/n1?xsec_token=t", "a1=x")
+        )
+        assert success
+        assert res_json["data"]["items"][0]["note_card"]["title"] == "网页标题"
+
+
+class TestAsyncPaginators:
+    """异步翻页器逐页产出"""
+
+    def test_iter_user_notes_yields_pages(self):
+        async def collect(api):
+            return [[n["note_id"] for n in page["notes"]] async for page in api.iter_user_notes(USER_URL, "a1=x")]
+
+        pages = _run(_user_posted(25), collect)
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert pages[0][0] == "n0" and pages[-1][-1] == "n24"
+
+    def test_iter_raises_on_failure(self):
+        def handler(request):
+            return httpx.Response(200, json={"success": False, "msg": "频率过高", "data": {}})
+
+        async def consume(api):
+            async for _ in api.iter_search_notes("榴莲", "a1=x"):
+                pass
+
+        with pytest.raises(XHSApiError, match="频率过高"):
+            _run(handler, consume)
+
+    @pytest.mark.parametrize("status", [200, 461])
+    def test_iter_error_carries_status_code(self, status):
+        """业务失败（200）与反爬（461）可以区分，调用方只对前者扣减账号健康度"""
+        def handler(request):
+            return httpx.Response(status, json={"success": False, "msg": "登录已过期", "data": {}})
+
+        async def consume(api):
+            async for _ in api.iter_metions("a1=x"):
+                pass
+
+        with pytest.raises(XHSApiError) as exc:
+            _run(handler, consume)
+        assert exc.value.status_code == status
+
+    def test_all_metions_keeps_paging_past_empty_page(self):
+        pages = [([{"id": "m1"}], True), ([], True), ([{"id": "m2"}], False)]
+
+        def handler(request):
+            index = int(request.url.params.get("cursor") or 0)
+            messages, has_more = pages[index]
+            data = {"message_list": messages, "cursor": str(index + 1), "has_more": has_more}
+            return httpx.Response(200, json={"success": True, "msg": "成功", "data": data})
+
+        success, msg, messages = _run(handler, lambda api: api.get_all_metions("a1=x"))
+        assert success and [m["id"] for m in messages] == ["m1", "m2"]
+
+    def test_latest_notes_stops_paging(self):
+        requests = []
+        stats = {}
+        success, msg, notes = _run(
+            _user_posted(3000, requests=requests),
+            lambda api: api.get_user_latest_notes(USER_URL, "a1=x", limit=15, page_stats=stats),
+        )
+        assert success and len(notes) == 15
+        assert len(requests) == 2
+        assert stats == {"pages": 2, "stopped_early": True}
+
+    def test_latest_notes_stop_at_known(self):
+        stats = {}
+        success, msg, notes = _run(
+            _user_posted(3000),
+            lambda api: api.get_user_latest_notes(USER_URL, "a1=x", limit=20, page_stats=stats,
+                                                  stop_at_note_id="n12"),
+        )
+        assert [n["note_id"] for n in notes] == [f"n{i}" for i in range(12)]
+        assert stats == {"pages": 2, "stopped_early": True, "reached_known": True}
+
+    def test_all_comments_expands_sub_comments(self):
+        def handler(request):
+            if request.url.path.endswith("/comment/page"):
+                comments = [
+                    {"id": "c1", "note_id": "n1", "sub_comment_has_more": True, "sub_comment_cursor": "s0",
+                     "sub_comments": [{"id": "r0"}]},
+                    {"id": "c2", "note_id": "n1", "sub_comment_has_more": False, "sub_comments": []},
+                ]
+                data = {"comments": comments, "cursor": "", "has_more": False}
+            else:
+                data = {"comments": [{"id": "r1"}], "cursor": "s1", "has_more": False}
+            return httpx.Response(200, json={"success": True, "msg": "成功", "data": data})
+
+        success, msg, comments = _run(
+            handler, lambda api: api.get_note_all_comment("https://www.xiaohongshu.com/explore/n1?xsec_token=t", "a1=x")
+        )
+        assert success
+        assert [r["id"] for r in comments[0]["sub_comments"]] == ["r0", "r1"]
+        assert comments[1]["sub_comments"] == []
+
+    def test_all_comments_expands_concurrently(self):
+        """二级评论并发展开，最多 workers 条同时在途，结果保持原顺序"""
+        in_flight = {"now": 0, "max": 0}
+
+        async def handler(request):
+            if request.url.path.endswith("/comment/page"):
+                comments = [{"id": f"c{i}", "note_id": "n1", "sub_comment_has_more": True,
+                             "sub_comment_cursor": "s0", "sub_comments": []} for i in range(6)]
+                data = {"comments": comments, "cursor": "", "has_more": False}
+            else:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+                await asyncio.sleep(0.02)
+                in_flight["now"] -= 1
+                root = request.url.params["root_comment_id"]
+                data = {"comments": [{"id": f"{root}-r1"}], "cursor": "s1", "has_more": False}
+            return httpx.Response(200, json={"success": True, "msg": "成功", "data": data})
+
+        success, msg, comments = _run(
+            handler, lambda api: api.get_note_all_comment("https://www.xiaohongshu.com/explore/n1?xsec_token=t",
+                                                          "a1=x", workers=3)
+        )
+        assert success
+        assert [c["sub_comments"][0]["id"] for c in comments] == [f"c{i}-r1" for i in range(6)]
+        assert in_flight["max"] == 3
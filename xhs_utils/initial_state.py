@@ -0,0 +1,77 @@
+# encoding: utf-8
+"""
+从小红书网页 HTML 的 window.__INITIAL_STATE__ 中按需提取子树
+
+整页 state 通常几百 KB（首页 feed、用户、搜索等），网页降级只用到 note.noteDetailMap。
+这里用字符串查找定位脚本和键名，再用 JSONDecoder.raw_decode 从键值起始位置只解析这一棵子树，
+不对整页做正则匹配、不复制整段 state、不构建用不到的对象。
+
+state 由页面 JS 序列化，可能含有 JSON 不支持的 undefined：先直接解析，解析器报错的位置是 undefined 时
+才复制子树所在片段、把该处替换为 null 后重试（字符串内容中的 "undefined" 不受影响）。
+"""
+import json
+
+STATE_MARKER = "window.__INITIAL_STATE__"
+SCRIPT_END = "</script>"
+
+_decoder = json.JSONDecoder()
+UNDEFINED = "undefined"
+# 与 undefined 等长，替换后其余位置的偏移不变
+NULL_PADDED = "null".ljust(len(UNDEFINED))
+
+
+def locate_initial_state(html: str) -> tuple[int, int] | None:
+    """返回 state 对象在 html 中的 (起始, 结束) 偏移，结束为其所在 </script> 的位置；找不到时返回 None"""
+    marker = html.find(STATE_MARKER)
+    if marker < 0:
+        return None
+    start = html.find("{", marker + len(STATE_MARKER))
+    if start < 0:
+        return None
+    end = html.find(SCRIPT_END, start)
+    return start, (end if end >= 0 else len(html))
+
+
+def _value_offset(html: str, key: str, start: int, end: int) -> int:
+    """state 中第一个名为 key 的键的值起始位置，找不到时返回 -1"""
+    needle = f'"{key}"'
+    pos = html.find(needle, start, end)
+    while pos >= 0:
+        colon = pos + len(needle)
+        while colon < end and html[colon].isspace():
+            colon += 1
+        if colon < end and html[colon] == ":":
+            colon += 1
+            while colon < end and html[colon].isspace():
+                colon += 1
+            return colon
+        # 作为字符串值出现，不是键
+        pos = html.find(needle, colon, end)
+    return -1
+
+
+def extract_state_value(html: str, key: str, span: tuple[int, int]):
+    """
+        解析 state 中第一个名为 key 的键对应的值，键不存在或值为 undefined 时返回 None
+        :param span: locate_initial_state 的返回值
+        解析失败时抛出 json.JSONDecodeError
+    """
+    start, end = span
+    pos = _value_offset(html, key, start, end)
+    if pos < 0 or html.startswith(UNDEFINED, pos):
+        return None
+    text, offset = html, pos
+    while True:
+        try:
+            value, _ = _decoder.raw_decode(text, offset)
+            return value
+        except json.JSONDecodeError as e:
+            # 解析器在值的位置遇到 undefined 时报错位置正好是它的起点，字符串内容里的不会被误伤
+            if not text.startswith(UNDEFINED, e.pos):
+                raise
+            if text is html:
+                # 首次遇到时才复制，且只复制键之后到脚本结束的片段
+                text, offset, error_pos = html[pos:end], 0, e.pos - pos
+            else:
+                error_pos = e.pos
+            text = text[:error_pos] + NULL_PADDED + text[error_pos + len(UNDEFINED):]
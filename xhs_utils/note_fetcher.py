@@ -1,6 +1,9 @@
 # xhs_utils/note_fetcher.py（简化版，按照main.py的方式）
 
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Callable, ContextManager, List, Dict, Optional, Tuple, Union
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
 from xhs_utils.data_util import handle_note_info
@@ -8,110 +11,285 @@ from xhs_utils.data_util import handle_note_info
 
 class NoteFetcher:
     """笔记获取工具类"""
-    
-    def __init__(self, cookies_str: str):
+
+    def __init__(
+        self,
+        cookies_str: Union[str, Callable[[], str]] = "",
+        max_workers: int = 1,
+        per_client_limit: Optional[int] = None,
+        xhs_apis: Optional[XHS_Apis] = None,
+        request_slot: Optional[Callable[[], ContextManager]] = None,
+        cookie_pool=None
+    ):
         """
         初始化笔记获取器
-        :param cookies_str: Cookie字符串
+        :param cookies_str: Cookie字符串；也可以传入返回 Cookie 字符串的函数（如账号池），每个博主 / 每篇笔记取一次
+        :param max_workers: 并发抓取的线程数（博主列表和笔记详情共用一个线程池），1 表示串行
+        :param per_client_limit: 本获取器同时在途的请求上限（笔记列表、笔记详情及其网页降级合计，不区分主机），默认与 max_workers 相同
+        :param xhs_apis: 复用已有的 XHS_Apis（共享连接池），默认新建
+        :param request_slot: 每次请求前额外占用的槽位（返回上下文管理器），用于接入外部的全局并发限制
+        :param cookie_pool: 可选账号池（acquire() -> 带 cookies 的账号，report(账号, success)），传入时忽略 cookies_str；
+            HTTP 200 但接口返回失败（如登录失效）时回报给账号池，HTTP 错误由 XHS_Apis.on_response 计入
         """
         self.cookies_str = cookies_str
-        self.xhs_apis = XHS_Apis()
-    
+        self.cookie_pool = cookie_pool
+        self.xhs_apis = xhs_apis or XHS_Apis()
+        self.max_workers = max(1, int(max_workers or 1))
+        self.per_client_limit = max(1, int(per_client_limit or self.max_workers))
+        self._client_semaphore = threading.BoundedSemaphore(self.per_client_limit)
+        self._request_slot = request_slot
+        # 翻页统计：实际请求的页数 / 在还有后续页时提前停止的博主数 / 翻到上次见过的笔记而停止的博主数
+        self.page_stats = {"pages_fetched": 0, "early_stops": 0, "known_stops": 0}
+        self._stats_lock = threading.Lock()
+
     def get_users_latest_notes(
-        self, 
-        user_ids: List[str], 
-        max_users: int = 5, 
-        notes_per_user: int = 5
+        self,
+        user_ids: List[str],
+        max_users: int = 5,
+        notes_per_user: int = 5,
+        on_user_done: Optional[Callable[[str, List[Dict]], None]] = None,
+        stop_at: Optional[Dict[str, str]] = None
     ) -> List[Dict]:
         """
         获取多个用户的最新笔记（按照main.py的简单方式）
         :param user_ids: 用户ID列表
         :param max_users: 最多处理几个用户（默认5个）
         :param notes_per_user: 每个用户获取几条笔记（默认5条）
-        :return: 笔记列表
+        :param on_user_done: 某个用户的笔记全部获取完后立即回调 (user_id, notes)，在调用线程中执行
+        :param stop_at: 增量抓取，用户ID -> 上次见过的最新笔记ID，只获取比它新的笔记
+        :return: 笔记列表，按 user_ids 顺序、每个用户内按笔记原始顺序排列
         """
+        stop_at = stop_at or {}
+        if self.max_workers > 1:
+            return self._get_users_latest_notes_concurrently(
+                user_ids, max_users, notes_per_user, on_user_done, stop_at
+            )
+
         all_notes = []
         processed_users = 0
-        
+
         for user_id in user_ids:
             if processed_users >= max_users:
                 break
-            
-            try:
-                logger.info(f"正在获取用户 {user_id} 的最新 {notes_per_user} 条笔记...")
-                
-                # 构建用户URL（按照main.py的方式）
-                user_url = f"https://www.xiaohongshu.com/user/profile/{user_id}"
-                
-                # 获取用户所有笔记（按照main.py的方式）
-                success, msg, all_note_info = self.xhs_apis.get_user_all_notes(
-                    user_url, self.cookies_str
-                )
-                
-                if success:
-                    logger.info(f'用户 {user_id} 作品数量: {len(all_note_info)}')
-                    
-                    # 限制数量（取最新的notes_per_user条）
-                    latest_notes = all_note_info[:notes_per_user]
-                    
-                    # 按照main.py的方式遍历笔记
-                    for simple_note_info in latest_notes:
-                        try:
-                            note_id = simple_note_info.get('note_id', '')
-                            xsec_token = simple_note_info.get('xsec_token', '')
-                            
-                            if note_id:
-                                # 构建笔记URL（按照main.py的方式）
-                                note_url = f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_user" if xsec_token else f"https://www.xiaohongshu.com/explore/{note_id}"
-                                
-                                # 获取笔记详细信息（可选，如果需要详细信息）
-                                note_detail = self._get_note_detail(note_url)
-                                if note_detail:
-                                    note_detail['user_id'] = user_id
-                                    all_notes.append(note_detail)
-                                else:
-                                    # 如果获取详情失败，至少返回基本信息
-                                    all_notes.append({
-                                        'note_id': note_id,
-                                        'title': simple_note_info.get('display_title', simple_note_info.get('title', '无标题')),
-                                        'desc': simple_note_info.get('desc', ''),
-                                        'note_type': simple_note_info.get('type', 'normal'),
-                                        'user_id': user_id,
-                                        'xsec_token': xsec_token,
-                                        'url': note_url
-                                    })
-                        except Exception as e:
-                            logger.warning(f'处理笔记时出错: {e}')
-                            continue
-                    
-                    logger.info(f"✅ 用户 {user_id} 成功获取 {len(latest_notes)} 条笔记")
-                    processed_users += 1
-                else:
-                    logger.warning(f"⚠️ 获取用户 {user_id} 的笔记失败: {msg}")
-                    
-            except Exception as e:
-                logger.error(f"❌ 处理用户 {user_id} 时出错: {e}", exc_info=True)
+
+            success, msg, latest_notes = self._fetch_user_note_list(user_id, notes_per_user, stop_at.get(user_id))
+            if not success:
                 continue
-        
+
+            # 按照main.py的方式遍历笔记
+            user_notes = []
+            for simple_note_info in latest_notes:
+                note = self._fetch_note(user_id, simple_note_info)
+                if note:
+                    user_notes.append(note)
+            all_notes.extend(user_notes)
+            if on_user_done:
+                on_user_done(user_id, user_notes)
+
+            logger.info(f"✅ 用户 {user_id} 成功获取 {len(latest_notes)} 条笔记")
+            processed_users += 1
+
         logger.info(f"📝 共获取到 {len(all_notes)} 条笔记（来自 {processed_users} 个用户）")
+        self._log_page_stats()
         return all_notes
-    
+
+    def _get_users_latest_notes_concurrently(
+        self,
+        user_ids: List[str],
+        max_users: int,
+        notes_per_user: int,
+        on_user_done: Optional[Callable[[str, List[Dict]], None]] = None,
+        stop_at: Optional[Dict[str, str]] = None
+    ) -> List[Dict]:
+        """
+        并发版本：博主笔记列表与笔记详情在同一个有界线程池中执行。
+        某个博主获取失败时按顺序补位下一个博主，保证成功博主数与串行版本一致；
+        结果最终按原始博主顺序和笔记顺序重新组装。
+        """
+        listed = {}        # 博主下标 -> 笔记简要信息列表
+        note_results = {}  # (博主下标, 笔记下标) -> 笔记详情
+        remaining = {}     # 博主下标 -> 尚未完成的笔记详情数
+        next_index = 0
+
+        def user_done(user_index: int):
+            if on_user_done:
+                notes = [note_results[(user_index, i)] for i in range(len(listed[user_index]))
+                         if (user_index, i) in note_results]
+                on_user_done(user_ids[user_index], notes)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="note-fetcher") as pool:
+            pending = {}
+
+            def submit_user(index: int):
+                future = pool.submit(
+                    self._fetch_user_note_list, user_ids[index], notes_per_user, (stop_at or {}).get(user_ids[index])
+                )
+                pending[future] = ("user", index)
+
+            while next_index < len(user_ids) and next_index < max_users:
+                submit_user(next_index)
+                next_index += 1
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, key = pending.pop(future)
+                    if kind == "user":
+                        success, msg, latest_notes = future.result()
+                        if success:
+                            listed[key] = latest_notes
+                            logger.info(f"✅ 用户 {user_ids[key]} 成功获取 {len(latest_notes)} 条笔记")
+                            remaining[key] = len(latest_notes)
+                            for note_index, simple_note_info in enumerate(latest_notes):
+                                note_future = pool.submit(self._fetch_note, user_ids[key], simple_note_info)
+                                pending[note_future] = ("note", (key, note_index))
+                            if not latest_notes:
+                                user_done(key)
+                        elif next_index < len(user_ids):
+                            # 失败的博主不计入 max_users，按顺序补位
+                            submit_user(next_index)
+                            next_index += 1
+                    else:
+                        note = future.result()
+                        if note:
+                            note_results[key] = note
+                        user_index = key[0]
+                        remaining[user_index] -= 1
+                        if remaining[user_index] == 0:
+                            user_done(user_index)
+
+        all_notes = []
+        for user_index in sorted(listed):
+            for note_index in range(len(listed[user_index])):
+                note = note_results.get((user_index, note_index))
+                if note:
+                    all_notes.append(note)
+
+        logger.info(f"📝 共获取到 {len(all_notes)} 条笔记（来自 {len(listed)} 个用户，并发数 {self.max_workers}）")
+        self._log_page_stats()
+        return all_notes
+
+    def _fetch_user_note_list(
+        self, user_id: str, notes_per_user: int, stop_at_note_id: Optional[str] = None
+    ) -> Tuple[bool, str, List[Dict]]:
+        """获取单个用户最新的 notes_per_user 条笔记简要信息（取够或翻到 stop_at_note_id 即停止翻页）"""
+        try:
+            logger.info(f"正在获取用户 {user_id} 的最新 {notes_per_user} 条笔记...")
+
+            # 构建用户URL（按照main.py的方式）
+            user_url = self._build_user_url(user_id)
+
+            # 只翻到够 notes_per_user 条为止，不再拉取博主的全部历史笔记
+            stats = {}
+            account, cookies = self._acquire()
+            with self._client_slot():
+                success, msg, latest_notes = self.xhs_apis.get_user_latest_notes(
+                    user_url, cookies, limit=notes_per_user, page_stats=stats,
+                    stop_at_note_id=stop_at_note_id
+                )
+                if not success:
+                    self._report_business_failure(account)
+            with self._stats_lock:
+                self.page_stats["pages_fetched"] += stats.get("pages", 0)
+                if stats.get("stopped_early"):
+                    self.page_stats["early_stops"] += 1
+                if stats.get("reached_known"):
+                    self.page_stats["known_stops"] += 1
+
+            if not success:
+                logger.warning(f"⚠️ 获取用户 {user_id} 的笔记失败: {msg}")
+                return False, msg, []
+
+            logger.info(f'用户 {user_id} 翻页 {stats.get("pages", 0)} 页，取得 {len(latest_notes)} 条笔记')
+            return True, msg, latest_notes
+        except Exception as e:
+            logger.error(f"❌ 处理用户 {user_id} 时出错: {e}", exc_info=True)
+            return False, str(e), []
+
+    def _log_page_stats(self):
+        """输出翻页统计：每个提前停止的博主至少省下一页 user_posted 请求"""
+        with self._stats_lock:
+            pages, early_stops = self.page_stats["pages_fetched"], self.page_stats["early_stops"]
+            known_stops = self.page_stats["known_stops"]
+        logger.info(f"📄 共请求 {pages} 页笔记列表，{early_stops} 个博主取够后提前停止翻页（至少节省 {early_stops} 页），"
+                    f"{known_stops} 个博主翻到上次见过的笔记即停止")
+
+    def _fetch_note(self, user_id: str, simple_note_info: Dict) -> Optional[Dict]:
+        """获取单条笔记详情，失败时退回列表中的基本信息"""
+        try:
+            note_id = simple_note_info.get('note_id', '')
+            xsec_token = simple_note_info.get('xsec_token', '')
+            # 置顶笔记不按时间排序，调用方据此跳过它来确定最新笔记
+            sticky = bool((simple_note_info.get('interact_info') or {}).get('sticky', False))
+
+            if not note_id:
+                return None
+
+            # 构建笔记URL（按照main.py的方式）
+            note_url = f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_user" if xsec_token else f"https://www.xiaohongshu.com/explore/{note_id}"
+
+            # 获取笔记详细信息（可选，如果需要详细信息）
+            note_detail = self._get_note_detail(note_url)
+            if note_detail:
+                note_detail['user_id'] = user_id
+                note_detail['sticky'] = sticky
+                return note_detail
+
+            # 如果获取详情失败，至少返回基本信息
+            return {
+                'note_id': note_id,
+                'title': simple_note_info.get('display_title', simple_note_info.get('title', '无标题')),
+                'desc': simple_note_info.get('desc', ''),
+                'note_type': simple_note_info.get('type', 'normal'),
+                'user_id': user_id,
+                'xsec_token': xsec_token,
+                'url': note_url,
+                'sticky': sticky
+            }
+        except Exception as e:
+            logger.warning(f'处理笔记时出错: {e}')
+            return None
+
+    def _acquire(self) -> Tuple[object, str]:
+        """取本次请求用的 (账号, Cookie 字符串)，未使用账号池时账号为 None"""
+        if self.cookie_pool is not None:
+            account = self.cookie_pool.acquire()
+            return account, account.cookies
+        return None, self.cookies_str() if callable(self.cookies_str) else self.cookies_str
+
+    def _report_business_failure(self, account):
+        """请求失败且最后一个响应是 HTTP 200 时（业务失败）给账号扣分；须在发请求的线程中调用"""
+        if account is not None and self.xhs_apis.last_status_code() == 200:
+            self.cookie_pool.report(account, False)
+
     def _build_user_url(self, user_id: str) -> str:
         """构建用户URL"""
         # 如果已经是完整URL，直接返回
         if user_id.startswith('http'):
             return user_id
-        
+
         # 否则构建URL（按照main.py的方式）
         return f"https://www.xiaohongshu.com/user/profile/{user_id}"
-    
+
+    @contextmanager
+    def _client_slot(self):
+        """限制本获取器同时在途的请求数（一次笔记详情可能先后请求 API 和网页两个主机，按一次计）"""
+        with self._client_semaphore:
+            if self._request_slot is None:
+                yield
+            else:
+                with self._request_slot():
+                    yield
+
     def _get_note_detail(self, note_url: str) -> Optional[Dict]:
         """获取笔记详细信息（可选，如果不需要详细信息可以跳过）"""
         try:
-            success, msg, note_info = self.xhs_apis.get_note_info(
-                note_url, self.cookies_str
-            )
-            
+            account, cookies = self._acquire()
+            with self._client_slot():
+                success, msg, note_info = self.xhs_apis.get_note_info(note_url, cookies)
+                if not success or not (note_info or {}).get('success', True):
+                    self._report_business_failure(account)
+
             if success and note_info:
                 items = note_info.get('data', {}).get('items', [])
                 if items and len(items) > 0:
@@ -121,5 +299,5 @@ class NoteFetcher:
                     return handled_note
         except Exception as e:
             logger.debug(f"获取笔记详情失败（可选）: {e}")
-        
-        return None
\ No newline at end of file
+
+        return None
@@ -0,0 +1,155 @@
+# encoding: utf-8
+"""
+XHS 请求限速：按接口族（feed / user_posted / comment / search / web）各一个令牌桶，速率按 AIMD 自适应
+
+- 每次成功响应速率加 increase（加性增），直到 max_rate
+- 收到 461（反爬验证）或其他非 200 响应时速率乘 decrease（乘性减），不低于 min_rate；
+  同一个 cooldown 窗口内只减一次，避免并发在途请求同时返回 461 时速率被连续砍到底
+- 收到 461 后该接口族进入 penalty 秒的惩罚期，调用方可据此直接走降级路径
+- 令牌按预约发放：reserve() 立即扣一个令牌并返回需要等待的秒数，同步客户端 time.sleep，
+  异步客户端 asyncio.sleep，两种客户端共用同一个限速器
+
+限速状态为当前进程内的，多 worker 部署时总速率 = 速率 x worker 数。
+"""
+import threading
+import time
+
+# 接口路径前缀 -> 接口族，按顺序匹配
+ENDPOINT_FAMILIES = (
+    ("/api/sns/web/v1/feed", "feed"),
+    ("/api/sns/web/v1/user_posted", "user_posted"),
+    ("/api/sns/web/v2/comment", "comment"),
+    ("/api/sns/web/v1/search", "search"),
+    ("/explore/", "web"),
+    ("/discovery/item/", "web"),
+)
+
+ANTI_BOT_STATUS = 461
+
+
+def endpoint_family(url: str) -> str | None:
+    """url 所属的接口族，不在限速范围内时返回 None"""
+    for prefix, family in ENDPOINT_FAMILIES:
+        if prefix in url:
+            return family
+    return None
+
+
+class AdaptiveTokenBucket:
+    """单个接口族的令牌桶，速率（每秒请求数）在 [min_rate, max_rate] 之间按 AIMD 调整"""
+
+    def __init__(self, name: str, max_rate: float, min_rate: float = 0.2, increase: float = 0.05,
+                 decrease: float = 0.5, cooldown: float = 2.0, penalty: float = 30.0):
+        self.name = name
+        self.max_rate = max(float(max_rate), 0.01)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.penalty = penalty
+        self.rate = self.max_rate
+        # 桶容量为 1 秒的请求量，空闲后最多突发这么多
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._last_decrease = float("-inf")
+        self._last_anti_bot = float("-inf")
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "throttled": 0, "anti_bot": 0, "waited": 0.0}
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.rate)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """预约一个令牌，返回发请求前需要等待的秒数（令牌不足时记为欠账，后来者排在后面）"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self._stats["requests"] += 1
+            self._stats["waited"] += wait
+            return wait
+
+    def acquire(self):
+        """同步等待直到拿到令牌"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, status_code: int):
+        """根据响应状态调整速率"""
+        with self._lock:
+            now = time.monotonic()
+            if status_code == 200:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                return
+            self._stats["throttled"] += 1
+            if status_code == ANTI_BOT_STATUS:
+                self._stats["anti_bot"] += 1
+                self._last_anti_bot = now
+            if now - self._last_decrease >= self.cooldown:
+                self._refill(now)
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+                # 桶里剩余的令牌也按新速率收紧，不再允许突发
+                self._tokens = min(self._tokens, 0.0)
+
+    def in_penalty(self) -> bool:
+        """最近 penalty 秒内收到过 461"""
+        with self._lock:
+            return time.monotonic() - self._last_anti_bot < self.penalty
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            stats = dict(self._stats)
+            stats.update({
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "min_rate": self.min_rate,
+                "tokens": round(self._tokens, 3),
+                "in_penalty": now - self._last_anti_bot < self.penalty,
+            })
+        stats["waited"] = round(stats["waited"], 3)
+        return stats
+
+
+class RateLimiter:
+    """各接口族的令牌桶集合，线程安全，可在同步 / 异步客户端之间共享"""
+
+    def __init__(self, rates: dict, **bucket_options):
+        """
+            :param rates: {接口族: 每秒最大请求数}，未列出的接口族不限速
+            :param bucket_options: 传给 AdaptiveTokenBucket 的 min_rate / increase / decrease / cooldown / penalty
+        """
+        self.buckets = {
+            family: AdaptiveTokenBucket(family, rate, **bucket_options) for family, rate in rates.items()
+        }
+
+    def bucket_for(self, url: str) -> AdaptiveTokenBucket | None:
+        family = endpoint_family(url)
+        return self.buckets.get(family) if family else None
+
+    def in_penalty(self, family: str) -> bool:
+        bucket = self.buckets.get(family)
+        return bucket is not None and bucket.in_penalty()
+
+    def stats(self) -> dict:
+        return {family: bucket.stats() for family, bucket in self.buckets.items()}
+
+
+def parse_rates(spec: str) -> dict:
+    """解析 "feed:2,user_posted:2,search:0.5" 形式的配置"""
+    rates = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        family, _, rate = part.partition(":")
+        rates[family.strip()] = float(rate)
+    return rates
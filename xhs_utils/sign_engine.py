@@ -0,0 +1,209 @@
+# encoding: utf-8
+"""
+常驻 Node 签名引擎
+
+PyExecJS 在 Node 运行时下每次 js.call 都会新起一个 node 进程并重新编译 static/xhs_xs_xsc_56.js。
+这里维护一组常驻的 node worker（static/xhs_sign_worker.js），通过 stdin/stdout 按行收发 JSON，
+支持一次提交多条签名请求。引擎不可用时 get_sign_engine() 返回 None，由调用方回退到 execjs。
+
+环境变量：
+    XHS_SIGN_ENGINE   node（默认）| execjs
+    XHS_SIGN_WORKERS  常驻 node 进程数，默认 2
+    XHS_SIGN_TIMEOUT  单次签名请求超时（秒），默认 5
+"""
+import atexit
+import itertools
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+from loguru import logger
+
+WORKER_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../static/xhs_sign_worker.js'))
+
+
+class SignEngineError(Exception):
+    """签名引擎不可用或签名失败"""
+
+
+class _NodeWorker:
+    """单个常驻 node 进程，同一时间只被一个线程使用"""
+
+    def __init__(self, node_path: str, timeout: float):
+        self._proc = subprocess.Popen(
+            [node_path, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        # 用独立线程读 stdout，主线程通过队列带超时等待，Windows 下同样可用
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_stdout, name='xhs-sign-reader', daemon=True)
+        self._reader.start()
+        self._ids = itertools.count(1)
+        try:
+            self._read_response(0, timeout)
+        except SignEngineError:
+            self.close()
+            raise
+
+    def _read_stdout(self):
+        for line in self._proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _read_response(self, request_id: int, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SignEngineError('签名进程响应超时')
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                raise SignEngineError('签名进程响应超时')
+            if line is None:
+                raise SignEngineError('签名进程已退出')
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                # 签名脚本自身的日志输出
+                continue
+            # 跳过之前超时请求迟到的响应
+            if not isinstance(msg, dict) or msg.get('id') != request_id:
+                continue
+            if 'error' in msg:
+                raise SignEngineError(msg['error'])
+            return msg
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def sign_batch(self, sign_requests: list, timeout: float) -> list:
+        request_id = next(self._ids)
+        try:
+            self._proc.stdin.write(json.dumps({'id': request_id, 'requests': sign_requests}, ensure_ascii=False) + '\n')
+            self._proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise SignEngineError(f'写入签名进程失败: {e}')
+        return self._read_response(request_id, timeout)['results']
+
+    def close(self):
+        try:
+            self._proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self._proc.terminate()
+            self._proc.wait(timeout=1)
+        except Exception:
+            self._proc.kill()
+
+
+class NodeSignEngine:
+    """常驻 node worker 池，worker 在首次使用时启动，异常退出后自动重建"""
+
+    def __init__(self, workers: int = 2, timeout: float = 5.0, node_path: str = None):
+        self.node_path = node_path or shutil.which('node')
+        if not self.node_path:
+            raise SignEngineError('未找到 node 可执行文件')
+        if not os.path.exists(WORKER_SCRIPT):
+            raise SignEngineError(f'签名脚本不存在: {WORKER_SCRIPT}')
+        self.timeout = timeout
+        self.size = max(1, int(workers))
+        self.pid = os.getpid()
+        # None 表示尚未启动（或已失效待重建）的槽位
+        self._idle = queue.Queue()
+        for _ in range(self.size):
+            self._idle.put(None)
+        self._workers = []
+        self._workers_lock = threading.Lock()
+
+    def sign(self, api: str, data='', a1: str = '', method: str = 'POST') -> dict:
+        """单条签名，返回 {'xs', 'xt', 'xs_common'}"""
+        return self.sign_batch([{'api': api, 'data': data, 'a1': a1, 'method': method}])[0]
+
+    def sign_batch(self, sign_requests: list) -> list:
+        """
+            批量签名，一次进程往返处理多条请求
+            :param sign_requests: [{'api', 'data', 'a1', 'method'}, ...]
+            返回与请求一一对应的 [{'xs', 'xt', 'xs_common'}, ...]
+        """
+        if not sign_requests:
+            return []
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise SignEngineError('没有空闲的签名进程')
+        try:
+            if worker is None or not worker.alive:
+                worker = self._spawn()
+            return worker.sign_batch(sign_requests, self.timeout)
+        except SignEngineError:
+            # 出错的进程直接丢弃，槽位留给下一次请求重建
+            if worker is not None:
+                self._discard(worker)
+            worker = None
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def _spawn(self) -> _NodeWorker:
+        try:
+            worker = _NodeWorker(self.node_path, self.timeout)
+        except OSError as e:
+            raise SignEngineError(f'启动签名进程失败: {e}')
+        with self._workers_lock:
+            self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker: _NodeWorker):
+        worker.close()
+        with self._workers_lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def close(self):
+        with self._workers_lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+_engine = None
+_engine_failed = False
+_engine_lock = threading.Lock()
+
+
+def get_sign_engine():
+    """
+        返回当前进程共享的签名引擎
+        XHS_SIGN_ENGINE=execjs 或本机没有 node 时返回 None；fork 出的子进程会重新创建自己的 worker
+    """
+    global _engine, _engine_failed
+    if os.getenv('XHS_SIGN_ENGINE', 'node').lower() != 'node':
+        return None
+    with _engine_lock:
+        if _engine is not None and _engine.pid == os.getpid():
+            return _engine
+        if _engine_failed:
+            return None
+        try:
+            _engine = NodeSignEngine(
+                workers=int(os.getenv('XHS_SIGN_WORKERS', '2')),
+                timeout=float(os.getenv('XHS_SIGN_TIMEOUT', '5')),
+            )
+        except SignEngineError as e:
+            logger.warning(f'常驻签名引擎不可用，使用 execjs: {e}')
+            _engine_failed = True
+            return None
+        atexit.register(_engine.close)
+        return _engine
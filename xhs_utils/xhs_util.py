@@ -1,18 +1,33 @@
 import json
 import math
+import os
 import random
+import threading
+import time
 import execjs
+from loguru import logger
 from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.sign_engine import SignEngineError, get_sign_engine
 
-try:
-    js = execjs.compile(open(r'../static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
+_STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../static'))
 
-try:
-    xray_js = execjs.compile(open(r'../static/xhs_xray.js', 'r', encoding='utf-8').read())
-except:
-    xray_js = execjs.compile(open(r'static/xhs_xray.js', 'r', encoding='utf-8').read())
+# 签名脚本在第一次签名时才编译，import 时不再触发任何 JS 调用
+_sign_js = None
+_sign_js_lock = threading.Lock()
+
+# x-xray-traceid 的自增序列（23 位），起始值随机
+_xray_seq = random.randrange(1 << 23)
+_xray_lock = threading.Lock()
+
+
+def _get_sign_js():
+    global _sign_js
+    if _sign_js is None:
+        with _sign_js_lock:
+            if _sign_js is None:
+                with open(os.path.join(_STATIC_DIR, 'xhs_xs_xsc_56.js'), 'r', encoding='utf-8') as f:
+                    _sign_js = execjs.compile(f.read())
+    return _sign_js
 
 def generate_x_b3_traceid(len=16):
     x_b3_traceid = ""
@@ -21,17 +36,57 @@ def generate_x_b3_traceid(len=16):
     return x_b3_traceid
 
 def generate_xs_xs_common(a1, api, data='', method='POST'):
-    ret = js.call('get_request_headers_params', api, data, a1, method)
+    ret = None
+    engine = get_sign_engine()
+    if engine is not None:
+        try:
+            ret = engine.sign(api, data, a1, method)
+        except SignEngineError as e:
+            logger.warning(f'常驻签名进程失败，回退到 execjs: {e}')
+    if ret is None:
+        ret = _get_sign_js().call('get_request_headers_params', api, data, a1, method)
     xs, xt, xs_common = ret['xs'], ret['xt'], ret['xs_common']
     return xs, xt, xs_common
 
+def generate_xs_xs_common_batch(sign_requests):
+    """
+        批量签名，常驻签名进程一次往返处理全部请求
+        :param sign_requests: [(a1, api, data, method), ...]
+        返回 [(xs, xt, xs_common), ...]
+    """
+    engine = get_sign_engine()
+    if engine is not None:
+        try:
+            rets = engine.sign_batch([
+                {'api': api, 'data': data, 'a1': a1, 'method': method}
+                for a1, api, data, method in sign_requests
+            ])
+            return [(ret['xs'], ret['xt'], ret['xs_common']) for ret in rets]
+        except SignEngineError as e:
+            logger.warning(f'常驻签名进程批量签名失败，回退到 execjs: {e}')
+    return [generate_xs_xs_common_by_execjs(a1, api, data, method) for a1, api, data, method in sign_requests]
+
+def generate_xs_xs_common_by_execjs(a1, api, data='', method='POST'):
+    ret = _get_sign_js().call('get_request_headers_params', api, data, a1, method)
+    return ret['xs'], ret['xt'], ret['xs_common']
+
 def generate_xs(a1, api, data=''):
-    ret = js.call('get_xs', api, data, a1)
+    ret = _get_sign_js().call('get_xs', api, data, a1)
     xs, xt = ret['X-s'], ret['X-t']
     return xs, xt
 
 def generate_xray_traceid():
-    return xray_js.call('traceId')
+    """
+        纯 Python 实现的 x-xray-traceid，与 static/xhs_xray.js 的 traceId() 格式一致：
+        前 16 位为 (毫秒时间戳 << 23 | 自增序列) 的十六进制，后 16 位为 64 位随机数
+    """
+    global _xray_seq
+    with _xray_lock:
+        _xray_seq = (_xray_seq + 1) & 0x7FFFFF
+        seq = _xray_seq
+    high = ((int(time.time() * 1000) << 23) | seq) & 0xFFFFFFFFFFFFFFFF
+    return f'{high:016x}{random.getrandbits(64):016x}'
+
 def get_common_headers():
     return {
         "authority": "www.xiaohongshu.com",